@@ -3,7 +3,6 @@ DRY: Dont Repeat Yourself (Merge, Extend and Override your config file)
 """
 import os
 import logging
-from config.configure import setup_logging
 import sys
 
 PY3 = sys.version_info[0] == 3
@@ -15,22 +14,239 @@ else:
     string_types = basestring,
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-logger = setup_logging(path=os.path.join(BASE_DIR, 'config/logging.yaml'), name="DRY")
-if logger is None:
-    logger = logging.getLogger("DRY")  # DRY: Dont Repeat Yourself (Merge, Extend and Override your config file)
-    logger.info("Logging module configured by yaml configuration file")
+# Importing DRY doesn't configure logging, call setup_logging for it
+logger = logging.getLogger("DRY")  # DRY: Dont Repeat Yourself (Merge, Extend and Override your config file)
 
 from collections import Counter
-from utils.util import find_with_regex
-from libs.melddict import MeldDict
-from libs.flatdict import FlatDict
+try:
+    from collections.abc import Mapping
+except ImportError:
+    # Python 2
+    from collections import Mapping
+import re
+import time
+import heapq
+from libs.melddict import MeldDict, FrozenMeldDict, copy_tree, freeze, meld_lists, LIST_STRATEGIES
 import copy
-from pprint import pprint
+
+
+RE_ANCHOR = r'\([\&][a-zA-Z\._0-9]{1,}\)'
+RE_NAME = r'[a-zA-Z\._0-9]{1,}'
+# RE_ANCHOR with RE_NAME as 'name' group, for finding anchor and its name by one regex
+RE_ANCHOR_WITH_NAME = r'\([\&](?P<name>[a-zA-Z\._0-9]{1,})\)'
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+
+def setup_logging(path=os.path.join(BASE_DIR, 'config/logging.yaml')):
+    """
+    Configure logging of DRY by the logging config file 'path', or by the defaults of config.configure when it doesn't
+    exist. Importing DRY doesn't configure logging, applications call this once before using ConfigMerger.
+
+    :return: logger of DRY
+    """
+    from config.configure import setup_logging as _setup_logging
+
+    if _setup_logging(path=path, name="DRY") is None:
+        logger.info("Logging module configured by yaml configuration file")
+    return logger
+
+
+class ConfigIndex(object):
+    """
+    Index of all anchors and pointers in a config dictionary.
+
+    Every entry is a dict with 'key' (the dictionary key), 'parent' (keys from the root to the dict that holds 'key', as a tuple)
+    and 'owner' (entry of the innermost anchor that holds this entry in its value, or None).
+    Pointer entries also have 'value', the name of the anchor that pointer points to.
+    Entries are sorted like the keys of a flatten dictionary.
+    """
+
+    def __init__(self, delimiter=':'):
+        self.delimiter = delimiter
+        self.anchors = []
+        self.pointers = []
+
+    def join(self, path):
+        return self.delimiter.join(str(k) for k in path)
+
+    def add_anchor(self, parent, key, owner=None):
+        entry = {'parent': parent, 'key': key, 'owner': owner}
+        self.anchors.append(entry)
+        return entry
+
+    def add_pointer(self, parent, key, value, owner=None):
+        entry = {'parent': parent, 'key': key, 'value': value, 'owner': owner}
+        self.pointers.append(entry)
+        return entry
+
+    def add_tree(self, config_dict, pointer_pattern='->', anchor_start_pattern='(&', parent=(), owner=None):
+        """
+        Walk 'config_dict' once and add every anchor and pointer with its parent path. Lists are not walked, like a flatten
+        dictionary. Entries are not sorted, call 'sort' after the last walk.
+
+        :param pointer_pattern, anchor_start_pattern: patterns of ConfigMerger.
+        :param parent: path of 'config_dict' when it is a part of a bigger config.
+        :param owner: index entry of the innermost anchor that holds 'config_dict'.
+        :return: number of walked dicts
+        """
+        stack = [(parent, config_dict, owner)]
+        walked = 0
+        while stack:
+            parent, node, owner = stack.pop()
+            walked += 1
+            for key, value in node.items():
+                child_owner = owner
+                if isinstance(key, string_types):
+                    if pointer_pattern in key:
+                        self.add_pointer(parent, key, value, owner=owner)
+                    if anchor_start_pattern in key:
+                        child_owner = self.add_anchor(parent, key, owner=owner)
+                if isinstance(value, dict):
+                    stack.append((parent + (key,), value, child_owner))
+        return walked
+
+    def sort(self):
+        self.anchors.sort(key=lambda entry: self.join(entry['parent'] + (entry['key'],)))
+        self.pointers.sort(key=lambda entry: self.join(entry['parent'] + (entry['key'],)))
+
+
+class MergeStats(object):
+    """
+    Stats of a ConfigMerger with 'stats': wall time of every phase, counters of operations and merge time of every
+    pointer. Times of phases and counters are added up when a phase runs again (like 'remerge').
+
+    Counters:
+        deep_copies: copy.deepcopy of config or of an anchor for a pointer.
+        regex_evaluations: keys that are matched by 're_anchor' (keys with 'anchor_start_pattern').
+        path_lookups: walks of a key path from the root of config.
+        dicts_walked: dicts that are visited by indexing and cleaning config.
+        pointer_merges: pointers that are merged with their anchors.
+    """
+
+    def __init__(self, top=10):
+        """
+        :param top: number of slowest pointers in 'as_dict'.
+        """
+        self.top = top
+        self.phases = dict()  # phase -> seconds
+        self.counters = Counter()
+        self.pointer_times = []  # (seconds, key path of pointer parent, key path of anchor)
+
+    def add_time(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def update(self, other):
+        """
+        Add counters and pointer times of 'other', like stats of a worker process.
+        """
+        self.counters.update(other.counters)
+        self.pointer_times.extend(other.pointer_times)
+
+    def slowest_pointers(self, top=None):
+        """
+        :return: list of (seconds, pointer parent, anchor) of the 'top' slowest pointers, slowest first.
+        """
+        return heapq.nlargest(self.top if top is None else top, self.pointer_times, key=lambda item: item[0])
+
+    def as_dict(self):
+        """
+        :return: dict of 'phases' (phase -> seconds), 'counters' (name -> count), 'pointers' (number of merged pointers)
+          and 'slowest_pointers' (list of dicts of 'pointer', 'anchor' and 'seconds').
+        """
+        return {'phases': dict(self.phases),
+                'counters': dict(self.counters),
+                'pointers': len(self.pointer_times),
+                'slowest_pointers': [{'pointer': pointer, 'anchor': anchor, 'seconds': seconds}
+                                     for seconds, pointer, anchor in self.slowest_pointers()]}
+
+
+class LazyConfig(Mapping):
+    """
+    Read only view of a merged config. A dict that has a pointer is merged the first time it is accessed and kept for next
+    accesses, so only the parts of config that are read are merged. Keys are cleaned like 'ConfigMerger.clean_dict'.
+
+    Values are read by keys, config['database']['mysql'], or by a dotted key path, config['database.mysql'].
+    A dict that has pointers only in its children is a LazyConfig too, other dicts are cleaned dicts.
+    """
+
+    def __init__(self, merger, map_list, config_dict):
+        self._merger = merger
+        self._map_list = map_list
+        self._config_dict = config_dict
+        self._keys = None  # cleaned key -> key in config_dict
+        self._values = dict()
+
+    def _clean_keys(self):
+        if self._keys is None:
+            keys = dict()
+            anchors = []
+            for key in self._config_dict.keys():
+                if isinstance(key, string_types):
+                    if self._merger.pointer_pattern in key:
+                        continue
+                    if self._merger.find_anchors(key):
+                        anchors.append(key)
+                        continue
+                keys[key] = key
+            # Like cleaned dict, renamed anchors go after the other keys
+            for key in sorted(anchors):
+                keys[self._merger.clean_key(key)] = key
+            self._keys = keys
+        return self._keys
+
+    def __getitem__(self, key):
+        if key in self._values:
+            return self._values[key]
+        keys = self._clean_keys()
+        if key not in keys:
+            if isinstance(key, string_types) and '.' in key:
+                return self.get_path(key)
+            raise KeyError(key)
+
+        _stat, value = self._merger.lazy_value(self._map_list + (keys[key],))
+        if _stat == -1:
+            print("Merging of '{}' failed".format(key))
+            logger.error("Merging of '{}' failed".format(key))
+            raise KeyError(key)
+        self._values[key] = value
+        return value
+
+    def get_path(self, path, separator='.'):
+        """
+        :return: value of key path 'path', keys are separated by 'separator'
+        """
+        value = self
+        for key in path.split(separator):
+            if not isinstance(value, Mapping) or key not in value:
+                raise KeyError(path)
+            value = value[key]
+        return value
+
+    def __contains__(self, key):
+        return key in self._clean_keys()
+
+    def __iter__(self):
+        return iter(self._clean_keys())
+
+    def __len__(self):
+        return len(self._clean_keys())
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, list(self._clean_keys()))
+
+    def as_dict(self):
+        """
+        Merge all pointers of this view.
+        :return: cleaned dict
+        """
+        return dict((key, value.as_dict() if isinstance(value, LazyConfig) else value) for key, value in self.items())
 
 
 class ConfigMerger:
     def __init__(self, config_dict, merge_at_init, re_anchor=None, re_name=None, anchor_start_pattern='(&',
-                 pointer_pattern='->', delimiter=':'):
+                 pointer_pattern='->', delimiter=':', copy_on_write=False, inplace=False, incremental=False,
+                 lazy=False, list_strategies=None, index=None, workers=None, stats=False):
         """
         :param config_dict: input dictionary for do merging.
 
@@ -53,6 +269,39 @@ class ConfigMerger:
 
         :param delimiter: separator in flatten dictionary. the default is ':'
 
+        :param copy_on_write: share anchors with their pointers instead of deep-copying the anchor for every pointer. anchors are
+          frozen (FrozenMeldDict) before their first merge and merged dicts only copy the paths that pointers override, so the
+          merged dict shares unchanged subtrees and they can't be changed in place. the default is False
+
+        :param inplace: merge 'config_dict' itself instead of a deep copy of it, then 'self.config_dict' is 'config_dict'. the caller
+          gives 'config_dict' to the merger and must not use it for anything else, if merging fails it is left half merged.
+          the default is False
+
+        :param incremental: keep the source config and the merged config before cleaning, so 'remerge' can merge changes of the
+          source config again without merging everything. it keeps two more copies of config in memory and can't be used with
+          'inplace'. the default is False
+
+        :param lazy: don't merge pointers in 'merge', 'self.config_dict' is a LazyConfig that merges a pointer the first time its
+          dict is accessed. anchors and pointers are still validated in 'merge'. it can't be used with 'incremental'.
+          the default is False
+
+        :param list_strategies: how lists are merged when a pointer and its anchor both have a list in the same key, a dict of
+          key path -> strategy. key paths are tuples of keys or strings with 'delimiter' between keys, like the key paths of the
+          config before cleaning. strategies are 'append', 'replace', 'unique' or a callable like merge_by_key('name') (see
+          libs.melddict). lists at other key paths are appended. the default is None
+
+        :param index: ConfigIndex of 'config_dict' that is built while loading it (utils.stream_loader.load_config), then
+          'config_dict' isn't walked again for indexing anchors and pointers. the default is None
+
+        :param workers: number of processes for merging in parallel. anchors and pointers are split into groups that don't
+          share any anchor or key path, and every process merges some groups. values of groups are pickled to processes and
+          back, so 'list_strategies' must be picklable. None or 1 merges in this process, it isn't used with 'lazy'.
+          the default is None
+
+        :param stats: keep MergeStats of merging in 'self.stats': time of every phase, counters of deep copies, regex
+          evaluations and dict traversals, and the slowest pointers. True or the number of slowest pointers to keep (10 for
+          True). when it is False 'self.stats' is None and nothing is measured. the default is False
+
         Notes:
             Don't use a pointer as a list value(element), because we don't merge this pointer.
 
@@ -63,31 +312,86 @@ class ConfigMerger:
              For this example we fist of all merge 'anchor_3' then 'anchor_2' and finally 'anchor_1'.
         """
         try:
-            self.config_dict = copy.deepcopy(config_dict)
+            self.stats = None
+            if stats:
+                self.stats = MergeStats() if stats is True else MergeStats(top=stats)
+
+            if incremental and inplace:
+                print("'incremental' can't be used with 'inplace'")
+                logger.error("'incremental' can't be used with 'inplace'")
+                self.return_value = -1
+                return
+            if lazy and incremental:
+                print("'lazy' can't be used with 'incremental'")
+                logger.error("'lazy' can't be used with 'incremental'")
+                self.return_value = -1
+                return
+
+            self.inplace = inplace
+            if self.inplace:
+                self.config_dict = config_dict
+            else:
+                self.config_dict = self.run_phase('copy', copy.deepcopy, config_dict)
+                self.count('deep_copies')
+
+            self.incremental = incremental
+            self.source_dict = None
+            self.merged_dict = None
+            if self.incremental:
+                self.source_dict = self.run_phase('copy', copy.deepcopy, config_dict)
+                self.count('deep_copies')
+
+            self.lazy = lazy
+            self.lazy_dict = None  # config with anchor and pointer notions, pointers are merged in it when they are accessed
+            self.lazy_order = None  # pointer key -> position in merge order
+            self.lazy_anchor_paths = None  # anchor name -> key path of anchor
+            self.lazy_before = None  # pointer key -> keys of pointers that must be merged before it
+            self.lazy_pointers_under = None  # key path -> keys of pointers inside it
+            self.lazy_merged = set()  # keys of pointers that are merged
 
             if not re_anchor:
-                self.re_anchor = r'\([\&][a-zA-Z\._0-9]{1,}\)'
+                self.re_anchor = RE_ANCHOR
             else:
                 self.re_anchor = re_anchor
 
             if not re_name:
-                self.re_name = r'[a-zA-Z\._0-9]{1,}'
+                self.re_name = RE_NAME
             else:
                 self.re_name = re_name
+
+            # Compile regexes once, default regexes are combined to one regex
+            self._re_anchor = re.compile(self.re_anchor, re.I)
+            self._re_name = re.compile(self.re_name, re.I)
+            if self.re_anchor == RE_ANCHOR and self.re_name == RE_NAME:
+                self._re_anchor_with_name = re.compile(RE_ANCHOR_WITH_NAME, re.I)
+            else:
+                self._re_anchor_with_name = None
             self.anchor_start_pattern = anchor_start_pattern
             self.pointer_pattern = pointer_pattern
 
-            self.flatten_config = FlatDict(self.config_dict)
-
-            self.all_occurrence_of_anchors = []
-            for key in self.flatten_config.keys():
-                if self.anchor_start_pattern in key:
-                    self.all_occurrence_of_anchors.append(key)
-
-            self.all_occurrence_of_pointers = []
-            for key in self.flatten_config.keys():
-                if self.pointer_pattern in key:
-                    self.all_occurrence_of_pointers.append(key)
+            self.delimiter = delimiter
+            self.copy_on_write = copy_on_write
+            self.workers = workers
+
+            self.list_strategies = dict()  # key path -> list strategy of MeldDict
+            for path, strategy in (list_strategies or dict()).items():
+                if not callable(strategy) and strategy not in LIST_STRATEGIES:
+                    print("Unknown list strategy: {}".format(strategy))
+                    logger.error("Unknown list strategy: {}".format(strategy))
+                    self.return_value = -1
+                    return
+                if not isinstance(path, (tuple, list)):
+                    path = path.split(self.delimiter)
+                self.list_strategies[tuple(path)] = strategy
+
+            # One walk over the nested dict for finding all anchors and pointers
+            if index is None:
+                self.index = self.run_phase('index', self.build_index, self.config_dict)
+            else:
+                self.index = index
+                if self.index.delimiter != self.delimiter:
+                    self.index.delimiter = self.delimiter
+                    self.index.sort()
 
             self.valid_anchor_names = []
             self.valid_anchors = dict()
@@ -97,15 +401,6 @@ class ConfigMerger:
             self.return_value = 0
             self.recursive_dict_return_value = 0
 
-            self.delimiter = delimiter
-            # Setting delimiter
-            try:
-                if self.delimiter != ':':
-                    self.flatten_config.set_delimiter(self.delimiter)
-                    logger.info("Flatten dictionary delimiter set to: {}".format(self.delimiter))
-            except Exception as err:
-                logger.error(err)
-
             if merge_at_init:
                 self.merge()
 
@@ -115,13 +410,13 @@ class ConfigMerger:
     def merge(self):
         # TODO: Check for same/exact name in anchors key name: 'key_name' and 'key_name(&anchor_name)'. Name of keys without anchor_start_pattern must be diffrent.
         # Checking Anchors
-        _stat = self.anchor_validation()
+        _stat = self.run_phase('anchor_validation', self.anchor_validation)
         if _stat == -1:
             self.return_value = -1
             logger.error('Error in Config Merger')
             return -1
         # Checking Pointers
-        _stat = self.pointers_validation()
+        _stat = self.run_phase('pointers_validation', self.pointers_validation)
         if _stat == -1:
             self.return_value = -1
             logger.error('Error in Config Merger')
@@ -138,69 +433,478 @@ class ConfigMerger:
         #         self.return_value = -1
         #         return -1
 
+        if self.lazy:
+            # Pointers are merged by LazyConfig when they are accessed
+            _stat = self.run_phase('prepare_lazy', self.prepare_lazy)
+            if _stat == -1:
+                self.return_value = -1
+                logger.error('Error in Config Merger')
+                return -1
+            self.lazy_dict = self.config_dict
+            self.config_dict = LazyConfig(self, (), self.lazy_dict)
+            self.return_value = 1
+            return 1
+
         # Merging...
-        _stat = self.merge_pointers_with_anchors(valid_anchors=self.valid_anchors, valid_pointers=self.valid_pointers)
+        if self.workers is not None and self.workers > 1:
+            _stat = self.run_phase('merge', self.merge_parallel, valid_anchors=self.valid_anchors,
+                                   valid_pointers=self.valid_pointers)
+        else:
+            _stat = self.run_phase('merge', self.merge_pointers_with_anchors, valid_anchors=self.valid_anchors,
+                                   valid_pointers=self.valid_pointers)
         if _stat == -1:
             self.return_value = -1
             logger.error('Error in Config Merger')
             return -1
+        if self.incremental:
+            # Keep merged dict with anchor and pointer notions for remerge
+            self.merged_dict = self.config_dict
         # Removing anchor and pointer notions
-        self.config_dict = self.clean_dict(self.config_dict)
+        self.config_dict = self.run_phase('clean_dict', self.clean_dict, self.config_dict, inplace=self.inplace)
         if self.config_dict == -1:
             return -1
 
         self.return_value = 1
         return 1
 
+    def run_phase(self, phase, func, *args, **kwargs):
+        """
+        Call 'func' and add its wall time to 'phase' of 'self.stats'.
+        :return: return value of 'func'
+        """
+        if self.stats is None:
+            return func(*args, **kwargs)
+        start = _clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.stats.add_time(phase, _clock() - start)
+
+    def count(self, name, number=1):
+        """
+        Add 'number' to counter 'name' of 'self.stats'.
+        """
+        if self.stats is not None:
+            self.stats.counters[name] += number
+
+    def remerge(self, changes):
+        """
+        Apply 'changes' to the source config and merge again only the parts of config that depend on them, 'self.config_dict' is
+        updated in place. The merger must be created with 'incremental' and merged before.
+
+        Parts that are merged again are the changed paths, anchors that hold a changed path or depend on a changed anchor, and
+        pointers to those anchors. A part inside a pointer is merged again from that pointer.
+
+        :param changes: list of changes of the source config:
+            ('set', map_list, value): set value of key path 'map_list', the key is added if it doesnt exist
+            ('del', map_list): delete key path 'map_list'
+        :return: 1, -1 on error. If a change is not valid, no change is applied and the merger can still be used. After any
+          other error, like a pointer to an anchor that doesnt exist any more, 'self.return_value' is -1 and the merger must be
+          created again.
+        """
+        try:
+            if not self.incremental or self.return_value != 1:
+                print("Merger must be incremental and merged before remerge")
+                logger.error("Merger must be incremental and merged before remerge")
+                return -1
+
+            changed_paths = self.apply_changes(changes)
+            if changed_paths == -1:
+                return -1
+            changed_paths = self.outermost_paths(changed_paths)
+            # Removed pointers around changed paths must be merged again as well
+            removed_pointer_parents = [pointer['parent'] for pointer in self.valid_pointers.values()
+                                       if any(self.is_inside(path, pointer['parent']) for path in changed_paths)]
+
+            # Update index: drop entries inside changed paths, then walk the new values
+            _is_inside = lambda entry: any(self.is_inside(entry['parent'] + (entry['key'],), path) for path in changed_paths)
+            self.index.anchors = [entry for entry in self.index.anchors if not _is_inside(entry)]
+            self.index.pointers = [entry for entry in self.index.pointers if not _is_inside(entry)]
+            for path in changed_paths:
+                parent = self.parent_from_dict(self.source_dict, path)
+                if parent == -1:
+                    self.return_value = -1
+                    return -1
+                if path[-1] not in parent:
+                    continue
+                owner = None
+                for entry in self.index.anchors:
+                    anchor_path = entry['parent'] + (entry['key'],)
+                    if self.is_inside(path, anchor_path) and (owner is None or len(anchor_path) > len(owner['parent']) + 1):
+                        owner = entry
+                self.build_index({path[-1]: parent[path[-1]]}, index=self.index, parent=path[:-1], owner=owner)
+            self.index.sort()
+
+            self.valid_anchor_names = []
+            self.valid_anchors = dict()
+            self.valid_pointers = dict()
+            if self.anchor_validation() == -1 or self.pointers_validation() == -1:
+                self.return_value = -1
+                return -1
+
+            roots = self.remerge_roots(changed_paths + removed_pointer_parents)
+            if () in roots:
+                # Whole config must be merged again, keep the same merged dict object
+                self.merged_dict = copy.deepcopy(self.source_dict)
+                self.count('deep_copies')
+                _stat = self.merge_pointers_with_anchors(valid_anchors=self.valid_anchors, valid_pointers=self.valid_pointers,
+                                                         config_dict=self.merged_dict)
+                cleaned = self.clean_dict(self.merged_dict) if _stat != -1 else -1
+                if cleaned == -1:
+                    self.return_value = -1
+                    return -1
+                self.config_dict.clear()
+                self.config_dict.update(cleaned)
+                return 1
+
+            # Merged values of roots are built again from the source config
+            for path in roots:
+                parent = self.parent_from_dict(self.source_dict, path)
+                merged_parent = self.parent_from_dict(self.merged_dict, path)
+                if parent == -1 or merged_parent == -1:
+                    self.return_value = -1
+                    return -1
+                if path[-1] in parent:
+                    merged_parent[path[-1]] = copy.deepcopy(parent[path[-1]])
+                    self.count('deep_copies')
+                elif path[-1] in merged_parent:
+                    del merged_parent[path[-1]]
+
+            _stat = self.merge_pointers_with_anchors(valid_anchors=self.valid_anchors, valid_pointers=self.valid_pointers,
+                                                     only_under=roots, config_dict=self.merged_dict)
+            if _stat == -1:
+                self.return_value = -1
+                return -1
+
+            # Clean merged values of roots into the merged config
+            for path in roots:
+                merged_parent = self.parent_from_dict(self.merged_dict, path)
+                clean_path = tuple(self.clean_key(key) for key in path)
+                parent = self.parent_from_dict(self.config_dict, clean_path)
+                if merged_parent == -1 or parent == -1:
+                    self.return_value = -1
+                    return -1
+                if path[-1] not in merged_parent:
+                    if clean_path[-1] in parent:
+                        del parent[clean_path[-1]]
+                    continue
+                value = merged_parent[path[-1]]
+                if isinstance(value, dict):
+                    value = self.clean_dict(value)
+                    if value == -1:
+                        self.return_value = -1
+                        return -1
+                parent[clean_path[-1]] = value
+
+            return 1
+
+        except Exception as err:
+            logger.error(err, exc_info=True)
+            self.return_value = -1
+            return -1
+
+    def apply_changes(self, changes):
+        """
+        Apply 'changes' of 'remerge' to the source config. If a change is not valid, the changes before it are undone, so
+        the source config is not changed.
+        :return: list of changed paths, -1 if a change is not valid
+        """
+        undo = []  # (parent, key, old value), 'missing' if key didnt exist
+        missing = object()
+        try:
+            for change in changes:
+                action, map_list = change[0], tuple(change[1])
+                if action not in ('set', 'del'):
+                    print("Change is not valid: {}".format(action))
+                    logger.error("Change is not valid: {}".format(action))
+                    break
+                parent = self.parent_from_dict(self.source_dict, map_list)
+                if parent == -1:
+                    break
+                undo.append((parent, map_list[-1], parent.get(map_list[-1], missing)))
+                if action == 'set':
+                    parent[map_list[-1]] = change[2]
+                elif map_list[-1] in parent:
+                    del parent[map_list[-1]]
+            else:
+                return [tuple(change[1]) for change in changes]
+        except Exception as err:
+            logger.error("Change is not valid: {}".format(err), exc_info=True)
+
+        for parent, key, value in reversed(undo):
+            if value is missing:
+                parent.pop(key, None)
+            else:
+                parent[key] = value
+        return -1
+
+    def remerge_roots(self, changed_paths):
+        """
+        Find paths of the merged config that must be merged again for 'changed_paths' of the source config.
+        :return: list of paths, none of them is inside another one
+        """
+        anchor_paths = dict((anchor_key, anchor['parent'] + (anchor_key,)) for anchor_key, anchor in self.valid_anchors.items())
+        consumers = dict((anchor['name'][0], []) for anchor in self.valid_anchors.values())
+        anchor_keys_by_name = dict((anchor['name'][0], anchor_key) for anchor_key, anchor in self.valid_anchors.items())
+        for pointer in self.valid_pointers.values():
+            consumers[pointer['name']].append(pointer['parent'])
+
+        roots = list(changed_paths)
+        affected = set()
+        changed = True
+        while changed:
+            changed = False
+            _roots = []
+            for path in roots:
+                # A merged pointer around the path, or a key that changes the name of path in cleaned dict, must be merged again
+                for pointer in self.valid_pointers.values():
+                    if len(pointer['parent']) < len(path) and self.is_inside(path, pointer['parent']):
+                        path = pointer['parent']
+                for depth in range(1, len(path) + 1):
+                    if self.has_clean_name_conflict(path[:depth]):
+                        path = path[:depth - 1]
+                        break
+                # Frozen dicts can't be changed, merge again from the first dict that can be changed
+                while path and isinstance(self.dict_on_path(self.merged_dict, path[:-1]), FrozenMeldDict):
+                    path = path[:-1]
+                _roots.append(path)
+            _roots = self.outermost_paths(_roots)
+            if set(_roots) != set(roots):
+                changed = True
+            roots = _roots
+
+            # Anchors around or inside roots are changed, so pointers to them must be merged again
+            for anchor_key, anchor_path in anchor_paths.items():
+                if anchor_key in affected:
+                    continue
+                if any(self.is_inside(anchor_path, path) or self.is_inside(path, anchor_path) for path in roots):
+                    affected.add(anchor_key)
+                    roots.extend(consumers[self.valid_anchors[anchor_key]['name'][0]])
+                    changed = True
+
+            # An anchor inside a merged pointer is changed by that merge, replaying a pointer to it needs that pointer again
+            for pointer in self.valid_pointers.values():
+                if not any(self.is_inside(pointer['parent'], path) for path in roots):
+                    continue
+                anchor_path = anchor_paths[anchor_keys_by_name[pointer['name']]]
+                for other in self.valid_pointers.values():
+                    if len(other['parent']) < len(anchor_path) and self.is_inside(anchor_path, other['parent']) and \
+                            not any(self.is_inside(other['parent'], path) for path in roots):
+                        roots.append(other['parent'])
+                        changed = True
+
+        return self.outermost_paths(roots)
+
+    def prepare_lazy(self):
+        """
+        Find merge order of pointers and pointers inside every key path for 'lazy_value'.
+        :return: 1, -1 if there is a cycle in anchors
+        """
+        pointer_order = self.pointer_merge_order(self.valid_anchors, self.valid_pointers)
+        if pointer_order == -1:
+            return -1
+        self.lazy_order = dict((pointer_key, position) for position, pointer_key in enumerate(pointer_order))
+        self.lazy_anchor_paths = dict((anchor['name'][0], anchor['parent'] + (anchor_key,))
+                                      for anchor_key, anchor in self.valid_anchors.items())
+        self.lazy_pointers_under = dict()
+        pointers_by_parent = dict()
+        consumers = dict()
+        for pointer_key, pointer in self.valid_pointers.items():
+            for depth in range(len(pointer['parent']) + 1):
+                self.lazy_pointers_under.setdefault(pointer['parent'][:depth], []).append(pointer_key)
+            pointers_by_parent.setdefault(pointer['parent'], []).append(pointer_key)
+            consumers.setdefault(pointer['name'], []).append(pointer_key)
+
+        # A pointer around an anchor changes the anchor when it is merged. Pointers to that anchor must be merged in the same
+        # order as a full merge, so they see the same anchor value.
+        self.lazy_before = dict()
+        for name, anchor_path in self.lazy_anchor_paths.items():
+            for depth in range(len(anchor_path)):
+                for pointer_key in pointers_by_parent.get(anchor_path[:depth], []):
+                    for consumer_key in consumers.get(name, []):
+                        if self.lazy_order[consumer_key] < self.lazy_order[pointer_key]:
+                            self.lazy_before.setdefault(pointer_key, []).append(consumer_key)
+                        else:
+                            self.lazy_before.setdefault(consumer_key, []).append(pointer_key)
+        self.lazy_merged = set()
+        return 1
+
+    def lazy_value(self, map_list):
+        """
+        Merged and cleaned value of key path 'map_list' for LazyConfig. A dict that has a pointer is merged with all pointers
+        inside it, a dict that only has pointers deeper is returned as a LazyConfig.
+        :return: (1, value), (-1, None) on error
+        """
+        parent = self.dict_on_path(self.lazy_dict, map_list[:-1])
+        if parent is None or map_list[-1] not in parent:
+            return -1, None
+        value = parent[map_list[-1]]
+        if not isinstance(value, dict):
+            return 1, value
+        pointer_keys = self.lazy_pointers_under.get(map_list, [])
+        if not pointer_keys:
+            value = self.clean_dict(value)
+            return (-1, None) if value == -1 else (1, value)
+        if not any(self.valid_pointers[pointer_key]['parent'] == map_list for pointer_key in pointer_keys):
+            return 1, LazyConfig(self, map_list, value)
+
+        if self.merge_lazy(pointer_keys) == -1:
+            return -1, None
+        value = parent[map_list[-1]]
+        if isinstance(value, dict):
+            value = self.clean_dict(value)
+        return (-1, None) if value == -1 else (1, value)
+
+    def merge_lazy(self, pointer_keys):
+        """
+        Merge pointers of 'pointer_keys' that are not merged yet, with all pointers inside the anchors they point to.
+        :return: 1, -1 on error
+        """
+        try:
+            needed = set()
+            stack = list(pointer_keys)
+            while stack:
+                pointer_key = stack.pop()
+                if pointer_key in needed or pointer_key in self.lazy_merged:
+                    continue
+                needed.add(pointer_key)
+                # Pointers inside the pointer dict and the anchor must be merged before
+                pointer = self.valid_pointers[pointer_key]
+                stack.extend(self.lazy_pointers_under[pointer['parent']])
+                stack.extend(self.lazy_pointers_under.get(self.lazy_anchor_paths[pointer['name']], []))
+                stack.extend(self.lazy_before.get(pointer_key, []))
+
+            for pointer_key in sorted(needed, key=lambda key: self.lazy_order[key]):
+                pointer = self.valid_pointers[pointer_key]
+                stat = self.merge_pointer(self.lazy_dict, pointer['parent'], self.lazy_anchor_paths[pointer['name']])
+                if stat == -1:
+                    return -1
+                self.lazy_merged.add(pointer_key)
+            return 1
+
+        except Exception as err:
+            logger.error(err, exc_info=True)
+            return -1
+
+    def has_clean_name_conflict(self, path):
+        """
+        Check for another key in the dict of 'path' that has the same name as the last key of 'path' in cleaned dict.
+        """
+        parent = self.dict_on_path(self.merged_dict, path[:-1])
+        if parent is None:
+            return False
+        name = self.clean_key(path[-1])
+        return any(key != path[-1] and self.clean_key(key) == name for key in parent.keys())
+
+    @staticmethod
+    def dict_on_path(config_dict, map_list):
+        """
+        :return: dict of key path 'map_list' in 'config_dict', None if there isn't any
+        """
+        for key in map_list:
+            config_dict = config_dict.get(key)
+            if not isinstance(config_dict, dict):
+                return None
+        return config_dict
+
+    @staticmethod
+    def is_inside(path, other):
+        """
+        Check for 'path' being 'other' or inside of it.
+        """
+        return path[:len(other)] == other
+
+    @staticmethod
+    def outermost_paths(paths):
+        """
+        :return: paths that are not inside another path of 'paths', without duplicates
+        """
+        outermost = []
+        for path in sorted(set(paths), key=len):
+            if not any(path[:len(other)] == other for other in outermost):
+                outermost.append(path)
+        return outermost
+
+    def build_index(self, config_dict, index=None, parent=(), owner=None):
+        """
+        Walk 'config_dict' once and record every anchor and pointer with its parent path.
+        Like a flatten dictionary, lists are not walked, so anchors and pointers inside lists are not found.
+
+        :param index: add entries to this index instead of a new one.
+        :param parent: path of 'config_dict' when it is a part of a bigger config.
+        :param owner: index entry of the innermost anchor that holds 'config_dict'.
+        :return: ConfigIndex
+        """
+        if index is None:
+            index = ConfigIndex(delimiter=self.delimiter)
+        walked = index.add_tree(config_dict, self.pointer_pattern, self.anchor_start_pattern, parent=parent, owner=owner)
+        self.count('dicts_walked', walked)
+        index.sort()
+        return index
+
+    def find_anchors(self, key):
+        """
+        Find anchors in dictionary key 'key' by 're_anchor' and their names by 're_name'.
+        Regexes run only for keys with 'anchor_start_pattern'.
+        :return: list of (anchor, names) for every anchor in key, names is the list of 're_name' matches in anchor.
+          None if there isn't any anchor.
+        """
+        if not isinstance(key, string_types) or self.anchor_start_pattern not in key:
+            return None
+        self.count('regex_evaluations')
+        if self._re_anchor_with_name is not None:
+            anchors = [(match.group(0), [match.group('name')]) for match in self._re_anchor_with_name.finditer(key)]
+        else:
+            anchors = [(_anchor, self._re_name.findall(_anchor) or None) for _anchor in self._re_anchor.findall(key)]
+        return anchors or None
+
     def anchor_validation(self):
         try:
             # Checking for anchor occurrence and position and number of anchors in each key
-            for key in self.all_occurrence_of_anchors:
-                _key = key.split(self.delimiter)
-                parent_idx = 0
-                for k in _key:
-                    _anchor = find_with_regex(k, self.re_anchor)
-                    if _anchor:
-                        _missing = object()
-                        _return = self.valid_anchors.get(k, _missing)
-                        _return_parent = object()
-                        if _return is not _missing:
-                            _return_parent = self.valid_anchors[k].get('parent', _missing)
-
-                        if _return is _missing or _return_parent is _missing:
-
-                            if len(_anchor) > 1:
-                                logger.error("We dont support multiple anchor in one key. ERROR Key is: {}".format(key))
-                                print("We dont support multiple anchor in one key. ERROR Key is: {}".format(key))
-                                return -1
+            for anchor in self.index.anchors:
+                k = anchor['key']
+                _anchors = self.find_anchors(k)
+                if not _anchors:
+                    continue
+                _anchor = [_anchor for _anchor, _names in _anchors]
+                key = self.index.join(anchor['parent'] + (k,))
+
+                if k in self.valid_anchors:
+                    # Same anchor key in another parent
+                    print("There is duplicate in anchors name and name is: {}".format(key))
+                    logger.error("There is duplicate in anchors name and name is: {}".format(key))
+                    return -1
 
-                            if len(k) <= len(_anchor[0]):
-                                # Key Name length must be greater than zero
-                                logger.error("Length of key name (except anchor length) must be greater than one. ERROR Key is: {}".format(k))
-                                print("Length of key name (except anchor length) must be greater than one. ERROR Key is: {}".format(k))
-                                return -1
+                if len(_anchor) > 1:
+                    logger.error("We dont support multiple anchor in one key. ERROR Key is: {}".format(key))
+                    print("We dont support multiple anchor in one key. ERROR Key is: {}".format(key))
+                    return -1
 
-                            if k[0:len(_anchor[0])] == _anchor[0]:
-                                # Key Name cant start with anchor
-                                logger.error("Key name cant start with anchor. ERROR Key is: {}".format(k))
-                                print("Key name cant start with anchor. ERROR Key is: {}".format(k))
-                                return -1
+                if len(k) <= len(_anchor[0]):
+                    # Key Name length must be greater than zero
+                    logger.error("Length of key name (except anchor length) must be greater than one. ERROR Key is: {}".format(k))
+                    print("Length of key name (except anchor length) must be greater than one. ERROR Key is: {}".format(k))
+                    return -1
 
-                            _start_idx = len(k) - len(_anchor[0])
-                            if k[_start_idx:] != _anchor[0]:
-                                # Anchor must be end of key name
-                                logger.error("Anchor must be end of key name. ERROR Key is: {}".format(k))
-                                print("Anchor must be end of key name. ERROR Key is: {}".format(k))
-                                return -1
+                if k[0:len(_anchor[0])] == _anchor[0]:
+                    # Key Name cant start with anchor
+                    logger.error("Key name cant start with anchor. ERROR Key is: {}".format(k))
+                    print("Key name cant start with anchor. ERROR Key is: {}".format(k))
+                    return -1
 
-                            self.valid_anchors[k] = dict()
-                            self.valid_anchors[k]['parent'] = _key[0:parent_idx]
-                            self.valid_anchors[k]['name'] = find_with_regex(_anchor[0], self.re_name)
-                            self.valid_anchors[k]['processed'] = False
+                _start_idx = len(k) - len(_anchor[0])
+                if k[_start_idx:] != _anchor[0]:
+                    # Anchor must be end of key name
+                    logger.error("Anchor must be end of key name. ERROR Key is: {}".format(k))
+                    print("Anchor must be end of key name. ERROR Key is: {}".format(k))
+                    return -1
 
-                            self.valid_anchor_names.append(find_with_regex(_anchor[0], self.re_name))
+                self.valid_anchors[k] = dict()
+                self.valid_anchors[k]['parent'] = anchor['parent']
+                self.valid_anchors[k]['name'] = _anchors[0][1]
+                self.valid_anchors[k]['anchor'] = self.owner_anchor(anchor)
 
-                    parent_idx += 1
+                self.valid_anchor_names.append(_anchors[0][1])
 
             self.valid_anchor_names = [p[0] for p in self.valid_anchor_names]
             # Check for duplicate anchor names
@@ -216,48 +920,52 @@ class ConfigMerger:
             logger.error(err, exc_info=True)
             return -1
 
+    def owner_anchor(self, entry):
+        """
+        Key of the innermost valid anchor that holds the index 'entry' in its value, None if there isn't any.
+        Anchors are checked from inside to outside, so 'self.valid_anchors' must be filled for all outer anchors.
+        """
+        owner = entry['owner']
+        while owner is not None and owner['key'] not in self.valid_anchors:
+            owner = owner['owner']
+        if owner is None:
+            return None
+        return owner['key']
+
     def pointers_validation(self):
         try:
             # Checking Pointers
             duplicate_counter = 1
-            for key in self.all_occurrence_of_pointers:
-                _key = key.split(self.delimiter)
-                parent_idx = 0
-                for k in _key:
-                    if self.pointer_pattern in k:
-                        _parent = _key[0:parent_idx]
-                        pointer_value = self.flatten_config[self.delimiter.join(_parent) + self.delimiter + k]
-                        if not isinstance(pointer_value, string_types):
-                            logger.error("Value of pointer key is not valid. value is: {}".format(pointer_value))
-                            print("Value of pointer key is not valid. value is: {}".format(pointer_value))
-                            return -1
-                        _pointer_name = pointer_value
+            for pointer in self.index.pointers:
+                _parent = pointer['parent']
+                if not _parent:
+                    logger.error("Pointer must have a parent key. ERROR Key is: {}".format(pointer['key']))
+                    print("Pointer must have a parent key. ERROR Key is: {}".format(pointer['key']))
+                    return -1
 
-                        _missing = object()
-                        _return_key = self.valid_pointers.get(self.pointer_pattern, _missing)
-                        # _return_key = self.valid_pointers.get(k, _missing)
-                        if _return_key is _missing:
-                            self.valid_pointers[self.pointer_pattern] = dict()
-                            self.valid_pointers[self.pointer_pattern]['parent'] = _parent
-                            self.valid_pointers[self.pointer_pattern]['name'] = _pointer_name
-                            self.valid_pointers[self.pointer_pattern]['key'] = k
+                pointer_value = pointer['value']
+                if not isinstance(pointer_value, string_types):
+                    logger.error("Value of pointer key is not valid. value is: {}".format(pointer_value))
+                    print("Value of pointer key is not valid. value is: {}".format(pointer_value))
+                    return -1
+                _pointer_name = pointer_value
 
-                        else:
-                            self.valid_pointers[self.pointer_pattern + '_' + str(duplicate_counter)] = dict()
-                            self.valid_pointers[self.pointer_pattern + '_' + str(duplicate_counter)]['parent'] = _parent
-                            self.valid_pointers[self.pointer_pattern + '_' + str(duplicate_counter)]['name'] = _pointer_name
-                            self.valid_pointers[self.pointer_pattern + '_' + str(duplicate_counter)]['key'] = k
-
-                            duplicate_counter += 1
-
-                            # if _pointer_name.rsplit(self.pointer_to_anchor_notion)[-1][0:-1] not in self.valid_anchor_names:
-                            # pointer_name = find_with_regex(_pointer_name, self.re_name)
-                            if _pointer_name not in self.valid_anchor_names:
-                                print("There is a pointer that not match to the anchors and pointer is: {}".format(_pointer_name))
-                                logger.error("There is a pointer that not match to the anchors and pointer is: {}".format(_pointer_name))
-                                return -1
+                if _pointer_name not in self.valid_anchor_names:
+                    print("There is a pointer that not match to the anchors and pointer is: {}".format(_pointer_name))
+                    logger.error("There is a pointer that not match to the anchors and pointer is: {}".format(_pointer_name))
+                    return -1
+
+                if self.pointer_pattern not in self.valid_pointers:
+                    pointer_key = self.pointer_pattern
+                else:
+                    pointer_key = self.pointer_pattern + '_' + str(duplicate_counter)
+                    duplicate_counter += 1
 
-                    parent_idx += 1
+                self.valid_pointers[pointer_key] = dict()
+                self.valid_pointers[pointer_key]['parent'] = _parent
+                self.valid_pointers[pointer_key]['name'] = _pointer_name
+                self.valid_pointers[pointer_key]['key'] = pointer['key']
+                self.valid_pointers[pointer_key]['anchor'] = self.owner_anchor(pointer)
 
             return 1
 
@@ -266,363 +974,582 @@ class ConfigMerger:
             return -1
 
     def get_from_dict(self, config_dict, map_list):
+        """
+        Get value of the key path 'map_list' (tuple or list of keys) from 'config_dict'.
+        :return: value, -1 if a key doesnt exist
+        """
         try:
-            if map_list:
-                first, rest = map_list[0], map_list[1:]
-
-                if rest:
-                    # if `rest` is not empty, run the function recursively
-                    _missing = object()
-                    _return = config_dict.get(first, _missing)
-                    if _return is _missing:
-                        # Key doesnt exist
-                        print("Key doesnt exist: {}".format(first))
-                        logger.error("Key doesnt exist: {}".format(first))
-                        self.recursive_dict_return_value = -1
-                        return -1
-                    else:
-                        return self.get_from_dict(config_dict[first], rest)
-                else:
-                    _missing = object()
-                    _return = config_dict.get(first, _missing)
-                    if _return is _missing:
-                        # Key doesnt exist
-                        print("Key doesnt exist: {}".format(first))
-                        logger.error("Key doesnt exist: {}".format(first))
-                        self.recursive_dict_return_value = -1
-                        return -1
-
-                    else:
-                        self.recursive_dict_return_value = 1
-                        return config_dict[first]
-            else:
+            if not map_list:
                 print('Map list is empty')
                 logger.error('Map list is empty')
                 self.recursive_dict_return_value = -1
                 return -1
 
+            self.count('path_lookups')
+            value = config_dict
+            for key in map_list:
+                _missing = object()
+                value = value.get(key, _missing)
+                if value is _missing:
+                    # Key doesnt exist
+                    print("Key doesnt exist: {}".format(key))
+                    logger.error("Key doesnt exist: {}".format(key))
+                    self.recursive_dict_return_value = -1
+                    return -1
+
+            self.recursive_dict_return_value = 1
+            return value
+
         except Exception as err:
             logger.error(err, exc_info=True)
             self.recursive_dict_return_value = -1
             return -1
 
+    def parent_from_dict(self, config_dict, map_list):
+        """
+        Get the dict that holds the last key of 'map_list', all keys before the last one must be dicts.
+        :return: dict, -1 if a key doesnt exist or is not a dict
+        """
+        if not map_list:
+            print('Map list is empty')
+            logger.error('Map list is empty')
+            self.recursive_dict_return_value = -1
+            return -1
+
+        self.count('path_lookups')
+        parent = config_dict
+        for key in map_list[:-1]:
+            if key not in parent:
+                print("key: {} doesnt exist".format(key))
+                logger.error("key: {} doesnt exist".format(key))
+                self.recursive_dict_return_value = -1
+                return -1
+            parent = parent[key]
+            if not isinstance(parent, dict):
+                print("key: {} is not a dict".format(key))
+                logger.error("key: {} is not a dict".format(key))
+                self.recursive_dict_return_value = -1
+                return -1
+
+        return parent
+
     def set_in_dict(self, config_dict, map_list, value):
+        """
+        Set value of the existing key path 'map_list' (tuple or list of keys) in 'config_dict'.
+        :return: 1, -1 if a key doesnt exist
+        """
         try:
-            if map_list:
-                first, rest = map_list[0], map_list[1:]
-
-                if rest:
-                    try:
-                        if not isinstance(config_dict[first], dict):
-                            print("key: {} is not a dict".format(first))
-                            logger.error("key: {} is not a dict".format(first))
-                            # if the key is not a dict, then make it a dict
-                            # config_dict[first] = {}
-                            self.recursive_dict_return_value = -1
-                            return -1
-                    except KeyError:
-                        # if key doesn't exist, create one
-                        # config_dict[first] = {}
-                        print("key: {} doesnt exist".format(first))
-                        logger.error("key: {} doesnt exist".format(first))
-                        self.recursive_dict_return_value = -1
-                        return -1
+            parent = self.parent_from_dict(config_dict, map_list)
+            if parent == -1:
+                return -1
 
-                    self.set_in_dict(config_dict[first], rest, value)
-                else:
-                    _missing = object()
-                    _return = config_dict.get(first, _missing)
-                    if _return is not _missing:
-                        config_dict[first] = value
-                        self.recursive_dict_return_value = 1
-                    else:
-                        print("At the end, key: {first} doesnt exist").format(first)
-                        logger.error("At the end, key: {} doesnt exist".format(first))
-                        self.recursive_dict_return_value = -1
-                        return -1
-            else:
-                print('Map list is empty')
-                logger.error('Map list is empty')
+            if map_list[-1] not in parent:
+                print("At the end, key: {} doesnt exist".format(map_list[-1]))
+                logger.error("At the end, key: {} doesnt exist".format(map_list[-1]))
                 self.recursive_dict_return_value = -1
                 return -1
 
+            parent[map_list[-1]] = value
+            self.recursive_dict_return_value = 1
+            return 1
+
         except Exception as err:
             logger.error(err, exc_info=True)
             self.recursive_dict_return_value = -1
             return -1
 
     def del_in_dict(self, config_dict, map_list, rename=False, new_name=None):
+        """
+        Delete the key path 'map_list' (tuple or list of keys) from 'config_dict', or rename its last key to 'new_name'.
+        :return: 1, -1 if a key doesnt exist
+        """
         try:
-            if map_list:
-                first, rest = map_list[0], map_list[1:]
-                if first and rest:
-                    try:
-                        if not isinstance(config_dict[first], dict):
-                            print('list map key is not a dict')
-                            logger.error('list map key is not a dict')
-                            # if the key is not a dict, then make it a dict
-                            # config_dict[first] = {}
-                            self.recursive_dict_return_value = -1
-                            return -1
+            parent = self.parent_from_dict(config_dict, map_list)
+            if parent == -1:
+                return -1
 
-                    except KeyError:
-                        # if key doesn't exist, create one
-                        # config_dict[first] = {}
-                        print("key: {} doesnt exist".format(first))
-                        logger.error("key: {} doesnt exist".format(first))
-                        self.recursive_dict_return_value = -1
-                        return -1
+            if map_list[-1] not in parent:
+                # Key doesnt exist
+                print("Key doesnt exist: {}".format(map_list[-1]))
+                logger.error("Key doesnt exist: {}".format(map_list[-1]))
+                self.recursive_dict_return_value = -1
+                return -1
 
-                    self.del_in_dict(config_dict[first], rest, rename=rename, new_name=new_name)
-                else:
-                    if not first and len(rest) == 1:
-                        if rename:
-                            rest = rest[0]
-                            config_dict[new_name] = config_dict[rest]
-                            del config_dict[rest]
+            if rename:
+                parent[new_name] = parent[map_list[-1]]
+            del parent[map_list[-1]]
+            self.recursive_dict_return_value = 1
+            return 1
 
-                        else:
-                            del config_dict[rest]
+        except Exception as err:
+            logger.error(err, exc_info=True)
+            self.recursive_dict_return_value = -1
+            return -1
 
-                        self.recursive_dict_return_value = 1
-                        return 1
-                    else:
-                        # config_dict[first] = value
-                        _missing = object()
-                        _return = config_dict.get(first, _missing)
-                        if _return is _missing:
-                            # Key doesnt exist
-                            print("Key doesnt exist: {}".format(first))
-                            logger.error("Key doesnt exist: {}".format(first))
+    def batch_in_dict(self, config_dict, operations):
+        """
+        Apply many operations to 'config_dict' in one walk over it. Operations are tuples of:
+            ('set', map_list, value): set value of the existing key path 'map_list'
+            ('del', map_list): delete the key path 'map_list'
+            ('rename', map_list, new_name): rename the last key of 'map_list' to 'new_name'
+
+        Every dict on the paths is visited once. Operations inside a key are applied before operations on that key, operations on
+        the same dict are applied in the given order.
+        :return: 1, -1 if a key doesnt exist
+        """
+        try:
+            # Group operations by the path of the dict that they change
+            root = {'children': dict(), 'operations': []}
+            for operation in operations:
+                map_list = operation[1]
+                if not map_list:
+                    print('Map list is empty')
+                    logger.error('Map list is empty')
+                    self.recursive_dict_return_value = -1
+                    return -1
+                node = root
+                for key in map_list[:-1]:
+                    if key not in node['children']:
+                        node['children'][key] = {'children': dict(), 'operations': []}
+                    node = node['children'][key]
+                node['operations'].append(operation)
+
+            stack = [(root, config_dict, False)]
+            while stack:
+                node, _dict, children_done = stack.pop()
+                if not children_done:
+                    stack.append((node, _dict, True))
+                    for key, child in node['children'].items():
+                        if key not in _dict:
+                            print("key: {} doesnt exist".format(key))
+                            logger.error("key: {} doesnt exist".format(key))
                             self.recursive_dict_return_value = -1
                             return -1
-                        else:
-                            if rename:
-                                config_dict[new_name] = config_dict[first]
-                                del config_dict[first]
-
-                            else:
-                                del config_dict[first]
+                        if not isinstance(_dict[key], dict):
+                            print("key: {} is not a dict".format(key))
+                            logger.error("key: {} is not a dict".format(key))
+                            self.recursive_dict_return_value = -1
+                            return -1
+                        stack.append((child, _dict[key], False))
+                    continue
+
+                for operation in node['operations']:
+                    action, key = operation[0], operation[1][-1]
+                    if key not in _dict:
+                        print("At the end, key: {} doesnt exist".format(key))
+                        logger.error("At the end, key: {} doesnt exist".format(key))
+                        self.recursive_dict_return_value = -1
+                        return -1
+                    if action == 'set':
+                        _dict[key] = operation[2]
+                    elif action == 'del':
+                        del _dict[key]
+                    elif action == 'rename':
+                        _dict[operation[2]] = _dict[key]
+                        del _dict[key]
+                    else:
+                        print("Operation is not valid: {}".format(action))
+                        logger.error("Operation is not valid: {}".format(action))
+                        self.recursive_dict_return_value = -1
+                        return -1
 
-                            self.recursive_dict_return_value = 1
-                            return 1
-            else:
-                print('Map list is empty')
-                logger.error('Map list is empty')
-                self.recursive_dict_return_value = -1
-                return -1
+            self.recursive_dict_return_value = 1
+            return 1
 
         except Exception as err:
             logger.error(err, exc_info=True)
             self.recursive_dict_return_value = -1
             return -1
 
-    def update_valid_anchors(self, config_dict):
-        try:
-            _flatten_config = FlatDict(config_dict).keys()
-            _all_occurrence_of_anchors = []
-            for key in _flatten_config:
-                if self.anchor_start_pattern in key:
-                    _all_occurrence_of_anchors.append(key)
-
-            _valid_anchors = dict()
-            _valid_anchor_names = []
-            # Checking for anchor occurrence and position and number of anchors in each key
-            for key in _all_occurrence_of_anchors:
-                _key = key.split(self.delimiter)
-                parent_idx = 0
-                for k in _key:
-                    _anchor = find_with_regex(k, self.re_anchor)
-                    if _anchor:
-                        _missing = object()
-                        _return = _valid_anchors.get(k, _missing)
-                        _return_parent = object()
-                        if _return is not _missing:
-                            _return_parent = _valid_anchors[k].get('parent', _missing)
-
-                        if _return is _missing or _return_parent is _missing:
-                            _valid_anchors[k] = dict()
-                            _valid_anchors[k]['parent'] = _key[0:parent_idx]
-                            _valid_anchors[k]['name'] = find_with_regex(_anchor[0], self.re_name)
-                            _valid_anchors[k]['processed'] = False
+    def clean_key(self, key):
+        """
+        :return: name of 'key' in cleaned dict, anchor keys lose their anchor
+        """
+        if self.find_anchors(key):
+            return self.anchor_start_pattern.join(key.rsplit(self.anchor_start_pattern)[0:-1])
+        return key
 
-                            _valid_anchor_names.append(find_with_regex(_anchor[0], self.re_name))
+    def clean_dict(self, config_dict, inplace=False):
+        """
+        Make a copy of 'config_dict' and remove all anchors with 'self.anchor_start_pattern' and pointers with 'self.pointer_pattern' in keys
 
-                    parent_idx += 1
+        The copy is rebuilt bottom-up in one pass: keys with pointer pattern are dropped and anchor keys are renamed to their key
+        name. Like before, renamed anchors go after the other keys of their dict, in sorted order. Only dicts are rebuilt, lists and
+        other values are shared with 'config_dict'.
 
-            _valid_anchor_names = [p[0] for p in _valid_anchor_names]
+        :param inplace: clean dicts of 'config_dict' in place instead of making a copy. Only dicts that have anchors or pointers are
+          changed. Frozen dicts can't be changed, they are rebuilt when they have anchors or pointers.
+        :return: cleaned dict
+        """
+        try:
+            cleaned = dict()  # id of a dict in config_dict -> cleaned dict
+            stack = [(config_dict, False)]
+            walked = 0
+            while stack:
+                node, children_cleaned = stack.pop()
+                if id(node) in cleaned:
+                    continue
+                if not children_cleaned:
+                    # Clean all child dicts before their parent
+                    walked += 1
+                    stack.append((node, True))
+                    for value in node.values():
+                        if isinstance(value, dict) and id(value) not in cleaned:
+                            stack.append((value, False))
+                    continue
+
+                items = []
+                anchors = []
+                changed = False
+                for key, value in node.items():
+                    if isinstance(value, dict):
+                        changed = changed or cleaned[id(value)] is not value
+                        value = cleaned[id(value)]
+                    if isinstance(key, string_types):
+                        if self.pointer_pattern in key:
+                            # Remove pointer
+                            changed = True
+                            continue
+                        if self.find_anchors(key):
+                            anchors.append((key, value))
+                            changed = True
+                            continue
+                    items.append((key, value))
+
+                for anchor_key, value in sorted(anchors, key=lambda item: item[0]):
+                    items.append((self.clean_key(anchor_key), value))
+
+                if not changed and (inplace or isinstance(node, FrozenMeldDict)):
+                    cleaned[id(node)] = node
+                elif inplace and not isinstance(node, FrozenMeldDict):
+                    node.clear()
+                    node.update(items)
+                    cleaned[id(node)] = node
+                else:
+                    # Build from items, so frozen dicts are rebuilt frozen
+                    cleaned[id(node)] = type(node)(items)
 
-            return _valid_anchors
+            self.count('dicts_walked', walked)
+            return cleaned[id(config_dict)]
 
         except Exception as err:
             logger.error(err, exc_info=True)
             return -1
 
-    def update_valid_pointers(self, config_dict):
-        try:
-            _flatten_config = FlatDict(config_dict)
-            _all_occurrence_of_pointers = []
-            for key in _flatten_config.keys():
-                if self.pointer_pattern in key:
-                    _all_occurrence_of_pointers.append(key)
-
-            # Checking Pointers
-            _valid_pointers = dict()
-            duplicate_counter = 1
-            for key in _all_occurrence_of_pointers:
-                _key = key.split(self.delimiter)
-                parent_idx = 0
-                for k in _key:
-                    if self.pointer_pattern in k:
-                        _parent = _key[0:parent_idx]
-                        # _pointer_name = _flatten_config[self.delimiter.join(_parent)+self.delimiter+self.pointer_pattern]
-                        _pointer_name = _flatten_config[self.delimiter.join(_parent) + self.delimiter + k]
-
-                        _missing = object()
-                        # _return_key = self.valid_pointers.get(self.pointer_pattern, _missing)
-                        _return_key = _valid_pointers.get(k, _missing)
-                        if _return_key is _missing:
-                            _valid_pointers[self.pointer_pattern] = dict()
-                            _valid_pointers[self.pointer_pattern]['parent'] = _parent
-                            _valid_pointers[self.pointer_pattern]['name'] = _pointer_name
-                            _valid_pointers[self.pointer_pattern]['key'] = k
-
-                        else:
-                            _valid_pointers[self.pointer_pattern + '_' + str(duplicate_counter)] = dict()
-                            _valid_pointers[self.pointer_pattern + '_' + str(duplicate_counter)]['parent'] = _parent
-                            _valid_pointers[self.pointer_pattern + '_' + str(duplicate_counter)]['name'] = _pointer_name
-                            _valid_pointers[self.pointer_pattern + '_' + str(duplicate_counter)]['key'] = k
-
-                            duplicate_counter += 1
+    def anchor_resolution_order(self, valid_anchors, valid_pointers):
+        """
+        Sort anchors topologically by their dependencies. An anchor depends on the anchors that pointers in its value point to,
+        and on the anchors inside its value.
+        :return: list of anchor keys, every anchor comes after all anchors it depends on. -1 if there is a cycle.
+        """
+        anchor_keys_by_name = dict((anchor['name'][0], anchor_key) for anchor_key, anchor in valid_anchors.items())
+
+        dependencies = dict((anchor_key, []) for anchor_key in valid_anchors.keys())
+        for anchor_key, anchor in valid_anchors.items():
+            if anchor['anchor'] is not None:
+                dependencies[anchor['anchor']].append(anchor_key)
+        for pointer in valid_pointers.values():
+            if pointer['anchor'] is not None:
+                dependencies[pointer['anchor']].append(anchor_keys_by_name[pointer['name']])
+
+        # Depth first search, anchors in 'path' are not resolved yet
+        order = []
+        resolved = set()
+        for start_key in valid_anchors.keys():
+            if start_key in resolved:
+                continue
+            path = [start_key]
+            on_path = set(path)
+            stack = [iter(dependencies[start_key])]
+            while stack:
+                dependency_key = next(stack[-1], None)
+                if dependency_key is None:
+                    stack.pop()
+                    anchor_key = path.pop()
+                    on_path.discard(anchor_key)
+                    resolved.add(anchor_key)
+                    order.append(anchor_key)
+                elif dependency_key in on_path:
+                    cycle = path[path.index(dependency_key):] + [dependency_key]
+                    cycle = ' -> '.join(self.index.join(valid_anchors[k]['parent'] + (k,)) for k in cycle)
+                    print("There is a cycle in anchors and cycle is: {}".format(cycle))
+                    logger.error("There is a cycle in anchors and cycle is: {}".format(cycle))
+                    return -1
+                elif dependency_key not in resolved:
+                    path.append(dependency_key)
+                    on_path.add(dependency_key)
+                    stack.append(iter(dependencies[dependency_key]))
 
-                        # In update we need update _flatten_config
-                        # _flatten_config = FlatDict(config_dict)
+        return order
 
-                    parent_idx += 1
+    def pointer_merge_order(self, valid_anchors, valid_pointers):
+        """
+        Order of merging pointers: every anchor is resolved once, in dependency order, by merging all pointers inside its value.
+        Then pointers that are outside of all anchors are merged.
+        Pointers of the same anchor are merged in reversed order for priority in merging.
+        :return: list of pointer keys, -1 if there is a cycle in anchors.
+        """
+        order = self.anchor_resolution_order(valid_anchors, valid_pointers)
+        if order == -1:
+            return -1
 
-            return _valid_pointers
+        pointers_by_anchor = dict((anchor_key, []) for anchor_key in order)
+        pointers_by_anchor[None] = []
+        for pointer_key, pointer in valid_pointers.items():
+            pointers_by_anchor[pointer['anchor']].append(pointer_key)
 
-        except Exception as err:
-            logger.error(err, exc_info=True)
-            return -1
+        pointer_order = []
+        for owner_key in order + [None]:
+            pointer_order.extend(reversed(pointers_by_anchor[owner_key]))
+        return pointer_order
 
-    def clean_dict(self, config_dict):
+    def merge_pointers_with_anchors(self, valid_anchors, valid_pointers, only_under=None, config_dict=None):
         """
-        Make a copy of 'config_dict' and remove all anchors with 'self.anchor_start_pattern' and pointers with 'self.pointer_pattern' in keys
-        :return: cleaned dict
+        Merge all pointers with their anchors, in the order of 'pointer_merge_order'.
+
+        :param only_under: list of paths, when it is given only pointers inside these paths are merged.
+        :param config_dict: dict to merge, the default is 'self.config_dict'.
         """
         try:
-            duplicate = copy.deepcopy(config_dict)
-
-            _valid_anchors = self.update_valid_anchors(config_dict=duplicate)
-            if _valid_anchors == -1:
-                return -1
-            _valid_pointers = self.update_valid_pointers(config_dict=duplicate)
-            if _valid_pointers == -1:
+            if config_dict is None:
+                config_dict = self.config_dict
+            pointer_order = self.pointer_merge_order(valid_anchors, valid_pointers)
+            if pointer_order == -1:
                 return -1
 
-            while _valid_pointers.keys():
-                # Remove all pointers
-                POINTER_KEYS = list(_valid_pointers.keys())
-                pointer_key = POINTER_KEYS[0]
-                pointer_parent = _valid_pointers[pointer_key]['parent']
-                pointer_key = _valid_pointers[pointer_key]['key']
-                # Delete pointer
-                stat = self.del_in_dict(duplicate, (self.delimiter.join(pointer_parent) + self.delimiter +
-                                                    pointer_key).split(self.delimiter))
+            anchor_keys_by_name = dict((anchor['name'][0], anchor_key) for anchor_key, anchor in valid_anchors.items())
+            for pointer_key in pointer_order:
+                pointer_parent = valid_pointers[pointer_key]['parent']
+                if only_under is not None and not any(pointer_parent[:len(path)] == path for path in only_under):
+                    continue
+                anchor_key = anchor_keys_by_name[valid_pointers[pointer_key]['name']]
+                stat = self.merge_pointer(config_dict, pointer_parent, valid_anchors[anchor_key]['parent'] + (anchor_key,))
                 if stat == -1:
                     return -1
-                # After delete a pointer we need update _valid_pointers
-                _valid_pointers = self.update_valid_pointers(config_dict=duplicate)
-                if _valid_pointers == -1:
-                    return -1
 
-            # while _valid_anchors.keys() or _valid_pointers.keys():
-            while _valid_anchors.keys():
-                # Update all anchors
-                ANCHOR_KEYS = list(_valid_anchors.keys())
-                anchor_key = ANCHOR_KEYS[0]
-                anchor_parent = _valid_anchors[anchor_key]['parent']
-                new_name = self.anchor_start_pattern.join(anchor_key.rsplit(self.anchor_start_pattern)[0:-1])
-                self.del_in_dict(duplicate, (self.delimiter.join(anchor_parent) + self.delimiter + anchor_key).split(self.delimiter),
-                                 rename=True, new_name=new_name)
-                # After updating a key we need update _valid_anchors
-                _valid_anchors = self.update_valid_anchors(config_dict=duplicate)
-                if _valid_anchors == -1:
-                    return -1
-
-            return duplicate
+            return 1
 
         except Exception as err:
             logger.error(err, exc_info=True)
             return -1
 
-    def merge_pointers_with_anchors(self, valid_anchors, valid_pointers):
-        try:
-            # Merge pointers with anchors, using reversed order for priority in merging
-            for pointer_key in reversed(list(valid_pointers.keys())):
-                pointer_parent = valid_pointers[pointer_key]['parent']
-                pointer_name = valid_pointers[pointer_key]['name']
-
-                for anchor_key in reversed(list(valid_anchors.keys())):
-                    anchor_name = valid_anchors[anchor_key]['name'][0]
-                    anchor_parent = valid_anchors[anchor_key]['parent']
-                    if anchor_name == pointer_name:
-                        # Check for existing of pointer in current anchor
-                        _valid_pointers_ = dict()
-                        exist_pointer_in_current_anchor = False
-                        if not valid_anchors[anchor_key]['processed']:
-                            for _pointer_key_ in self.valid_pointers.keys():
-                                if anchor_key in self.valid_pointers[_pointer_key_]['parent']:
-                                    exist_pointer_in_current_anchor = True
-                                    _valid_pointers_[_pointer_key_] = self.valid_pointers[_pointer_key_]
-
-                        if exist_pointer_in_current_anchor and not valid_anchors[anchor_key]['processed']:
-                            valid_anchors[anchor_key]['processed'] = True
-                            self.merge_pointers_with_anchors(valid_anchors=valid_anchors, valid_pointers=_valid_pointers_)
-
-                        if not anchor_parent:
-                            _anchor_part = self.config_dict[anchor_key]
-                        else:
-                            _anchor_part = self.get_from_dict(self.config_dict,
-                                                              (self.delimiter.join(anchor_parent) + self.delimiter + anchor_key).split(
-                                                                  self.delimiter))
-                        if _anchor_part == -1:
-                            return -1
-
-                        _pointer_part = self.get_from_dict(self.config_dict, pointer_parent)
-                        if _pointer_part == -1:
-                            return -1
-                        # Checking for list as merge elements
-                        both_list_flag = False
-                        merge_dict_parts = None
-                        if isinstance(_anchor_part, list) and isinstance(_pointer_part, list):
-                            # Concat lists
-                            merge_dict_parts = _anchor_part + _pointer_part
-                            logger.error("We have two list for merge. We concat lists and we dont remove repeated values")
-                            both_list_flag = True
-                        elif isinstance(_anchor_part, list):
-                            _anchor_part = dict.fromkeys(['_anchor_part_list_as_dict'], _anchor_part)
-                            logger.error("We have anchor part with type list. "
-                                         "We create a dict with key: '_anchor_part_list_as_dict' and add this list to that ")
-
-                        elif isinstance(_pointer_part, list):
-                            _pointer_part = dict.fromkeys(['_pointer_part_list_as_dict'], _pointer_part)
-                            logger.error("We have pointer part with type list. "
-                                         "We create a dict with key: '_pointer_part_list_as_dict' and add this list to that ")
-                        if not both_list_flag:
-                            # Merge dicts
-                            merge_dict_parts = MeldDict(_anchor_part) + _pointer_part
-
-                        # Update pointer in dict with merged key
-                        stat = self.set_in_dict(self.config_dict, self.delimiter.join(pointer_parent).split(self.delimiter), merge_dict_parts)
-                        if stat == -1:
-                            return -1
+    def merge_components(self, valid_anchors, valid_pointers):
+        """
+        Split anchors and pointers into connected components that can be merged independently. A pointer is in the
+        component of its anchor, and anchors and pointers whose key paths are inside each other are in one component,
+        so components change disjoint parts of config.
 
-                        break
+        :return: list of (roots, anchor keys, pointer keys) for components with pointers, roots are the outermost key
+          paths of the component. Bigger components come first.
+        """
+        # Key paths of anchors and pointer parents, shorter paths first so a path comes after the paths it is inside of
+        items = [(valid_anchors[anchor_key]['parent'] + (anchor_key,), ('anchor', anchor_key))
+                 for anchor_key in valid_anchors.keys()]
+        items.extend((pointer['parent'], ('pointer', pointer_key)) for pointer_key, pointer in valid_pointers.items())
+        items.sort(key=lambda item: len(item[0]))
+
+        # Union find
+        parents = dict((item, item) for _, item in items)
+
+        def find(item):
+            while parents[item] != item:
+                parents[item] = parents[parents[item]]
+                item = parents[item]
+            return item
+
+        def union(item, other):
+            parents[find(item)] = find(other)
+
+        anchor_keys_by_name = dict((anchor['name'][0], anchor_key) for anchor_key, anchor in valid_anchors.items())
+        for pointer_key, pointer in valid_pointers.items():
+            union(('pointer', pointer_key), ('anchor', anchor_keys_by_name[pointer['name']]))
+
+        # Tree of key paths, a node is [children by key, first item on its path]
+        tree = [dict(), None]
+        roots = []
+        for path, item in items:
+            node = tree
+            inside = False
+            for key in path:
+                if node[1] is not None:
+                    union(item, node[1])
+                    inside = True
+                node = node[0].setdefault(key, [dict(), None])
+            if node[1] is not None:
+                union(item, node[1])
+            else:
+                node[1] = item
+                if not inside:
+                    roots.append((path, item))
+
+        components = dict()  # item of component -> [roots, anchor keys, pointer keys]
+        for _, item in items:
+            component = components.setdefault(find(item), [[], [], []])
+            component[1 if item[0] == 'anchor' else 2].append(item[1])
+        for path, item in roots:
+            components[find(item)][0].append(path)
+        components = [tuple(component) for component in components.values() if component[2]]
+        components.sort(key=lambda component: len(component[2]), reverse=True)
+        return components
+
+    def merge_parallel(self, valid_anchors, valid_pointers):
+        """
+        Merge components of 'merge_components' in 'self.workers' processes and set their merged values in
+        'self.config_dict'. Components are given to processes by number of pointers, the biggest component first.
+        """
+        try:
+            components = self.merge_components(valid_anchors, valid_pointers)
+            if len(components) < 2:
+                return self.merge_pointers_with_anchors(valid_anchors=valid_anchors, valid_pointers=valid_pointers)
+            try:
+                # Imported on use, it imports multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+            except ImportError:
+                # Python 2 without futures package
+                logger.warning("concurrent.futures is not installed, merging in one process")
+                return self.merge_pointers_with_anchors(valid_anchors=valid_anchors, valid_pointers=valid_pointers)
+
+            # Longest processing time first: the next component goes to the task with the fewest pointers
+            tasks = [[] for _ in range(min(self.workers, len(components)))]
+            loads = [(0, i) for i in range(len(tasks))]
+            for roots, anchor_keys, pointer_keys in components:
+                load, i = heapq.heappop(loads)
+                tasks[i].append((
+                    [(path, self.get_from_dict(self.config_dict, path)) for path in roots],
+                    dict((anchor_key, valid_anchors[anchor_key]) for anchor_key in anchor_keys),
+                    dict((pointer_key, valid_pointers[pointer_key]) for pointer_key in pointer_keys)))
+                heapq.heappush(loads, (load + len(pointer_keys), i))
+
+            settings = dict(re_anchor=self.re_anchor, re_name=self.re_name, anchor_start_pattern=self.anchor_start_pattern,
+                            pointer_pattern=self.pointer_pattern, delimiter=self.delimiter,
+                            copy_on_write=self.copy_on_write, list_strategies=self.list_strategies,
+                            stats=self.stats is not None)
+            with ProcessPoolExecutor(max_workers=len(tasks)) as executor:
+                futures = [executor.submit(_merge_components, settings, task) for task in tasks]
+                for task, future in zip(tasks, futures):
+                    results = future.result()
+                    if results == -1:
+                        return -1
+                    results, stats = results
+                    if self.stats is not None:
+                        self.stats.update(stats)
+                    for (roots, _, _), values in zip(task, results):
+                        for (path, _), value in zip(roots, values):
+                            stat = self.set_in_dict(self.config_dict, path, value)
+                            if stat == -1:
+                                return -1
 
             return 1
 
         except Exception as err:
             logger.error(err, exc_info=True)
             return -1
+
+    def list_strategies_under(self, path):
+        """
+        :return: list strategies of the key paths inside key path 'path', by key path relative to 'path'.
+        """
+        path = tuple(path)
+        return dict((strategy_path[len(path):], strategy) for strategy_path, strategy in self.list_strategies.items()
+                    if len(strategy_path) > len(path) and strategy_path[:len(path)] == path)
+
+    def merge_pointer(self, config_dict, pointer_parent, anchor_path):
+        """
+        Merge value of key path 'anchor_path' into the dict of a pointer by 'meld_pointer', and keep its merge time in
+        'self.stats'.
+
+        :param pointer_parent: key path of the dict that holds the pointer.
+        :return: 1, -1 on error
+        """
+        if self.stats is None:
+            return self.meld_pointer(config_dict, pointer_parent, anchor_path)
+        start = _clock()
+        stat = self.meld_pointer(config_dict, pointer_parent, anchor_path)
+        seconds = _clock() - start
+        self.stats.pointer_times.append((seconds, self.index.join(pointer_parent), self.index.join(anchor_path)))
+        self.stats.counters['pointer_merges'] += 1
+        return stat
+
+    def meld_pointer(self, config_dict, pointer_parent, anchor_path):
+        """
+        Merge value of key path 'anchor_path' into the dict of a pointer, the pointer part overrides the anchor part.
+
+        :param pointer_parent: key path of the dict that holds the pointer.
+        :return: 1, -1 on error
+        """
+        _anchor_part = self.get_from_dict(config_dict, anchor_path)
+        if _anchor_part == -1:
+            return -1
+        if self.copy_on_write and isinstance(_anchor_part, dict) and not isinstance(_anchor_part, FrozenMeldDict):
+            # Freeze anchor once, all pointers to this anchor share its values
+            _anchor_part = freeze(_anchor_part)
+            stat = self.set_in_dict(config_dict, anchor_path, _anchor_part)
+            if stat == -1:
+                return -1
+
+        _pointer_part = self.get_from_dict(config_dict, pointer_parent)
+        if _pointer_part == -1:
+            return -1
+        # Checking for list as merge elements
+        both_list_flag = False
+        merge_dict_parts = None
+        if isinstance(_anchor_part, list) and isinstance(_pointer_part, list):
+            if tuple(pointer_parent) in self.list_strategies:
+                merge_dict_parts = meld_lists(_anchor_part, _pointer_part, self.list_strategies[tuple(pointer_parent)])
+            else:
+                # Concat lists
+                merge_dict_parts = _anchor_part + _pointer_part
+                logger.error("We have two list for merge. We concat lists and we dont remove repeated values")
+            both_list_flag = True
+        elif isinstance(_anchor_part, list):
+            _anchor_part = dict.fromkeys(['_anchor_part_list_as_dict'], _anchor_part)
+            logger.error("We have anchor part with type list. "
+                         "We create a dict with key: '_anchor_part_list_as_dict' and add this list to that ")
+
+        elif isinstance(_pointer_part, list):
+            _pointer_part = dict.fromkeys(['_pointer_part_list_as_dict'], _pointer_part)
+            logger.error("We have pointer part with type list. "
+                         "We create a dict with key: '_pointer_part_list_as_dict' and add this list to that ")
+        if not both_list_flag:
+            # Merge dicts
+            if isinstance(_anchor_part, FrozenMeldDict):
+                merge_dict_parts = MeldDict(_anchor_part)
+                owned = False
+            else:
+                # The copy doesn't share dicts with anchor, so pointer part is added to it in place
+                merge_dict_parts = MeldDict(copy_tree(_anchor_part))
+                owned = True
+                self.count('deep_copies')
+            merge_dict_parts.add(_pointer_part, self.list_strategies_under(pointer_parent), owned=owned)
+
+        # Update pointer in dict with merged key
+        return self.set_in_dict(config_dict, pointer_parent, merge_dict_parts)
+
+
+def _merge_components(settings, components):
+    """
+    Merge components of ConfigMerger.merge_parallel in a worker process.
+
+    :param settings: arguments of ConfigMerger.
+    :param components: list of (roots, valid_anchors, valid_pointers), roots is a list of (key path, value) of the
+      outermost key paths of component.
+    :return: (list of merged values of roots for every component, MergeStats or None), -1 on error
+    """
+    merger_obj = ConfigMerger(dict(), merge_at_init=False, inplace=True, index=ConfigIndex(settings['delimiter']),
+                              **settings)
+    if merger_obj.return_value == -1:
+        return -1
+    results = []
+    for roots, valid_anchors, valid_pointers in components:
+        # Config with only the roots of component, on their key paths
+        config_dict = dict()
+        for path, value in roots:
+            node = config_dict
+            for key in path[:-1]:
+                node = node.setdefault(key, dict())
+            node[path[-1]] = value
+        stat = merger_obj.merge_pointers_with_anchors(valid_anchors, valid_pointers, config_dict=config_dict)
+        if stat == -1:
+            return -1
+        results.append([merger_obj.get_from_dict(config_dict, path) for path, _ in roots])
+    return results, merger_obj.stats
@@ -0,0 +1,60 @@
+"""
+Benchmark of utils.box loaders on config/config.yaml and config/config.json scaled up 'COPIES' times: the default
+loaders against fast=True.
+
+Run from the root of repository:
+    python -m benchmarks.box_loaders
+
+Every copy of the config is the value of its own top level key.
+"""
+import os
+import sys
+import json
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.box import fast_yaml_loader, load_from_json, load_from_yaml
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COPIES = 1000
+
+
+def write_scaled(directory, copies):
+    """
+    :return: paths of YAML and JSON files with 'copies' copies of config/config.yaml
+    """
+    with open(os.path.join(BASE_DIR, 'config', 'config.yaml')) as f:
+        lines = [line for line in f.read().splitlines() if line.strip() and not line.lstrip().startswith('#')]
+    yaml_file = os.path.join(directory, 'config.yaml')
+    with open(yaml_file, 'w') as f:
+        for i in range(copies):
+            f.write('copy_{}:\n'.format(i))
+            f.write(''.join('  {}\n'.format(line) for line in lines if line != '---'))
+    json_file = os.path.join(directory, 'config.json')
+    with open(json_file, 'w') as f:
+        json.dump(load_from_yaml(filename=yaml_file, fast=True), f)
+    return yaml_file, json_file
+
+
+def best(func, repeat=3):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    yaml_file, json_file = write_scaled(tempfile.mkdtemp(), COPIES)
+    print("config/config.yaml x {}: YAML {:.1f} MB, JSON {:.1f} MB, fast YAML loader: {}".format(
+        COPIES, os.path.getsize(yaml_file) / 1024.0 / 1024.0, os.path.getsize(json_file) / 1024.0 / 1024.0,
+        fast_yaml_loader().__name__))
+    print("{:>10} {:>12} {:>12}".format('format', 'default', 'fast'))
+    print("{:>10} {:>12.3f} {:>12.3f}".format('YAML', best(lambda: load_from_yaml(filename=yaml_file), repeat=1),
+                                              best(lambda: load_from_yaml(filename=yaml_file, fast=True))))
+    print("{:>10} {:>12.3f} {:>12.3f}".format('JSON', best(lambda: load_from_json(filename=json_file)),
+                                              best(lambda: load_from_json(filename=json_file, fast=True))))
+    os.remove(yaml_file)
+    os.remove(json_file)
+
+
+if __name__ == "__main__":
+    main()
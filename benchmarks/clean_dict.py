@@ -0,0 +1,46 @@
+"""
+Benchmark of ConfigMerger.clean_dict on growing configs.
+
+Run from the root of repository:
+    python -m benchmarks.clean_dict
+
+Time per leaf must stay flat when the number of leaves grows, i.e. cleaning is linear.
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DRY import ConfigMerger
+
+SIZES = [1000, 10000, 100000, 200000]
+LEAVES_PER_SERVICE = 10
+
+
+def make_config(leaves):
+    """
+    Config with one anchor and one pointer for every 'LEAVES_PER_SERVICE' leaves.
+    """
+    services = dict()
+    for i in range(leaves // LEAVES_PER_SERVICE):
+        service = dict(('key_{}'.format(j), j) for j in range(LEAVES_PER_SERVICE - 1))
+        if i % 2:
+            service['->'] = 'service_{}'.format(i - 1)
+            services['service_{}'.format(i)] = service
+        else:
+            services['service_{0}(&service_{0})'.format(i)] = service
+    return {'services': services}
+
+
+def main():
+    print("{:>10} {:>12} {:>16}".format('leaves', 'seconds', 'usec per leaf'))
+    for leaves in SIZES:
+        config_dict = make_config(leaves)
+        merger_obj = ConfigMerger(config_dict, merge_at_init=False)
+        seconds = min(timeit.repeat(lambda: merger_obj.clean_dict(config_dict), number=1, repeat=3))
+        print("{:>10} {:>12.4f} {:>16.3f}".format(leaves, seconds, seconds / leaves * 1e6))
+
+
+if __name__ == "__main__":
+    main()
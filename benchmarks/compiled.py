@@ -0,0 +1,74 @@
+"""
+Benchmark of loading a merged config from JSON, YAML and the compiled format of utils.compiled.
+
+Run from the root of repository:
+    python -m benchmarks.compiled
+
+'load' is the time until the config can be read, 'lookup' is load and reading one nested key, 'full' is load and
+decoding the whole config to dicts.
+"""
+import os
+import sys
+import json
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.box import load_from_yaml, to_json, to_yaml
+from utils.compiled import compile_config, load_compiled
+
+SERVICES = [1000, 10000]
+KEYS_PER_SERVICE = 10
+
+
+def make_config(services):
+    """
+    Merged config with 'services' services, every service has the same base settings and 'KEYS_PER_SERVICE' own keys.
+    """
+    base = {'image': 'base', 'ports': [80, 443], 'env': {'level': 'info', 'replicas': 3}}
+    config_dict = {'services': dict()}
+    for i in range(services):
+        service = dict(base)
+        service.update(('key_{}'.format(j), 'value_{}_{}'.format(i, j)) for j in range(KEYS_PER_SERVICE))
+        config_dict['services']['service_{}'.format(i)] = service
+    return config_dict
+
+
+def best(func, repeat=3):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def load_json(filename):
+    with open(filename) as f:
+        return json.load(f)
+
+
+def load_yaml(filename):
+    return load_from_yaml(filename=filename, fast=True)
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    print("{:>10} {:>10} {:>12} {:>12} {:>12} {:>12}".format('services', 'format', 'size MB', 'load', 'lookup', 'full'))
+    for services in SERVICES:
+        config_dict = make_config(services)
+        key = 'service_{}'.format(services // 2)
+        files = dict((name, os.path.join(directory, 'config.' + name)) for name in ('json', 'yaml', 'dryc'))
+        to_json(config_dict, filename=files['json'])
+        to_yaml(config_dict, filename=files['yaml'])
+        compile_config(config_dict, files['dryc'])
+        loaders = (('json', load_json, lambda config: config),
+                   ('yaml', load_yaml, lambda config: config),
+                   ('dryc', load_compiled, lambda config: config.as_dict()))
+        for name, load, full in loaders:
+            filename = files[name]
+            print("{:>10} {:>10} {:>12.2f} {:>12.6f} {:>12.6f} {:>12.4f}".format(
+                services, name, os.path.getsize(filename) / 1024.0 / 1024.0, best(lambda: load(filename)),
+                best(lambda: load(filename)['services'][key]['env']['level']),
+                best(lambda: full(load(filename)))))
+            os.remove(filename)
+
+
+if __name__ == "__main__":
+    main()
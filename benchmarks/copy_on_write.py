@@ -0,0 +1,70 @@
+"""
+Benchmark of merging one big anchor into many pointers, with and without copy_on_write.
+
+Run from the root of repository:
+    python -m benchmarks.copy_on_write
+
+Every mode runs in its own process and reports wall time and peak RSS (resource.getrusage, Linux/macOS only).
+"""
+import os
+import sys
+import subprocess
+import resource
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ANCHOR_LEAVES = 2000
+POINTERS = 2000
+
+
+def make_config(anchor_leaves, pointers):
+    """
+    Config with one base anchor that every service points to, each service overrides one nested key.
+    """
+    base = dict()
+    for i in range(anchor_leaves // 10):
+        base['group_{}'.format(i)] = dict(('key_{}'.format(j), 'value_{}'.format(j)) for j in range(10))
+    services = dict()
+    for i in range(pointers):
+        services['service_{}'.format(i)] = {'->': 'base', 'group_0': {'key_0': i}}
+    return {'base(&base)': base, 'services': services}
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        # bytes on macOS, kilobytes on Linux
+        peak /= 1024
+    return peak / 1024.0
+
+
+def run(copy_on_write):
+    from DRY import ConfigMerger
+
+    config_dict = make_config(ANCHOR_LEAVES, POINTERS)
+    base_rss = peak_rss_mb()
+    start = time.time()
+    merger_obj = ConfigMerger(config_dict, merge_at_init=True, copy_on_write=copy_on_write)
+    seconds = time.time() - start
+    if merger_obj.return_value != 1:
+        print('Error in Config Merger')
+        return -1
+    print("{:>15} {:>10.3f} {:>15.1f} {:>15.1f}".format('copy_on_write' if copy_on_write else 'deepcopy', seconds,
+                                                       peak_rss_mb(), peak_rss_mb() - base_rss))
+    return 1
+
+
+def main():
+    if len(sys.argv) > 1:
+        return run(sys.argv[1] == 'copy_on_write')
+
+    print("{} pointers to one anchor with {} leaves".format(POINTERS, ANCHOR_LEAVES))
+    print("{:>15} {:>10} {:>15} {:>15}".format('mode', 'seconds', 'peak RSS (MB)', 'merge RSS (MB)'))
+    sys.stdout.flush()
+    for mode in ('deepcopy', 'copy_on_write'):
+        subprocess.call([sys.executable, '-m', 'benchmarks.copy_on_write', mode])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark of FlatDict len, iteration, items and conversions on big nested configs, and of reading and prefix queries of FlatDict and
+FrozenFlatDict. 'key scan' is a prefix query by matching all keys, for comparing with 'iter_prefix'. The last table is
+FlatterDict on a config with a big list of hosts and a list of ports.
+
+Run from the root of repository:
+    python -m benchmarks.flatdict
+
+The first call builds the flat key index, next calls use it. len doesn't use the index, it must not grow with the number of
+leaves.
+"""
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libs.flatdict import FlatDict, FrozenFlatDict
+from libs.flatdict.flatdict import FlatterDict
+
+SIZES = [10000, 100000]
+FANOUT = 10
+
+
+def make_config(leaves):
+    """
+    Nested config with 'FANOUT' keys in every dict and 'leaves' leaves.
+    """
+    config_dict = dict()
+    for i in range(leaves):
+        node = config_dict
+        for part in ('group_{}'.format(i // (FANOUT * FANOUT)), 'section_{}'.format(i // FANOUT % FANOUT)):
+            node = node.setdefault(part, dict())
+        node['key_{}'.format(i % FANOUT)] = i
+    return config_dict
+
+
+def make_hosts(hosts):
+    """
+    Config with a list of 'hosts' host dicts and a list of 'hosts' ports.
+    """
+    return {'hosts': [{'name': 'host_{}'.format(i), 'port': 8000 + i % 100} for i in range(hosts)],
+            'ports': list(range(hosts))}
+
+
+def best(func, repeat=5):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def allocated_mb(func):
+    """
+    :return: result of 'func' and size of memory that is allocated by it and kept
+    """
+    tracemalloc.start()
+    result = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size / 1024.0 / 1024.0
+
+
+def read(flat_dict, keys):
+    for key in keys:
+        flat_dict[key]
+
+
+def indexed(flat_dict):
+    flat_dict._flat_index()
+    return flat_dict
+
+
+def indexed_views(flat_dict):
+    """
+    Index the flat dict and iterate all its nested dicts, only the flat dict keeps a flat key index.
+    """
+    indexed(flat_dict)
+    stack = [flat_dict]
+    while stack:
+        node = stack.pop()
+        list(node)
+        stack.extend(value for value in node._values.values() if isinstance(value, FlatDict))
+    return flat_dict
+
+
+def main():
+    print("{:>10} {:>12} {:>12} {:>12} {:>12} {:>12}".format('leaves', 'build', 'first iter', 'len', 'iter', 'items'))
+    for leaves in SIZES:
+        config_dict = make_config(leaves)
+        flat_dict = FlatDict(config_dict)
+        build = best(lambda: FlatDict(config_dict), repeat=3)
+        first = best(lambda: FlatDict(config_dict)._flat_index(), repeat=3) - build
+        print("{:>10} {:>12.4f} {:>12.4f} {:>12.6f} {:>12.4f} {:>12.4f}".format(
+            leaves, build, first, best(lambda: len(flat_dict)), best(lambda: list(flat_dict)),
+            best(lambda: flat_dict.items())))
+
+    print("")
+    print("{:>10} {:>12} {:>16} {:>12}".format('leaves', 'from_nested', 'from_flat_items', 'as_dict'))
+    for leaves in SIZES:
+        config_dict = make_config(leaves)
+        flat_dict = FlatDict(config_dict)
+        items = flat_dict.items()
+        print("{:>10} {:>12.4f} {:>16.4f} {:>12.4f}".format(
+            leaves, best(lambda: FlatDict.from_nested(config_dict), repeat=3),
+            best(lambda: FlatDict.from_flat_items(items), repeat=3), best(lambda: flat_dict.as_dict(), repeat=3)))
+
+    print("")
+    print("{:>10} {:>15} {:>12} {:>12} {:>12} {:>12}".format('leaves', 'class', 'memory MB', 'lookups', 'iter_prefix',
+                                                            'key scan'))
+    for leaves in SIZES:
+        config_dict = make_config(leaves)
+        keys = list(FlatDict(config_dict))
+        # FlatDict builds its flat key index on the first iteration, 'FlatDict+index' includes it in memory and
+        # 'FlatDict+views' also iterates all nested dicts
+        for name, build in (('FlatDict', lambda: FlatDict(config_dict)),
+                            ('FlatDict+index', lambda: indexed(FlatDict(config_dict))),
+                            ('FlatDict+views', lambda: indexed_views(FlatDict(config_dict))),
+                            ('FrozenFlatDict', lambda: FrozenFlatDict(config_dict))):
+            flat_dict, memory = allocated_mb(build)
+            print("{:>10} {:>15} {:>12.1f} {:>12.4f} {:>12.6f} {:>12.4f}".format(
+                leaves, name, memory, best(lambda: read(flat_dict, keys)),
+                best(lambda: list(flat_dict.iter_prefix('group_0:section_0'))),
+                best(lambda: [(key, flat_dict[key]) for key in flat_dict if key.startswith('group_0:section_0:')])))
+
+    print("")
+    print("{:>10} {:>12} {:>12} {:>12} {:>12} {:>12}".format('hosts', 'memory MB', 'build', 'lookups', 'as_dict',
+                                                            'set'))
+    for hosts in SIZES:
+        config_dict = make_hosts(hosts)
+        flat_dict, memory = allocated_mb(lambda: FlatterDict(config_dict))
+        keys = ['hosts:{}:name'.format(i) for i in range(0, hosts, 7)] + ['ports:{}'.format(i) for i in range(0, hosts, 7)]
+
+        def assign():
+            for i in range(0, hosts, 7):
+                flat_dict['ports:{}'.format(i)] = i
+
+        print("{:>10} {:>12.1f} {:>12.4f} {:>12.4f} {:>12.4f} {:>12.4f}".format(
+            hosts, memory, best(lambda: FlatterDict(config_dict), repeat=3), best(lambda: read(flat_dict, keys)),
+            best(lambda: flat_dict.as_dict(), repeat=3), best(assign)))
+
+
+if __name__ == "__main__":
+    main()
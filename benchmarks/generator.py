@@ -0,0 +1,105 @@
+"""
+Generator of synthetic configs for benchmarks of ConfigMerger, FlatDict, MeldDict and utils.box.
+
+    python -m benchmarks.generator config.yaml --leaves 100000 --chain-depth 5
+
+Configs are deterministic: the same parameters always give the same config, so results of benchmarks of different
+versions can be compared.
+"""
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULTS = dict(leaves=20000, depth=3, anchors=20, pointers_per_anchor=50, chain_depth=3, list_size=10)
+
+
+def make_tree(leaves, depth, value):
+    """
+    Tree of 'depth' levels of nested dicts with 'leaves' leaves, keys of dicts are 'node_<i>' and keys of leaves are
+    'leaf_<i>', values of leaves are 'value' and the number of leaf.
+    """
+    fanout = 1
+    while fanout ** depth < leaves:
+        fanout += 1
+    tree = dict()
+    for i in range(leaves):
+        node = tree
+        for level in range(depth - 1, 0, -1):
+            node = node.setdefault('node_{}'.format(i // fanout ** level % fanout), dict())
+        node['leaf_{}'.format(i % fanout)] = '{}_{}'.format(value, i)
+    return tree
+
+
+def first_leaf(depth, value):
+    """
+    Nested dict that overrides the first leaf of a tree of 'make_tree'.
+    """
+    override = {'leaf_0': value}
+    for _ in range(depth - 1):
+        override = {'node_0': override}
+    return override
+
+
+def generate_config(leaves=DEFAULTS['leaves'], depth=DEFAULTS['depth'], anchors=DEFAULTS['anchors'],
+                    pointers_per_anchor=DEFAULTS['pointers_per_anchor'], chain_depth=DEFAULTS['chain_depth'],
+                    list_size=DEFAULTS['list_size']):
+    """
+    Config with 'anchors' inheritance chains of anchors under 'anchors' and services that point to them under 'services'.
+
+    Every chain has 'chain_depth' anchors: the first one is a base, every next one points to the one before it and its
+    leaves override the leaves of that one. 'pointers_per_anchor' services point to the last anchor of every chain,
+    override its first leaf and append a list. Leaves are divided between the bodies of anchors, a body is a tree of
+    'depth' levels of nested dicts (make_tree) and a list of 'list_size' items.
+
+    :return: config_dict
+    """
+    bodies = max(anchors * chain_depth, 1)
+    leaves_per_body = max(leaves // bodies, 1)
+    config_dict = {'anchors': dict(), 'services': dict()}
+    for c in range(anchors):
+        chain = dict()
+        for k in range(chain_depth):
+            body = make_tree(leaves_per_body, depth, 'chain_{}_{}'.format(c, k))
+            body['items'] = list(range(list_size))
+            if k > 0:
+                body['->'] = 'chain_{}_{}'.format(c, k - 1)
+            chain['level_{}(&chain_{}_{})'.format(k, c, k)] = body
+        config_dict['anchors']['chain_{}'.format(c)] = chain
+
+        services = dict()
+        for i in range(pointers_per_anchor):
+            service = first_leaf(depth, 'service_{}_{}'.format(c, i))
+            service['->'] = 'chain_{}_{}'.format(c, chain_depth - 1)
+            service['items'] = list(range(list_size, 2 * list_size))
+            services['service_{}'.format(i)] = service
+        config_dict['services']['chain_{}'.format(c)] = services
+    return config_dict
+
+
+def add_arguments(parser):
+    """
+    Add arguments of 'generate_config' to argparse 'parser'.
+    """
+    for name, default in sorted(DEFAULTS.items()):
+        parser.add_argument('--' + name.replace('_', '-'), type=int, default=default, dest=name,
+                            help="default is {}".format(default))
+
+
+def main():
+    from utils.box import to_json, to_yaml
+
+    parser = argparse.ArgumentParser(description='Write a synthetic config, files with .json extension are JSON.')
+    parser.add_argument('filename')
+    add_arguments(parser)
+    args = parser.parse_args()
+    config_dict = generate_config(**dict((name, getattr(args, name)) for name in DEFAULTS))
+    if os.path.splitext(args.filename)[1].lower() == '.json':
+        to_json(config_dict, filename=args.filename)
+    else:
+        to_yaml(config_dict, filename=args.filename)
+
+
+if __name__ == "__main__":
+    main()
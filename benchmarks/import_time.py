@@ -0,0 +1,60 @@
+"""
+Benchmark of import time of DRY and utils modules, every import runs in a new interpreter.
+
+Run from the root of repository:
+    python -m benchmarks.import_time
+
+Importing DRY must not configure logging or import YAML, multiprocessing or config; 'imported' lists the heavy modules
+that are in sys.modules after the import. 'DRY + setup_logging' is the old import of DRY, that configured logging.
+"""
+import os
+import sys
+import json
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPEAT = 10
+HEAVY_MODULES = ['ruamel.yaml', 'yaml', 'orjson', 'multiprocessing', 'logging.config', 'pprint', 'config']
+
+CASES = [
+    ('DRY', 'import DRY'),
+    ('DRY + setup_logging', 'import DRY; DRY.setup_logging()'),
+    ('utils.box', 'import utils.box'),
+    ('utils.stream_loader', 'import utils.stream_loader'),
+    ('utils.include', 'import utils.include'),
+    ('utils.compiled', 'import utils.compiled'),
+]
+
+SCRIPT = """
+import sys, time
+sys.path.insert(0, {base_dir!r})
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+import json, logging
+logging.disable(logging.CRITICAL)
+print(json.dumps([seconds, [name for name in {heavy!r} if name in sys.modules]]))
+"""
+
+
+def import_time(statement):
+    """
+    :return: (best seconds of 'REPEAT' new interpreters, heavy modules that are imported)
+    """
+    script = SCRIPT.format(base_dir=BASE_DIR, statement=statement, heavy=HEAVY_MODULES)
+    results = []
+    for _ in range(REPEAT):
+        output = subprocess.check_output([sys.executable, '-c', script], cwd=BASE_DIR)
+        results.append(json.loads(output.decode('utf-8').strip().splitlines()[-1]))
+    return min(seconds for seconds, _ in results), results[0][1]
+
+
+def main():
+    print("{:>25} {:>10}   {}".format('import', 'ms', 'imported'))
+    for name, statement in CASES:
+        seconds, imported = import_time(statement)
+        print("{:>25} {:>10.1f}   {}".format(name, seconds * 1000, ', '.join(imported) or '-'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark of utils.include.load_files on generated config files: loading in this process, in a thread pool and in a
+process pool.
+
+Run from the root of repository:
+    python -m benchmarks.include [workers]
+
+The default number of workers is the number of CPUs. A main file includes a common file with the base anchor and
+'FILES' files of services that point to it.
+"""
+import os
+import sys
+import shutil
+import logging
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.include import load_files
+
+FILES = 16
+SERVICES_PER_FILE = 500
+KEYS_PER_SERVICE = 10
+
+
+def write_files(directory, files, services):
+    """
+    :return: path of main file
+    """
+    with open(os.path.join(directory, 'common.yaml'), 'w') as f:
+        f.write('base(&base):\n  image: base\n  ports: [80, 443]\n  env:\n    level: info\n')
+    os.mkdir(os.path.join(directory, 'services'))
+    for n in range(files):
+        with open(os.path.join(directory, 'services', 'services_{}.yaml'.format(n)), 'w') as f:
+            f.write('services_{}:\n'.format(n))
+            for i in range(services):
+                f.write('  service_{}:\n    "->": base\n'.format(i))
+                for j in range(KEYS_PER_SERVICE):
+                    f.write('    key_{}: value_{}_{}\n'.format(j, i, j))
+    filename = os.path.join(directory, 'main.yaml')
+    with open(filename, 'w') as f:
+        f.write('$include: [common.yaml, services/*.yaml]\n')
+    return filename
+
+
+def best(func, repeat=3):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() if hasattr(os, 'cpu_count') else 2
+    directory = tempfile.mkdtemp()
+    filename = write_files(directory, FILES, SERVICES_PER_FILE)
+    print("{} files x {} services, {} CPUs".format(
+        FILES, SERVICES_PER_FILE, os.cpu_count() if hasattr(os, 'cpu_count') else '?'))
+    print("{:>20} {:>10} {:>10}".format('mode', 'default', 'fast'))
+    modes = (('1 process', dict(workers=1)),
+             ('{} threads'.format(workers), dict(workers=workers, use_threads=True)),
+             ('{} processes'.format(workers), dict(workers=workers)))
+    for name, kwargs in modes:
+        print("{:>20} {:>10.3f} {:>10.3f}".format(name, best(lambda: load_files([filename], **kwargs), repeat=1),
+                                                  best(lambda: load_files([filename], fast=True, **kwargs))))
+    shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
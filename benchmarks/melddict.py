@@ -0,0 +1,103 @@
+"""
+Benchmark of MeldDict.add and MeldDict.subtract on a deep tree and on a wide tree, and of list strategies on big lists.
+
+Run from the root of repository:
+    python -m benchmarks.melddict
+
+The deep tree is a chain of nested dicts, every level has a few leaves and the next level. The wide tree is one dict
+with a nested dict for every key. add and subtract keep no stack frame per level, 'deep' must not raise RecursionError.
+'owned' adds to a tree of copy_tree in place (like ConfigMerger), the copy is not measured. 'KB' is memory allocated
+by add, traced by tracemalloc: without 'owned' every changed nested dict is copied.
+List strategies and subtract of lists hash items, time per item must stay flat when lists grow.
+"""
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libs.melddict import MeldDict, copy_tree, merge_by_key
+
+DEPTH = 500
+WIDTH = 10000
+LIST_SIZES = [10000, 100000]
+
+
+def make_deep(depth, value):
+    """
+    Chain of 'depth' nested dicts with two leaves and a list in every level.
+    """
+    config_dict = dict()
+    node = config_dict
+    for i in range(depth):
+        node['key_a'] = value
+        node['key_b'] = i
+        node['list'] = [value]
+        node['next'] = dict()
+        node = node['next']
+    return config_dict
+
+
+def make_wide(width, value):
+    """
+    Dict with 'width' keys, every key holds a dict with two leaves and a list.
+    """
+    return dict(('key_{}'.format(i), {'a': value, 'b': i, 'list': [value]}) for i in range(width))
+
+
+def best(func, repeat=20):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def best_owned(func, base, repeat=20):
+    """
+    Best time of 'func' on a new MeldDict of copy_tree of 'base', the copy is not measured.
+    """
+    trees = []
+    return min(timeit.repeat(lambda: func(trees.pop()), setup=lambda: trees.append(MeldDict(copy_tree(base))),
+                             number=1, repeat=repeat))
+
+
+def allocated_kb(func, meld_dict):
+    """
+    :return: memory allocated by 'func(meld_dict)' and kept, in KB
+    """
+    tracemalloc.start()
+    func(meld_dict)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / 1024.0
+
+
+def main():
+    print("{:>15} {:>12} {:>12} {:>12} {:>12} {:>10} {:>10}".format(
+        'tree', 'add', 'add owned', 'subtract', 'sub owned', 'add KB', 'owned KB'))
+    for name, make in (('depth {}'.format(DEPTH), lambda value: make_deep(DEPTH, value)),
+                       ('width {}'.format(WIDTH), lambda value: make_wide(WIDTH, value))):
+        base, other = make(0), make(1)
+        add = lambda meld_dict: meld_dict.add(other)
+        add_owned = lambda meld_dict: meld_dict.add(other, owned=True)
+        print("{:>15} {:>12.4f} {:>12.4f} {:>12.4f} {:>12.4f} {:>10.1f} {:>10.1f}".format(
+            name, best(lambda: add(MeldDict(base))), best_owned(add_owned, base),
+            best(lambda: MeldDict(base).subtract(other)),
+            best_owned(lambda meld_dict: meld_dict.subtract(other, owned=True), base),
+            allocated_kb(add, MeldDict(base)), allocated_kb(add_owned, MeldDict(copy_tree(base)))))
+
+    print("")
+    print("{:>15} {:>12} {:>12} {:>12} {:>12}".format('list items', 'append', 'unique', 'merge_by_key', 'subtract'))
+    for size in LIST_SIZES:
+        # Half of the items of 'other' are in 'base'
+        base = {'ports': list(range(size)), 'hosts': [{'name': i, 'port': 0} for i in range(size)]}
+        other = {'ports': list(range(size // 2, size + size // 2)),
+                 'hosts': [{'name': i, 'port': 1} for i in range(size // 2, size + size // 2)]}
+        strategies = {'unique': {('ports',): 'unique'}, 'merge_by_key': {('hosts',): merge_by_key('name')}}
+        print("{:>15} {:>12.4f} {:>12.4f} {:>12.4f} {:>12.4f}".format(
+            size, best(lambda: MeldDict(base).add(other), repeat=3),
+            best(lambda: MeldDict(base).add(other, strategies['unique']), repeat=3),
+            best(lambda: MeldDict(base).add(other, strategies['merge_by_key']), repeat=3),
+            best(lambda: MeldDict(ports=base['ports']).subtract(other), repeat=3)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark of merging a config of many independent groups of anchors and pointers, in one process and with 'workers'.
+
+Run from the root of repository:
+    python -m benchmarks.parallel [workers]
+
+The default number of workers is the number of CPUs. Every group has its own anchor and services that point to it, so
+every group is a component of ConfigMerger.merge_components.
+"""
+import os
+import sys
+import copy
+import logging
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DRY import ConfigMerger
+
+GROUPS = 32
+ANCHOR_LEAVES = 500
+POINTERS = 200
+
+
+def make_config(groups, anchor_leaves, pointers):
+    """
+    Config with 'groups' groups, every group has a base anchor and 'pointers' services that override one nested key.
+    """
+    config_dict = dict()
+    for g in range(groups):
+        base = dict()
+        for i in range(anchor_leaves // 10):
+            base['group_{}'.format(i)] = dict(('key_{}'.format(j), 'value_{}'.format(j)) for j in range(10))
+        services = dict()
+        for i in range(pointers):
+            services['service_{}'.format(i)] = {'->': 'base_{}'.format(g), 'group_0': {'key_0': i}}
+        config_dict['group_{}'.format(g)] = {'base(&base_{})'.format(g): base, 'services': services}
+    return config_dict
+
+
+def best(func, repeat=2):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() if hasattr(os, 'cpu_count') else 2
+    config_dict = make_config(GROUPS, ANCHOR_LEAVES, POINTERS)
+    serial = ConfigMerger(copy.deepcopy(config_dict), merge_at_init=True)
+    parallel = ConfigMerger(copy.deepcopy(config_dict), merge_at_init=True, workers=workers)
+    if serial.return_value != 1 or parallel.return_value != 1 or serial.config_dict != parallel.config_dict:
+        print('Error in Config Merger')
+        return -1
+
+    print("{} groups x {} pointers, anchors of {} leaves, {} CPUs".format(
+        GROUPS, POINTERS, ANCHOR_LEAVES, os.cpu_count() if hasattr(os, 'cpu_count') else '?'))
+    print("{:>10} {:>12} {:>15}".format('workers', 'deepcopy', 'copy_on_write'))
+    for n in (None, workers):
+        print("{:>10} {:>12.3f} {:>15.3f}".format(
+            n or 1, best(lambda: ConfigMerger(config_dict, merge_at_init=True, workers=n)),
+            best(lambda: ConfigMerger(config_dict, merge_at_init=True, copy_on_write=True, workers=n))))
+    return 1
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Benchmark suite on a synthetic config of benchmarks.generator: ConfigMerger.merge, FlatDict operations, MeldDict.add and
+the loaders and writers of utils.box. Results are written to a JSON file for comparing versions.
+
+Run from the root of repository:
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --output new.json --compare results.json
+
+Every case reports the best wall time of '--repeat' runs and the peak memory of one more run that is traced by
+tracemalloc (memory allocated by Python while the case runs, setup of case excluded). Arguments of
+benchmarks.generator change the config, '--only' runs cases whose names start with its values.
+"""
+import os
+import sys
+import copy
+import json
+import shutil
+import logging
+import argparse
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DRY import ConfigMerger
+from libs.flatdict import FlatDict
+from libs.melddict import MeldDict
+from utils.box import load_from_json, load_from_yaml, to_json, to_yaml
+from benchmarks.generator import DEFAULTS, add_arguments, generate_config
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_VERSION = 1
+
+
+def make_cases(config_dict, directory):
+    """
+    :return: list of (name, setup, func), 'func(setup())' is measured.
+    """
+    yaml_file = os.path.join(directory, 'config.yaml')
+    json_file = os.path.join(directory, 'config.json')
+    to_yaml(config_dict, filename=yaml_file)
+    to_json(config_dict, filename=json_file)
+    flat = FlatDict(config_dict)
+    flat_keys = list(flat.keys())
+    chain = config_dict['anchors']['chain_0']
+    anchor, pointer = [value for _, value in sorted(chain.items())][-2:]
+
+    def merger(**kwargs):
+        return lambda: ConfigMerger(config_dict, merge_at_init=False, **kwargs)
+
+    return [
+        ('merge.init', lambda: None, lambda _: ConfigMerger(config_dict, merge_at_init=False)),
+        ('merge.merge', merger(), lambda merger_obj: merger_obj.merge()),
+        ('merge.merge_copy_on_write', merger(copy_on_write=True), lambda merger_obj: merger_obj.merge()),
+        ('merge.merge_inplace', lambda: ConfigMerger(copy.deepcopy(config_dict), merge_at_init=False, inplace=True),
+         lambda merger_obj: merger_obj.merge()),
+        ('flatdict.build', lambda: None, lambda _: FlatDict(config_dict)),
+        ('flatdict.keys', lambda: FlatDict(config_dict), lambda flat_dict: list(flat_dict.keys())),
+        ('flatdict.getitem', lambda: flat, lambda flat_dict: [flat_dict[key] for key in flat_keys]),
+        ('flatdict.as_dict', lambda: flat, lambda flat_dict: flat_dict.as_dict()),
+        ('melddict.add', lambda: (MeldDict(copy.deepcopy(anchor)), pointer),
+         lambda args: args[0].add(args[1])),
+        ('melddict.add_config', lambda: (MeldDict(copy.deepcopy(config_dict)), copy.deepcopy(config_dict)),
+         lambda args: args[0].add(args[1])),
+        ('box.to_yaml', lambda: os.path.join(directory, 'out.yaml'),
+         lambda filename: to_yaml(config_dict, filename=filename)),
+        ('box.to_json', lambda: os.path.join(directory, 'out.json'),
+         lambda filename: to_json(config_dict, filename=filename)),
+        ('box.load_from_yaml', lambda: yaml_file, lambda filename: load_from_yaml(filename=filename)),
+        ('box.load_from_yaml_fast', lambda: yaml_file, lambda filename: load_from_yaml(filename=filename, fast=True)),
+        ('box.load_from_json', lambda: json_file, lambda filename: load_from_json(filename=filename)),
+        ('box.load_from_json_fast', lambda: json_file, lambda filename: load_from_json(filename=filename, fast=True)),
+    ]
+
+
+def measure(setup, func, repeat):
+    """
+    :return: (best seconds of 'repeat' runs, peak MB of a run traced by tracemalloc)
+    """
+    times = []
+    for _ in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        func(args)
+        times.append(time.perf_counter() - start)
+
+    args = setup()
+    tracemalloc.start()
+    try:
+        func(args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(times), peak / 1024.0 / 1024.0
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=BASE_DIR,
+                                       stderr=subprocess.STDOUT).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, filename):
+    """
+    Print ratios of times and peaks of 'results' to the results in 'filename'.
+    """
+    with open(filename) as f:
+        old = json.load(f)
+    if old['params'] != results['params']:
+        print("Params of {} are different: {}".format(filename, old['params']))
+    old_cases = dict((case['name'], case) for case in old['cases'])
+    print("\nCompared to {} ({}):".format(filename, old.get('commit')))
+    print("{:<30} {:>12} {:>12}".format('case', 'time ratio', 'peak ratio'))
+    for case in results['cases']:
+        old_case = old_cases.get(case['name'])
+        if old_case is None:
+            continue
+        print("{:<30} {:>12.2f} {:>12.2f}".format(case['name'], case['seconds'] / max(old_case['seconds'], 1e-9),
+                                                  case['peak_mb'] / max(old_case['peak_mb'], 1e-9)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run benchmarks on a synthetic config and write results to JSON.')
+    parser.add_argument('--output', default='benchmark_results.json', help="results file, default is %(default)s")
+    parser.add_argument('--repeat', type=int, default=3, help="runs of every case, default is %(default)s")
+    parser.add_argument('--only', nargs='*', default=None, help="prefixes of names of cases to run")
+    parser.add_argument('--compare', default=None, help="results file of another version to compare with")
+    add_arguments(parser)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    params = dict((name, getattr(args, name)) for name in DEFAULTS)
+    config_dict = generate_config(**params)
+    directory = tempfile.mkdtemp()
+    results = {'version': RESULTS_VERSION,
+               'commit': git_commit(),
+               'python': platform.python_version(),
+               'platform': platform.platform(),
+               'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+               'repeat': args.repeat,
+               'params': params,
+               'cases': []}
+    print("{:<30} {:>12} {:>12}".format('case', 'seconds', 'peak MB'))
+    try:
+        for name, setup, func in make_cases(config_dict, directory):
+            if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                continue
+            seconds, peak = measure(setup, func, args.repeat)
+            results['cases'].append({'name': name, 'seconds': seconds, 'peak_mb': peak})
+            print("{:<30} {:>12.4f} {:>12.2f}".format(name, seconds, peak))
+            sys.stdout.flush()
+    finally:
+        shutil.rmtree(directory)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print("Results: {}".format(args.output))
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark of loading and merging a big generated YAML config: utils.box.load_from_yaml and ConfigMerger, against
+utils.stream_loader.load_config and ConfigMerger with its index and inplace.
+
+Run from the root of repository:
+    python -m benchmarks.stream_loader [number of services]
+
+Every mode runs in its own process and reports load time, merge time and peak RSS (resource.getrusage, Linux/macOS
+only).
+"""
+import os
+import sys
+import subprocess
+import resource
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SERVICES = 20000
+KEYS_PER_SERVICE = 10
+
+
+def write_config(filename, services):
+    """
+    YAML config with one base anchor, every service points to it and has 'KEYS_PER_SERVICE' keys of its own.
+    """
+    with open(filename, 'w') as f:
+        f.write('base(&base):\n  image: base\n  ports: [80, 443]\n  env:\n    level: info\n')
+        f.write('services:\n')
+        for i in range(services):
+            f.write('  service_{}:\n    "->": base\n'.format(i))
+            for j in range(KEYS_PER_SERVICE):
+                f.write('    key_{}: value_{}_{}\n'.format(j, i, j))
+            f.write('    env:\n      level: debug\n')
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        # bytes on macOS, kilobytes on Linux
+        peak /= 1024
+    return peak / 1024.0
+
+
+def run(mode, filename):
+    import logging
+    logging.disable(logging.CRITICAL)
+    from DRY import ConfigMerger
+    from utils.box import load_from_yaml
+    from utils.stream_loader import load_config
+
+    base_rss = peak_rss_mb()
+    start = time.time()
+    if mode == 'stream':
+        config_dict, index = load_config(filename)
+        loaded = time.time()
+        merger_obj = ConfigMerger(config_dict, merge_at_init=True, index=index, inplace=True)
+    else:
+        config_dict = load_from_yaml(filename=filename)
+        loaded = time.time()
+        merger_obj = ConfigMerger(config_dict, merge_at_init=True)
+    merged = time.time()
+    if merger_obj.return_value != 1:
+        print('Error in Config Merger')
+        return -1
+    print("{:>10} {:>10.3f} {:>10.3f} {:>15.1f}".format(mode, loaded - start, merged - loaded, peak_rss_mb() - base_rss))
+    return 1
+
+
+def main():
+    if len(sys.argv) > 2:
+        return run(sys.argv[1], sys.argv[2])
+
+    services = int(sys.argv[1]) if len(sys.argv) > 1 else SERVICES
+    filename = os.path.join(tempfile.mkdtemp(), 'config.yaml')
+    write_config(filename, services)
+    print("{} services, {:.1f} MB of YAML".format(services, os.path.getsize(filename) / 1024.0 / 1024.0))
+    print("{:>10} {:>10} {:>10} {:>15}".format('mode', 'load', 'merge', 'peak RSS (MB)'))
+    sys.stdout.flush()
+    for mode in ('box', 'stream'):
+        subprocess.call([sys.executable, '-m', 'benchmarks.stream_loader', mode, filename])
+    os.remove(filename)
+
+
+if __name__ == "__main__":
+    main()
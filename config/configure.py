@@ -7,7 +7,6 @@ import sys
 import logging
 import logging.config
 import logging.handlers
-from utils.box import load_from_yaml, load_from_json, to_json, to_yaml
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -47,6 +46,8 @@ def configure_logging(logger_name):
 
 def setup_logging(path='config/logging.yaml', name="DRY"):
     if os.path.exists(path):
+        # Imported on use, YAML is imported only for loading the config file
+        from utils.box import load_from_yaml
         log_config = load_from_yaml(filename=path)
         logging.config.dictConfig(log_config)
         return None
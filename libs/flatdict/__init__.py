@@ -1,3 +1,3 @@
 # -*- coding: utf-8 -*-
 
-from .flatdict import FlatDict
+from .flatdict import FlatDict, FrozenFlatDict
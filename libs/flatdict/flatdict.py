@@ -2,7 +2,13 @@
 key/value pair mapping of nested dictionaries.
 
 """
-import collections
+import bisect
+import weakref
+
+try:
+    from collections.abc import Mapping, MutableMapping
+except ImportError:  # Python 2
+    from collections import Mapping, MutableMapping
 
 __version__ = '3.1.0'
 
@@ -15,12 +21,17 @@ except NameError:
     basestring = str
 
 
-class FlatDict(collections.MutableMapping):
+class FlatDict(MutableMapping):
     """:class:`~flatdict.FlatDict` is a dictionary object that allows for
     single level, delimited key/value pair mapping of nested dictionaries.
     The default delimiter value is ``:`` but can be changed in the constructor
     or by calling :meth:`FlatDict.set_delimiter`.
 
+    Every instance keeps the number of its flat keys, and an index of its flat
+    keys that is built on first use. Both are updated when a key is set or
+    deleted, also in nested children, so :meth:`FlatDict.__len__` does not
+    walk the children and iteration does not split or sort keys.
+
     """
     _COERCE = dict
 
@@ -28,7 +39,10 @@ class FlatDict(collections.MutableMapping):
         super(FlatDict, self).__init__()
         self._values = {}
         self._delimiter = delimiter
-        self.update(value)
+        self._size = 0
+        self._index = None
+        self._parents = []
+        self._fill(value)
 
     def __contains__(self, key):
         """Check to see if the key exists, checking for both delimited and
@@ -56,9 +70,9 @@ class FlatDict(collections.MutableMapping):
             pk, ck = key.split(self._delimiter, 1)
             del self._values[pk][ck]
             if not self._values[pk]:
-                del self._values[pk]
+                self._del_value(pk)
         else:
-            del self._values[key]
+            self._del_value(key)
 
     def __eq__(self, other):
         """Check for equality against the other value
@@ -94,6 +108,8 @@ class FlatDict(collections.MutableMapping):
         :raises: KeyError
 
         """
+        if not self._has_delimiter(key):
+            return self._values[key]
         values = self._values
         for part in key.split(self._delimiter):
             values = values[part]
@@ -106,7 +122,7 @@ class FlatDict(collections.MutableMapping):
         :raises: RuntimeError
 
         """
-        return iter(self.keys())
+        return iter(self._flat_index())
 
     def __len__(self):
         """Return the number of items.
@@ -114,7 +130,7 @@ class FlatDict(collections.MutableMapping):
         :rtype: int
 
         """
-        return len(self.keys())
+        return self._size
 
     def __reduce__(self):
         """Return state information for pickling
@@ -147,14 +163,15 @@ class FlatDict(collections.MutableMapping):
         if self._has_delimiter(key):
             pk, ck = key.split(self._delimiter, 1)
             if pk not in self._values:
-                self._values[pk] = self.__class__({ck: value}, self._delimiter)
+                self._set_value(
+                    pk, self.__class__({ck: value}, self._delimiter))
                 return
             elif not isinstance(self._values[pk], FlatDict):
                 raise TypeError(
                     'Assignment to invalid type for key {}'.format(pk))
             self._values[pk][ck] = value
         else:
-            self._values[key] = value
+            self._set_value(key, value)
 
     def __str__(self):
         """Return the string value of the instance.
@@ -171,25 +188,13 @@ class FlatDict(collections.MutableMapping):
         :rtype: dict
 
         """
-        out = dict({})
-        for key in self.keys():
-            if self._has_delimiter(key):
-                pk, ck = key.split(self._delimiter, 1)
-                if self._has_delimiter(ck):
-                    ck = ck.split(self._delimiter, 1)[0]
-                if isinstance(self._values[pk], FlatDict) and pk not in out:
-                    out[pk] = dict()
-                if isinstance(self._values[pk][ck], FlatDict):
-                    out[pk][ck] = self._values[pk][ck].as_dict()
-                else:
-                    out[pk][ck] = self._values[pk][ck]
-            else:
-                out[key] = self._values[key]
-        return out
+        return dict((key, value.as_dict() if isinstance(value, FlatDict)
+                     else value) for key, value in self._values.items())
 
     def clear(self):
         """Remove all items from the flat dictionary."""
-        self._values.clear()
+        for key in list(self._values.keys()):
+            self._del_value(key)
 
     def copy(self):
         """Return a shallow copy of the flat dictionary.
@@ -199,6 +204,53 @@ class FlatDict(collections.MutableMapping):
         """
         return self.__class__(self.as_dict(), delimiter=self._delimiter)
 
+    @classmethod
+    def from_flat_items(cls, items, delimiter=':'):
+        """Build a flat dictionary from ``(flat key, value)`` pairs, creating
+        the nested instances directly instead of assigning keys one by one.
+
+        :param iterable items: Iterable of flat key, value pairs
+        :param str delimiter: The delimiter of flat keys
+        :rtype: flatdict.FlatDict
+        :raises: TypeError
+
+        """
+        root = cls(delimiter=delimiter)
+        built = [(root, 0)]
+        nodes = {}  # flat key of a nested instance -> instance
+        for key, value in items:
+            if isinstance(key, basestring) and delimiter in key:
+                prefix, key = key.rsplit(delimiter, 1)
+                node = nodes.get(prefix)
+                if node is None:
+                    node = root._nested_path(prefix, nodes, built)
+            else:
+                node = root
+            if isinstance(value, cls._COERCE) and root._needs_coerce(value):
+                value = cls(value, delimiter)
+            old = node._values.get(key, NO_DEFAULT)
+            if _is_flat_dict(old):
+                old._unlink(node, key)
+                # Nested instances of old are not in the flat dictionary now
+                nodes.clear()
+            if _is_flat_dict(value):
+                value._link(node, key)
+            node._values[key] = value
+        cls._count_built(built)
+        return root
+
+    @classmethod
+    def from_nested(cls, value, delimiter=':'):
+        """Build a flat dictionary from nested dictionaries. The nested
+        instances are created directly instead of assigning keys one by one.
+
+        :param dict value: The nested dictionaries
+        :param str delimiter: The delimiter of flat keys
+        :rtype: flatdict.FlatDict
+
+        """
+        return cls(value, delimiter)
+
     def get(self, key, d=None):
         """Return the value for key if key is in the flat dictionary, else
         default. If default is not given, it defaults to ``None``, so that this
@@ -226,7 +278,8 @@ class FlatDict(collections.MutableMapping):
         :rtype: list
 
         """
-        return [(k, self.__getitem__(k)) for k in self.keys()]
+        return [(k, node._values[ck])
+                for k, (node, ck) in self._flat_index().items()]
 
     def iteritems(self):
         """Return an iterator over the flat dictionary's (key, value) pairs.
@@ -273,21 +326,39 @@ class FlatDict(collections.MutableMapping):
         for value in self.values():
             yield value
 
-    def keys(self):
+    def iter_prefix(self, prefix):
+        """Iterate over the ``(key, value)`` pairs of the flat keys that are
+        ``prefix`` or start with ``prefix`` and the delimiter. The nested
+        instances of ``prefix`` are found by its keys, so it takes
+        O(depth + k) for k keys instead of a scan of all keys.
+
+        :param str prefix: The flat key of a nested dictionary or a value
+        :rtype: Iterator
+
+        """
+        node = self
+        for part in prefix.split(self._delimiter) \
+                if self._has_delimiter(prefix) else [prefix]:
+            if not isinstance(node, FlatDict) or part not in node._values:
+                return
+            node = node._values[part]
+        if not isinstance(node, FlatDict) or not node:
+            yield prefix, node
+            return
+        for key, (child, ck) in node._leaves(prefix + self._delimiter):
+            yield key, child._values[ck]
+
+    def keys(self, sort=False):
         """Return a copy of the flat dictionary's list of keys.
         See the note for :meth:`flatdict.FlatDict.items`.
 
+        :param bool sort: Return the keys sorted
         :rtype: list
 
         """
-        keys = []
-        for key, value in self._values.items():
-            if isinstance(value, (FlatDict, dict)):
-                nested = [self._delimiter.join([key, k]) for k in value.keys()]
-                keys += nested if nested else [key]
-            else:
-                keys.append(key)
-        return sorted(keys)
+        if sort:
+            return sorted(self._flat_index())
+        return list(self._flat_index())
 
     def pop(self, key, default=NO_DEFAULT):
         """If key is in the flat dictionary, remove it and return its value,
@@ -305,6 +376,27 @@ class FlatDict(collections.MutableMapping):
         self.__delitem__(key)
         return value
 
+    def subtree(self, prefix):
+        """Return the nested :class:`~flatdict.FlatDict` of ``prefix``, its
+        keys are the flat keys under ``prefix`` without ``prefix``. It is the
+        nested instance, not a copy, changes of it are changes of this flat
+        dictionary.
+
+        :param str prefix: The flat key of a nested dictionary
+        :rtype: flatdict.FlatDict
+        :raises: KeyError
+
+        """
+        node = self
+        for part in prefix.split(self._delimiter) \
+                if self._has_delimiter(prefix) else [prefix]:
+            if not isinstance(node, FlatDict) or part not in node._values:
+                raise KeyError(prefix)
+            node = node._values[part]
+        if not isinstance(node, FlatDict):
+            raise KeyError(prefix)
+        return node
+
     def setdefault(self, key, default):
         """If key is in the flat dictionary, return its value. If not,
         insert key with a value of default and return default.
@@ -336,6 +428,7 @@ class FlatDict(collections.MutableMapping):
         for key in self._values.keys():
             if isinstance(self._values[key], FlatDict):
                 self._values[key].set_delimiter(delimiter)
+        self._reset_index()
 
     def update(self, other=None, **kwargs):
         """Update the flat dictionary with the key/value pairs from other,
@@ -350,6 +443,11 @@ class FlatDict(collections.MutableMapping):
         :rtype: None
 
         """
+        if not self._values and self._index is None and \
+                not self._live_parents():
+            # Bulk fill only when there is no flat index to keep in sync
+            self._fill(other or kwargs)
+            return
         [self.__setitem__(k, v) for k, v in dict(other or kwargs).items()]
 
     def values(self):
@@ -359,7 +457,7 @@ class FlatDict(collections.MutableMapping):
         :rtype: list
 
         """
-        return [self.__getitem__(k) for k in self.keys()]
+        return [node._values[ck] for node, ck in self._flat_index().values()]
 
     def _has_delimiter(self, key):
         """Checks to see if the key contains the delimiter.
@@ -369,21 +467,453 @@ class FlatDict(collections.MutableMapping):
         """
         return isinstance(key, basestring) and self._delimiter in key
 
+    def _fill(self, value):
+        """Fill an empty instance from nested dictionaries by walking them
+        once. Nested instances are built directly and their sizes are counted
+        at the end, keys with the delimiter are assigned one by one after.
+
+        :param mixed value: Nested dictionaries or key, value pairs
+
+        """
+        if not value:
+            return
+        if isinstance(value, FlatDict):
+            value = value.as_dict()
+        elif not isinstance(value, dict) and isinstance(self._values, dict):
+            # Instances that hold a list are filled from the list
+            value = dict(value)
+        coerce = self._COERCE
+        delimiter = self._delimiter
+        built = [(self, 0)]
+        delimited = []
+        stack = [(self, value, 0)]
+        while stack:
+            node, source, depth = stack.pop()
+            values = node._values
+            for key, child in node._source_items(source):
+                if isinstance(key, basestring) and delimiter in key:
+                    delimited.append((node, key, child))
+                    continue
+                if isinstance(child, coerce) and node._needs_coerce(child):
+                    new = node._new_child(child)
+                    new._link(node, key)
+                    stack.append((new, child, depth + 1))
+                    built.append((new, depth + 1))
+                    child = new
+                elif _is_flat_dict(child):
+                    child._link(node, key)
+                values[key] = child
+        self._count_built(built)
+        for node, key, child in delimited:
+            node[key] = child
+
+    def _nested_path(self, prefix, nodes, built):
+        """Return the nested instance of a flat key, creating missing nested
+        instances, for :meth:`~flatdict.FlatDict.from_flat_items`.
+
+        :param str prefix: The flat key of the nested instance
+        :param dict nodes: Nested instances by flat key, new ones are added
+        :param list built: ``(instance, depth)`` pairs of instances to count
+        :rtype: flatdict.FlatDict
+        :raises: TypeError
+
+        """
+        node = self
+        keys = prefix.split(self._delimiter)
+        for depth, key in enumerate(keys, 1):
+            child = node._values.get(key, NO_DEFAULT)
+            if child is NO_DEFAULT:
+                child = node._new_child({})
+                child._link(node, key)
+                node._values[key] = child
+            elif not _is_flat_dict(child):
+                raise TypeError(
+                    'Assignment to invalid type for key {}'.format(key))
+            # Keys are added to it directly, so it is counted again
+            built.append((child, depth))
+            node = child
+            nodes[self._delimiter.join(keys[:depth])] = node
+        return node
+
+    def _new_child(self, source):
+        """Return an empty nested instance for a value to coerce.
+
+        :rtype: flatdict.FlatDict
+
+        """
+        return self.__class__(delimiter=self._delimiter)
+
+    def _needs_coerce(self, value):
+        """Check if a value is coerced to a nested instance.
+
+        :rtype: bool
+
+        """
+        return isinstance(value, self._COERCE) and \
+            not isinstance(value, FlatDict)
+
+    @staticmethod
+    def _source_items(source):
+        """Return the key, value pairs of a value to coerce.
+
+        :rtype: iterable
+
+        """
+        if isinstance(source, FlatDict):
+            return source.as_dict().items()
+        return source.items()
+
+    @staticmethod
+    def _count_built(built):
+        """Count the flat keys of instances that are built directly, deeper
+        instances first.
+
+        :param list built: ``(instance, depth)`` pairs
+
+        """
+        for node, _ in sorted(built, key=lambda item: item[1], reverse=True):
+            size = 0
+            for value in node._values.values():
+                size += max(value._size, 1) if _is_flat_dict(value) else 1
+            node._size = size
+
+    def _set_value(self, key, value):
+        """Assign the value to a key of this level, updating the size and
+        flat key index of this instance and of its parents.
+
+        :param mixed key: The key for the item
+        :param mixed value: The value for the item
+
+        """
+        old = self._values.get(key, NO_DEFAULT)
+        self._values[key] = value
+        old_is_child = _is_flat_dict(old)
+        if old_is_child:
+            old._unlink(self, key)
+        if _is_flat_dict(value):
+            value._link(self, key)
+        elif not old_is_child:
+            if old is NO_DEFAULT and self._index is None and \
+                    not self._parents:
+                self._size += 1
+            elif old is NO_DEFAULT:
+                self._update_index(
+                    [((), [(key, (self, key))], [])] if self._tracked()
+                    else [], 1)
+            # Else the flat key is the same, only its value is changed
+            return
+        if self._tracked():
+            changes = [((), self._entries(key, value),
+                        [k for k, _ in self._entries(key, old)])]
+        else:
+            changes = []
+        self._update_index(changes, self._count(value) - self._count(old))
+
+    def _del_value(self, key):
+        """Delete a key of this level, updating the size and flat key index
+        of this instance and of its parents.
+
+        :param mixed key: The key to delete
+        :raises: KeyError
+
+        """
+        old = self._values.pop(key)
+        if isinstance(old, FlatDict):
+            old._unlink(self, key)
+        changes = [((), [], [k for k, _ in self._entries(key, old)])] \
+            if self._tracked() else []
+        self._update_index(changes, -self._count(old))
+
+    def _update_index(self, changes, delta):
+        """Apply a change of flat keys to this instance and its parents.
+        Only an instance that is not nested keeps a flat key index, so the
+        keys of a change are joined to its path once, at that instance.
+
+        :param list changes: ``(path, added, removed)`` triples, ``added``
+            has the ``(flat key, (instance, key))`` pairs and ``removed`` the
+            flat keys, both relative to the nested instance at the tuple of
+            keys ``path`` below this instance
+        :param int delta: Change of the number of flat keys
+
+        """
+        old_size = self._size
+        self._size += delta
+        if self._index is not None:
+            for path, added, removed in changes:
+                if path:
+                    prefix = self._delimiter.join(path + ('',))
+                    removed = [prefix + key for key in removed]
+                    added = [(prefix + key, location)
+                             for key, location in added]
+                for key in removed:
+                    del self._index[key]
+                self._index.update(added)
+        for parent, pk in self._live_parents():
+            parent_changes = [((pk,) + path, added, removed)
+                              for path, added, removed in changes]
+            # An empty child is a flat key of its parent
+            if not old_size and self._size:
+                parent_changes.append(((), [], [pk]))
+            elif old_size and not self._size:
+                parent_changes.append(((), [(pk, (parent, pk))], []))
+            parent._update_index(parent_changes,
+                                 max(self._size, 1) - max(old_size, 1))
+
+    def _flat_index(self):
+        """Return the flat key index. An instance that is not nested keeps
+        it after the first use, a nested instance builds it from its values
+        every time, so each flat key is held by one index only.
+
+        :rtype: dict
+
+        """
+        if self._index is not None:
+            return self._index
+        index = dict(self._leaves())
+        if not self._live_parents():
+            self._index = index
+        return index
+
+    def _leaves(self, prefix=''):
+        """Return the ``(flat key, (instance, key))`` pairs of all flat keys,
+        the instance holds the value of the flat key. The nested instances
+        are walked in order and each flat key is joined once.
+
+        :param str prefix: A prefix of the flat keys
+        :rtype: list
+
+        """
+        if self._index is not None:
+            if not prefix:
+                return list(self._index.items())
+            return [(prefix + key, location)
+                    for key, location in self._index.items()]
+        delimiter = self._delimiter
+        leaves = []
+        stack = [(self, iter(self._values.items()), prefix)]
+        while stack:
+            node, items, path = stack[-1]
+            for key, value in items:
+                if _is_flat_dict(value) and value._size:
+                    stack.append((value, iter(value._values.items()),
+                                  path + key + delimiter))
+                    break
+                leaves.append((path + key if path else key, (node, key)))
+            else:
+                stack.pop()
+        return leaves
+
+    def _entries(self, key, value):
+        """Return the flat key index entries of a value of this level.
+
+        :rtype: list
+
+        """
+        if value is NO_DEFAULT:
+            return []
+        if isinstance(value, FlatDict) and value._size:
+            return value._leaves(key + self._delimiter)
+        return [(key, (self, key))]
+
+    @staticmethod
+    def _count(value):
+        """Return the number of flat keys of a value.
+
+        :rtype: int
+
+        """
+        if value is NO_DEFAULT:
+            return 0
+        if isinstance(value, FlatDict):
+            return max(value._size, 1)
+        return 1
+
+    def _live_parents(self):
+        """Return the ``(parent, key)`` pairs of the instances that hold this
+        instance as a value.
+
+        :rtype: list
+
+        """
+        return [(ref(), pk) for ref, pk in self._parents if ref() is not None]
+
+    def _link(self, parent, key):
+        """Add a parent after this instance is assigned to it, the flat key
+        index of this instance is dropped as the parent keeps its keys."""
+        self._parents.append((weakref.ref(parent), key))
+        self._index = None
+
+    def _unlink(self, parent, key):
+        """Forget a parent after this instance is removed from it."""
+        self._parents = [(ref, pk) for ref, pk in self._parents
+                         if ref() is not None and
+                         not (ref() is parent and pk == key)]
+
+    def _tracked(self):
+        """Check if this instance or one of its parents has a flat key index.
+
+        :rtype: bool
+
+        """
+        return self._index is not None or any(
+            parent._tracked() for parent, _ in self._live_parents())
+
+    def _reset_index(self):
+        """Drop the flat key index of this instance and its parents, they are
+        built again on next use."""
+        self._index = None
+        for parent, _ in self._live_parents():
+            parent._reset_index()
+
+
+def _is_flat_dict(value):
+    """Check if the value is a :class:`~flatdict.FlatDict`. Results are kept
+    by type, isinstance with an abstract base class is slow for other values.
+
+    :rtype: bool
+
+    """
+    cls = type(value)
+    try:
+        return _FLAT_DICT_TYPES[cls]
+    except KeyError:
+        _FLAT_DICT_TYPES[cls] = issubclass(cls, FlatDict)
+        return _FLAT_DICT_TYPES[cls]
+
+
+_FLAT_DICT_TYPES = {}
+
+
+class _ListValues(object):
+    """The values of a :class:`~flatdict.FlatterDict` that holds a list,
+    tuple or set, kept in a list by offset instead of a dict. Keys are the
+    offsets as strings, like flat keys, or as integers.
+
+    A deleted offset leaves a hole, so the keys of the next offsets do not
+    change.
+
+    """
+    __slots__ = ('_list', '_size')
+
+    def __init__(self):
+        self._list = []
+        self._size = 0
+
+    def __contains__(self, key):
+        offset = self._offset(key)
+        return 0 <= offset < len(self._list) and \
+            self._list[offset] is not _HOLE
+
+    def __delitem__(self, key):
+        offset = self._offset(key)
+        if not 0 <= offset < len(self._list) or \
+                self._list[offset] is _HOLE:
+            raise KeyError(key)
+        self._list[offset] = _HOLE
+        self._size -= 1
+        while self._list and self._list[-1] is _HOLE:
+            self._list.pop()
+
+    def __getitem__(self, key):
+        offset = self._offset(key)
+        if 0 <= offset < len(self._list):
+            value = self._list[offset]
+            if value is not _HOLE:
+                return value
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return self._size
+
+    def __setitem__(self, key, value):
+        offset = self._offset(key)
+        if offset < 0:
+            raise TypeError(
+                'Assignment to invalid type for key {}'.format(key))
+        if offset == len(self._list):
+            self._list.append(value)
+            self._size += 1
+            return
+        if offset > len(self._list):
+            self._list.extend([_HOLE] * (offset - len(self._list) + 1))
+        if self._list[offset] is _HOLE:
+            self._size += 1
+        self._list[offset] = value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def items(self):
+        return [(str(offset), value) for offset, value in enumerate(self._list)
+                if value is not _HOLE]
+
+    def keys(self):
+        return [str(offset) for offset, value in enumerate(self._list)
+                if value is not _HOLE]
+
+    def pop(self, key, default=NO_DEFAULT):
+        try:
+            value = self[key]
+        except KeyError:
+            if default is NO_DEFAULT:
+                raise
+            return default
+        del self[key]
+        return value
+
+    def values(self):
+        return [value for value in self._list if value is not _HOLE]
+
+    @staticmethod
+    def _offset(key):
+        """Return the offset of a key, or -1 if it is not an offset.
+
+        :rtype: int
+
+        """
+        try:
+            offset = int(key)
+        except (TypeError, ValueError):
+            return -1
+        return offset if offset >= 0 else -1
+
+
+_HOLE = object()
+
 
 class FlatterDict(FlatDict):
     """Like :class:`~flatdict.FlatDict` but also coerces lists and sets
-     to child-dict instances with the offset as the key. Alternative to
+     to child instances with the offset as the key. Alternative to
      the implementation added in v1.2 of FlatDict.
 
+     The values of a child that holds a list, tuple or set are kept in a list,
+     offsets are strings only in flat keys, so ``hosts:123`` and
+     ``flat['hosts'][123]`` get the item at offset 123.
+
     """
     _COERCE = (list, tuple, set, dict, FlatDict)
     _ARRAYS = (list, set, tuple)
 
     def __init__(self, value=None, delimiter=':'):
         self.original_type = type(value)
-        if self.original_type in self._ARRAYS:
-            value = dict([(str(i), v) for i, v in enumerate(value)])
-        super(FlatterDict, self).__init__(value, delimiter)
+        super(FlatterDict, self).__init__(None, delimiter)
+        if isinstance(value, self._ARRAYS):
+            self._values = _ListValues()
+        self._fill(value)
+
+    def __reduce__(self):
+        """Return state information for pickling
+
+        :rtype: tuple
+
+        """
+        return type(self), (self._as_original(), self._delimiter)
 
     def __setitem__(self, key, value):
         """Assign the value to the key, dynamically building nested
@@ -400,13 +930,13 @@ class FlatterDict(FlatDict):
         if self._has_delimiter(key):
             pk, ck = key.split(self._delimiter, 1)
             if pk not in self._values:
-                self._values[pk] = self.__class__({ck: value}, self._delimiter)
+                self._set_value(
+                    pk, self.__class__({ck: value}, self._delimiter))
                 return
             if getattr(self._values[pk],
                        'original_type', None) in self._ARRAYS:
-                try:
-                    int(ck)
-                except ValueError:
+                if _ListValues._offset(
+                        ck.split(self._delimiter, 1)[0]) < 0:
                     raise TypeError(
                         'Assignment to invalid type for key {}{}{}'.format(
                             pk, self._delimiter, ck))
@@ -415,7 +945,7 @@ class FlatterDict(FlatDict):
                     'Assignment to invalid type for key {}'.format(pk))
             self._values[pk][ck] = value
         else:
-            self._values[key] = value
+            self._set_value(key, value)
 
     def as_dict(self):
         """Return the :class:`~flatdict.FlatterDict` as a nested
@@ -424,38 +954,354 @@ class FlatterDict(FlatDict):
         :rtype: dict
 
         """
-        out = dict({})
-        for key in self.keys():
-            if self._has_delimiter(key):
-                pk, ck = key.split(self._delimiter, 1)
-                if self._has_delimiter(ck):
-                    ck = ck.split(self._delimiter, 1)[0]
-                if isinstance(self._values[pk], FlatterDict) and pk not in out:
-                    out[pk] = dict()
-                if isinstance(self._values[pk][ck], FlatterDict):
-                    if self._values[pk][ck].original_type == tuple:
-                        out[pk][ck] = tuple(self._child_as_list(pk, ck))
-                    elif self._values[pk][ck].original_type == list:
-                        out[pk][ck] = self._child_as_list(pk, ck)
-                    elif self._values[pk][ck].original_type == set:
-                        out[pk][ck] = set(self._child_as_list(pk, ck))
-                    elif self._values[pk][ck].original_type == dict:
-                        out[pk][ck] = self._values[pk][ck].as_dict()
+        return dict((key, value._as_original()
+                     if isinstance(value, FlatterDict) else value)
+                    for key, value in self._values.items())
+
+    def _as_original(self):
+        """Return a nested instance as a value of its original type, lists,
+        tuples and sets are rebuilt from the values in offset order.
+
+        :rtype: mixed
+
+        """
+        if not isinstance(self._values, _ListValues):
+            return self.as_dict()
+        return self.original_type([
+            value._as_original() if isinstance(value, FlatterDict) else value
+            for value in self._values.values()])
+
+    def _new_child(self, source):
+        """Return an empty nested instance for a value to coerce.
+
+        :rtype: flatdict.FlatterDict
+
+        """
+        child = self.__class__(delimiter=self._delimiter)
+        child.original_type = type(source)
+        if isinstance(source, self._ARRAYS):
+            child._values = _ListValues()
+        return child
+
+    def _source_items(self, source):
+        """Return the key, value pairs of a value to coerce, lists, tuples and
+        sets have their offsets as keys.
+
+        :rtype: iterable
+
+        """
+        if isinstance(source, self._ARRAYS):
+            return [(str(i), v) for i, v in enumerate(source)]
+        return super(FlatterDict, self)._source_items(source)
+
+    def _needs_coerce(self, value):
+        """Check if a value is coerced to a nested instance.
+
+        :rtype: bool
+
+        """
+        return isinstance(value, self._COERCE) and \
+            not isinstance(value, FlatterDict)
+
+
+class _FrozenNode(object):
+    """A nested dictionary of :class:`~flatdict.FrozenFlatDict`: parallel
+    tuples of its keys and values in sorted flat key order, and the number of
+    leaves under it.
+
+    The key of a nested dictionary ends with the delimiter, so keys sort like
+    the flat keys under them and the key can be added to a flat key prefix as
+    it is. Other keys are the keys of the config, they are not copied.
+
+    """
+    __slots__ = ('keys', 'values', 'size')
+
+
+def _freeze(value, delimiter, cls):
+    """Return the :class:`_FrozenNode` tree of a nested dict or
+    :class:`~flatdict.FlatDict`. Empty nested dictionaries are leaves, an
+    empty ``cls``.
+
+    :rtype: _FrozenNode
+
+    """
+    root = _FrozenNode()
+    nodes = []
+    stack = [(root, value or {})]
+    while stack:
+        node, value = stack.pop()
+        if isinstance(value, FlatDict):
+            value = value._values
+        entries = []
+        for key, leaf in value.items():
+            if not isinstance(key, basestring):
+                key = str(key)
+            if isinstance(leaf, (dict, FlatDict)):
+                if leaf:
+                    child = _FrozenNode()
+                    stack.append((child, leaf))
+                    entries.append((key + delimiter, child))
+                    continue
+                leaf = cls(delimiter=delimiter)
+            entries.append((key, leaf))
+        entries.sort(key=lambda entry: entry[0])
+        node.keys = tuple([key for key, _ in entries])
+        node.values = tuple([leaf for _, leaf in entries])
+        nodes.append(node)
+    # Nodes are in pre-order, so every node comes after its parent
+    for node in reversed(nodes):
+        node.size = sum([leaf.size if leaf.__class__ is _FrozenNode else 1
+                         for leaf in node.values])
+    return root
+
+
+class FrozenFlatDict(Mapping):
+    """:class:`~flatdict.FrozenFlatDict` is a read only and compact
+    :class:`~flatdict.FlatDict` for configs that are read many times and never
+    written.
+
+    Every nested dictionary is a pair of tuples of its keys and values in
+    sorted flat key order, there are no dicts and flat keys are not stored:
+    they are joined on demand by iteration. A flat key is found by binary
+    search in the keys of every level, and a nested key returns a view of the
+    same tuples, so prefix scans take O(log n + k).
+
+    Keys are strings like flat keys, other keys are converted with ``str``.
+    Values are not copied, lists in values can still be changed.
+
+    """
+    __slots__ = ('_delimiter', '_node')
+
+    def __init__(self, value=None, delimiter=':'):
+        self._delimiter = delimiter
+        self._node = _freeze(value, delimiter, self.__class__)
+
+    def __contains__(self, key):
+        """Check to see if the key exists, as a flat key or as the key of a
+        nested dictionary.
+
+        :param mixed key: The key to check for
+
+        """
+        try:
+            self._lookup(key)
+        except KeyError:
+            return False
+        return True
+
+    def __getitem__(self, key):
+        """Get an item for the specified key. The key of a nested dictionary
+        returns a :class:`~flatdict.FrozenFlatDict` view of it.
+
+        :param mixed key: The key to use
+        :rtype: mixed
+        :raises: KeyError
+
+        """
+        value = self._lookup(key)
+        if value.__class__ is _FrozenNode:
+            return self._view(value)
+        return value
+
+    def __iter__(self):
+        """Iterate over the flat keys in sorted order.
+
+        :rtype: Iterator
+
+        """
+        return (key for key, _ in self._walk(self._node, ''))
+
+    def __len__(self):
+        """Return the number of items.
+
+        :rtype: int
+
+        """
+        return self._node.size
+
+    def __reduce__(self):
+        """Return state information for pickling
+
+        :rtype: tuple
+
+        """
+        return type(self), (self.as_dict(), self._delimiter)
+
+    def __repr__(self):
+        """Return the string representation of the instance.
+
+        :rtype: str
+
+        """
+        return '<{} id={} {}>'.format(
+            self.__class__.__name__, id(self), str(self))
+
+    def __str__(self):
+        """Return the string value of the instance.
+
+        :rtype: str
+
+        """
+        return '{{{}}}'.format(', '.join(
+            ['{!r}: {!r}'.format(k, v) for k, v in self.items()]))
+
+    def as_dict(self):
+        """Return the :class:`~flatdict.FrozenFlatDict` as a nested
+        :class:`dict`
+
+        :rtype: dict
+
+        """
+        depth = len(self._delimiter)
+        out = {}
+        stack = [(out, self._node)]
+        while stack:
+            node_dict, node = stack.pop()
+            for key, value in zip(node.keys, node.values):
+                if value.__class__ is _FrozenNode:
+                    child = node_dict[key[:-depth]] = {}
+                    stack.append((child, value))
                 else:
-                    out[pk][ck] = self._values[pk][ck]
-            else:
-                out[key] = self._values[key]
+                    node_dict[key] = {} if isinstance(
+                        value, FrozenFlatDict) else value
         return out
 
-    def _child_as_list(self, pk, ck):
-        """Returns a list of values from the child FlatterDict instance
-        with string based integer keys.
+    def items(self):
+        """Return the list of ``(key, value)`` pairs in sorted key order.
 
-        :param str pk: The parent key
-        :param str ck: The child key
         :rtype: list
 
         """
-        return [self._values[pk][ck][k]
-                for k in sorted(self._values[pk][ck].keys(),
-                                key=lambda x: int(x))]
+        return list(self._walk(self._node, ''))
+
+    def iter_prefix(self, prefix):
+        """Iterate over the ``(key, value)`` pairs of the flat keys that are
+        ``prefix`` or start with ``prefix`` and the delimiter, in sorted key
+        order. The nested dictionary of ``prefix`` is found by binary search,
+        so it takes O(log n + k) for k keys.
+
+        :param mixed prefix: The key of a nested dictionary or a value
+        :rtype: Iterator
+
+        """
+        try:
+            value = self._lookup(prefix)
+        except KeyError:
+            return iter(())
+        flat_key = self._flat_key(prefix)
+        if value.__class__ is _FrozenNode:
+            return self._walk(value, flat_key + self._delimiter)
+        return iter([(flat_key, value)])
+
+    def keys(self):
+        """Return the list of flat keys in sorted order.
+
+        :rtype: list
+
+        """
+        return list(self)
+
+    def values(self):
+        """Return the list of values in sorted key order.
+
+        :rtype: list
+
+        """
+        return [value for _, value in self._walk(self._node, '')]
+
+    def subtree(self, prefix):
+        """Return the :class:`~flatdict.FrozenFlatDict` view of the nested
+        dictionary of ``prefix``, its keys are the flat keys under ``prefix``
+        without ``prefix``. It takes O(log n).
+
+        :param mixed prefix: The key of a nested dictionary
+        :rtype: flatdict.FrozenFlatDict
+        :raises: KeyError
+
+        """
+        value = self[prefix]
+        if not isinstance(value, FrozenFlatDict):
+            raise KeyError(prefix)
+        return value
+
+    def _flat_key(self, key):
+        """Return the flat key of a key or of a tuple of keys.
+
+        :rtype: str
+
+        """
+        if isinstance(key, basestring):
+            return key
+        if isinstance(key, tuple):
+            return self._delimiter.join(
+                k if isinstance(k, basestring) else str(k) for k in key)
+        return str(key)
+
+    def _lookup(self, key):
+        """Return the value or the :class:`_FrozenNode` of a flat key, by
+        binary search in the keys of every level.
+
+        :rtype: mixed
+        :raises: KeyError
+
+        """
+        delimiter = self._delimiter
+        parts = self._flat_key(key).split(delimiter)
+        last = parts.pop()
+        node = self._node
+        for part in parts:
+            keys = node.keys
+            part += delimiter
+            position = bisect.bisect_left(keys, part)
+            if position == len(keys) or keys[position] != part:
+                raise KeyError(key)
+            node = node.values[position]
+            if node.__class__ is not _FrozenNode:
+                raise KeyError(key)
+        keys = node.keys
+        position = bisect.bisect_left(keys, last)
+        if position < len(keys) and keys[position] == last:
+            return node.values[position]
+        last += delimiter
+        position = bisect.bisect_left(keys, last, position)
+        if position < len(keys) and keys[position] == last and \
+                node.values[position].__class__ is _FrozenNode:
+            return node.values[position]
+        raise KeyError(key)
+
+    def _view(self, node):
+        """Return a :class:`~flatdict.FrozenFlatDict` of a nested dictionary,
+        it shares the tuples of this instance.
+
+        :rtype: flatdict.FrozenFlatDict
+
+        """
+        view = object.__new__(self.__class__)
+        view._delimiter = self._delimiter
+        view._node = node
+        return view
+
+    @staticmethod
+    def _walk(node, prefix):
+        """Iterate over the ``(flat key, value)`` pairs under ``node`` in
+        sorted key order, flat keys start with ``prefix``.
+
+        :rtype: Iterator
+
+        """
+        stack = []
+        position = 0
+        while True:
+            keys = node.keys
+            if position == len(keys):
+                if not stack:
+                    return
+                node, prefix, position = stack.pop()
+                continue
+            value = node.values[position]
+            position += 1
+            if value.__class__ is _FrozenNode:
+                stack.append((node, prefix, position))
+                node, prefix, position = value, prefix + keys[position - 1], 0
+            else:
+                yield prefix + keys[position - 1], value
@@ -1,3 +1,3 @@
 # -*- coding: utf-8 -*-
 
-from .melddict import MeldDict
+from .melddict import MeldDict, FrozenMeldDict, freeze, copy_tree, meld_lists, merge_by_key, LIST_STRATEGIES
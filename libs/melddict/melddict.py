@@ -11,6 +11,7 @@ else:
     from collections import Iterable, Mapping
 
 from copy import deepcopy
+from itertools import chain
 
 
 class MeldDict(dict):
@@ -35,7 +36,18 @@ class MeldDict(dict):
     after subtraction.
     """
 
-    def add(self, other):
+    list_strategies = None
+    """
+    How to add corresponding values which are both Iterable, by key path.
+
+    A dict of key path (tuple of keys from this MeldDict) to a strategy: one
+    of the names in :data:`LIST_STRATEGIES` or a callable that gets the two
+    Iterables and returns the added value, like :func:`merge_by_key`.
+    Iterables at other paths are appended. Only used when :attr:`meld_iters`
+    is True.
+    """
+
+    def add(self, other, list_strategies=None, owned=False):
         """
         Recursively merge another Mapping into this one, adding to or replacing
         the existing key / values.
@@ -44,11 +56,19 @@ class MeldDict(dict):
         a MeldDict and added (i.e., recursively).
 
         Corresponding values that are both Iterable (but not strings) will be
-        added or replaced according to :attr:`meld_iters`.
+        added or replaced according to :attr:`meld_iters`, with the strategy of
+        their key path in 'list_strategies' (default
+        :attr:`list_strategies`).
 
         Otherwise, corresponding values will be replaced. Non-corresponding
         values from the other Mapping will be inserted into this one.
 
+        Nested Mappings of this MeldDict that are changed are copied into new
+        MeldDicts first, they can be shared with other dicts. With 'owned',
+        nested dicts belong to this MeldDict only (like after
+        :func:`copy_tree`) and they are changed in place. FrozenMeldDicts,
+        other Mappings and the Mappings inside them are still copied.
+
         You can also perform addition using the forward, reverse, and in-place
         operators::
 
@@ -63,21 +83,36 @@ class MeldDict(dict):
         if not isinstance(other, Mapping):
             raise TypeError('can only add Mapping '
                             '(not "{}")'.format(type(other).__name__))
-        for key, that in other.items():
-            if key not in self:
-                self[key] = that
-                continue
-            this = self[key]
-            if isinstance(this, Mapping) and isinstance(that, Mapping):
-                self[key] = MeldDict(this).add(that)
-            elif (isinstance(this, Iterable) and isinstance(that, Iterable) and
-                  not (isinstance(this, str) or isinstance(that, str)) and self.meld_iters):
-                self[key] = list(this) + list(that)
-            else:
-                self[key] = that
+        if list_strategies is None:
+            list_strategies = self.list_strategies
+        # Explicit stack of (dict, Mapping to add, key path, whether nested
+        # dicts of the dict are owned) instead of recursion, key paths are
+        # only needed for list strategies
+        stack = [(self, other, (), owned)]
+        while stack:
+            node, other, path, owns = stack.pop()
+            # Nested dicts were copied into MeldDicts, they use its defaults
+            meld_iters = self.meld_iters if node is self else \
+                MeldDict.meld_iters
+            for key, that in other.items():
+                if key not in node:
+                    node[key] = that
+                    continue
+                this = node[key]
+                if _is_mapping(this) and _is_mapping(that):
+                    this, this_owns = _owned_child(node, key, this, owns)
+                    stack.append((this, that,
+                                  path + (key,) if list_strategies else (),
+                                  this_owns))
+                elif meld_iters and _both_iterable(this, that):
+                    node[key] = meld_lists(
+                        this, that, list_strategies.get(path + (key,))
+                        if list_strategies else None)
+                else:
+                    node[key] = that
         return self
 
-    def subtract(self, other):
+    def subtract(self, other, owned=False):
         """
         Recursively subtract another Mapping from this one, removing
         corresponding the existing key / values.
@@ -91,6 +126,9 @@ class MeldDict(dict):
         Otherwise, corresponding keys will be deleted. Non-corresponding
         keys will be ignored.
 
+        Nested Mappings are copied or changed in place like :meth:`add` with
+        'owned'.
+
         You can also perform subtraction using the forward, reverse, and
         in-place operators::
 
@@ -105,26 +143,39 @@ class MeldDict(dict):
         if not isinstance(other, Mapping):
             raise TypeError('can only subtract Mapping '
                             '(not "{}")'.format(type(other).__name__))
-        to_remove = []
-        for key, this in self.items():
-            if key not in other:
-                continue
-            that = other[key]
-            if isinstance(this, Mapping) and isinstance(that, Mapping):
-                self[key] = MeldDict(this).subtract(that)
-                if not self[key] and self.remove_emptied:
-                    to_remove.append(key)
-            elif (isinstance(this, Iterable) and isinstance(that, Iterable) and
-                  not (isinstance(this, str) or isinstance(that, str)) and
-                  self.meld_iters):
-                self[key] = [item for item in this if item not in that]
-                if not self[key] and self.remove_emptied:
-                    to_remove.append(key)
+        # Mappings that are subtracted, checked for being emptied after all
+        # their nested Mappings
+        subtracted = []
+        stack = [(self, other, owned)]
+        while stack:
+            node, other, owns = stack.pop()
+            if node is self:
+                meld_iters, remove_emptied = self.meld_iters, \
+                    self.remove_emptied
             else:
-                # can't modify dict while iterating
-                to_remove.append(key)
-        for key in to_remove:
-            del self[key]
+                meld_iters, remove_emptied = MeldDict.meld_iters, \
+                    MeldDict.remove_emptied
+            to_remove = []
+            for key, this in node.items():
+                if key not in other:
+                    continue
+                that = other[key]
+                if _is_mapping(this) and _is_mapping(that):
+                    this, this_owns = _owned_child(node, key, this, owns)
+                    stack.append((this, that, this_owns))
+                    subtracted.append((node, key, remove_emptied))
+                elif meld_iters and _both_iterable(this, that):
+                    node[key] = _difference(this, that)
+                    if not node[key] and remove_emptied:
+                        to_remove.append(key)
+                else:
+                    # can't modify dict while iterating
+                    to_remove.append(key)
+            for key in to_remove:
+                del node[key]
+        for node, key, remove_emptied in reversed(subtracted):
+            if not node[key] and remove_emptied:
+                del node[key]
         return self
 
     def __add__(self, other):
@@ -156,3 +207,286 @@ class MeldDict(dict):
         if not isinstance(other, Mapping):
             return NotImplemented
         return self.subtract(other)
+
+
+class FrozenMeldDict(MeldDict):
+    """
+    An immutable MeldDict whose values can be shared safely.
+
+    Adding to or subtracting from a FrozenMeldDict doesn't deep-copy it. The
+    result is a new MeldDict that shares all unchanged values with the
+    FrozenMeldDict, only the Mappings on the paths changed by the other
+    Mapping are copied. Use :func:`freeze` to convert a Mapping and all
+    nested Mappings.
+
+    Iterables inside a FrozenMeldDict are shared as they are, don't change
+    them in place.
+    """
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError('{} is immutable'.format(type(self).__name__))
+
+    __setitem__ = __delitem__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+    add = subtract = _immutable
+    __iadd__ = __isub__ = __ior__ = _immutable
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+    def __copy__(self):
+        return self
+
+    def __add__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return MeldDict(self).add(other)
+
+    def __radd__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return MeldDict(other).add(self)
+
+    def __sub__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return MeldDict(self).subtract(other)
+
+    def __rsub__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return MeldDict(other).subtract(self)
+
+
+def _is_mapping(value):
+    """
+    Check if 'value' is a Mapping. Results are kept by type, isinstance with
+    an abstract base class is slow for other values.
+    """
+    cls = type(value)
+    try:
+        return _MAPPING_TYPES[cls]
+    except KeyError:
+        _MAPPING_TYPES[cls] = issubclass(cls, Mapping)
+        return _MAPPING_TYPES[cls]
+
+
+def _owned_child(node, key, this, owns):
+    """
+    Nested Mapping 'this' of 'node' to change in place: 'this' itself when it
+    is a dict that is owned, else a MeldDict copy of it that replaces it in
+    'node'. Mappings in a copy are shared with 'this', so they are not owned.
+
+    :return: (Mapping to change, whether its nested dicts are owned)
+    """
+    if owns and this.__class__ in _OWNED_TYPES:
+        return this, True
+    # Change a copy, 'this' can be shared with other dicts
+    this = node[key] = MeldDict(this)
+    return this, False
+
+
+def _both_iterable(this, that):
+    """
+    Check if 'this' and 'that' are both Iterable and not strings.
+    """
+    return (isinstance(this, Iterable) and isinstance(that, Iterable) and
+            not (isinstance(this, str) or isinstance(that, str)))
+
+
+_MAPPING_TYPES = {}
+
+# Types of nested dicts that are changed in place when they are owned,
+# subclasses can keep state that a copy must not share
+_OWNED_TYPES = (dict, MeldDict)
+
+# Types that copy_tree copies itself
+_TREE_TYPES = (dict, MeldDict, list)
+
+# Values that copy_tree doesn't copy
+_ATOMIC_TYPES = frozenset([type(None), bool, int, float, str, bytes] +
+                          ([] if PY3 else [unicode, long]))
+
+
+def append(this, that):
+    """
+    List of the items of 'this' and then the items of 'that'.
+    """
+    return list(this) + list(that)
+
+
+def replace(this, that):
+    """
+    'that' as it is.
+    """
+    return that
+
+
+def unique_union(this, that):
+    """
+    List of the items of 'this' and then the items of 'that', without repeated
+    items. Hashable items are found in a set, so it takes linear time, other
+    items are compared with the unhashable items before them.
+    """
+    seen = set()
+    unhashable = []
+    result = []
+    for item in chain(this, that):
+        try:
+            if item in seen:
+                continue
+            seen.add(item)
+        except TypeError:
+            if item in unhashable:
+                continue
+            unhashable.append(item)
+        result.append(item)
+    return result
+
+
+class merge_by_key(object):
+    """
+    List strategy that melds lists of Mappings by the value of 'key'. An item
+    of 'that' is added (like :meth:`MeldDict.add`) to the item of 'this' with
+    the same value of 'key', other items are appended. Items are found by a
+    dict of values, so it takes linear time. Items that aren't Mappings or
+    don't have 'key' are appended as they are.
+
+    Example: ``merge_by_key('name')`` for lists of hosts with a name.
+    """
+
+    def __init__(self, key):
+        self.key = key
+
+    def __call__(self, this, that):
+        result = list(this)
+        positions = {}  # value of key -> position of item in result
+        for position, item in enumerate(result):
+            value = self._value(item)
+            if value is not None:
+                positions.setdefault(value, position)
+        for item in that:
+            value = self._value(item)
+            position = positions.get(value) if value is not None else None
+            if position is None:
+                if value is not None:
+                    positions[value] = len(result)
+                result.append(item)
+            else:
+                result[position] = MeldDict(result[position]).add(item)
+        return result
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self.key)
+
+    def _value(self, item):
+        """
+        Hashable value of 'key' in 'item', None if there isn't any.
+        """
+        if not _is_mapping(item) or self.key not in item:
+            return None
+        value = item[self.key]
+        try:
+            hash(value)
+        except TypeError:
+            return None
+        return value
+
+
+LIST_STRATEGIES = {
+    'append': append,
+    'replace': replace,
+    'unique': unique_union,
+}
+"""
+Names of the list strategies of :attr:`MeldDict.list_strategies`.
+"""
+
+
+def meld_lists(this, that, strategy=None):
+    """
+    Add the Iterables 'this' and 'that' with 'strategy', a name in
+    :data:`LIST_STRATEGIES` or a callable. The default is 'append'.
+    """
+    if strategy is None:
+        return list(this) + list(that)
+    if not callable(strategy):
+        if strategy not in LIST_STRATEGIES:
+            raise ValueError('unknown list strategy '
+                             '"{}"'.format(strategy))
+        strategy = LIST_STRATEGIES[strategy]
+    return strategy(this, that)
+
+
+def _difference(this, that):
+    """
+    List of the items of 'this' that aren't in 'that'. Hashable items of
+    'that' are kept in a set, so it takes linear time.
+    """
+    hashed = set()
+    unhashable = []
+    for item in that:
+        try:
+            hashed.add(item)
+        except TypeError:
+            unhashable.append(item)
+    result = []
+    for item in this:
+        try:
+            if item in hashed:
+                continue
+        except TypeError:
+            pass
+        if unhashable and item in unhashable:
+            continue
+        result.append(item)
+    return result
+
+
+def freeze(value):
+    """
+    Return a FrozenMeldDict of the Mapping 'value' with all nested Mappings
+    frozen as well. FrozenMeldDicts are returned as they are, other values are
+    returned unchanged.
+    """
+    if isinstance(value, FrozenMeldDict) or not isinstance(value, Mapping):
+        return value
+    return FrozenMeldDict((key, freeze(that)) for key, that in value.items())
+
+
+def copy_tree(value):
+    """
+    Deep copy of a tree of dicts, MeldDicts and lists, like copy.deepcopy
+    but faster. Every dict and list is copied each time it is in the tree, so
+    the copy doesn't share them even when 'value' does (like YAML aliases)
+    and it can be changed in place by :meth:`MeldDict.add` with 'owned'. A
+    dict or list that holds itself is copied like copy.deepcopy. Other values
+    are copied by copy.deepcopy, strings and numbers are not copied.
+    """
+    return _copy_tree(value, {})
+
+
+def _copy_tree(value, ancestors):
+    """
+    :param ancestors: id of a dict or list that is being copied -> its copy
+    """
+    cls = value.__class__
+    if cls in _ATOMIC_TYPES:
+        return value
+    if cls not in _TREE_TYPES:
+        return deepcopy(value)
+    if id(value) in ancestors:
+        return ancestors[id(value)]
+    if cls is not list:
+        copied = ancestors[id(value)] = cls()
+        if cls is MeldDict and value.__dict__:
+            copied.__dict__.update(deepcopy(value.__dict__))
+        for key, item in value.items():
+            copied[key] = item if item.__class__ in _ATOMIC_TYPES else \
+                _copy_tree(item, ancestors)
+    else:
+        copied = ancestors[id(value)] = []
+        copied.extend([item if item.__class__ in _ATOMIC_TYPES else
+                       _copy_tree(item, ancestors) for item in value])
+    del ancestors[id(value)]
+    return copied
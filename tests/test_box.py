@@ -0,0 +1,71 @@
+"""
+Tests of the fast loaders of utils.box.
+"""
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from utils import box
+
+try:
+    import yaml as pyyaml
+except ImportError:
+    pyyaml = None
+
+
+class _NoCYAML(object):
+    """
+    A YAML module without C loader whose yaml.load doesn't take loaders of PyYAML, like ruamel.yaml without its C
+    extension.
+    """
+
+    def __init__(self):
+        self.SafeLoader = pyyaml.SafeLoader
+        self.Loader = pyyaml.Loader
+
+    def load(self, stream, Loader=None):
+        if Loader is not pyyaml.SafeLoader:
+            raise TypeError('loader of another module')
+        return pyyaml.load(stream, Loader=Loader)
+
+
+class _RecordingJSON(object):
+    def __init__(self):
+        self.loaded = []
+
+    def loads(self, data):
+        self.loaded.append(data)
+        return json.loads(data.decode('utf-8') if isinstance(data, bytes) else data)
+
+
+class FastLoaderTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self._yaml, self._orjson = box._yaml, box._orjson
+
+    def tearDown(self):
+        box._yaml, box._orjson = self._yaml, self._orjson
+        shutil.rmtree(self.directory)
+
+    @unittest.skipUnless(hasattr(pyyaml, 'CSafeLoader'), 'PyYAML with libyaml is not installed')
+    def test_yaml_module_without_c_loader_uses_pyyaml_c_loader(self):
+        box._yaml = _NoCYAML()
+        self.assertIs(box.fast_yaml_loader(), pyyaml.CSafeLoader)
+        self.assertEqual(box.load_from_yaml('a: {b: 1}', fast=True), {'a': {'b': 1}})
+        self.assertEqual(box.load_from_yaml('a: 1', fast=True, Loader=pyyaml.SafeLoader), {'a': 1})
+
+    def test_orjson_reads_bytes(self):
+        filename = os.path.join(self.directory, 'config.json')
+        with open(filename, 'wb') as f:
+            f.write(u'{"a": "é"}'.encode('utf-8'))
+        box._orjson = _RecordingJSON()
+        self.assertEqual(box.load_from_json(filename=filename, fast=True), {'a': u'é'})
+        self.assertIsInstance(box._orjson.loaded[-1], bytes)
+        box.load_from_json(filename=filename, fast=True, encoding='latin-1')
+        self.assertEqual(box._orjson.loaded[-1], u'{"a": "Ã©"}')
+
+
+if __name__ == '__main__':
+    unittest.main()
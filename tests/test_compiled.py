@@ -0,0 +1,101 @@
+"""
+Tests of the compiled format of utils.compiled.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from utils.compiled import _encode, compile_config, load_compiled
+
+
+class UnsupportedKeyTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_key_path_in_error(self):
+        for config_dict, message in (({('a', 1): 1}, "unsupported key ('a', 1) of dict at ()"),
+                                     ({'a': {'b': {(1, 2): 3}}}, "unsupported key (1, 2) of dict at ('a', 'b')"),
+                                     ({'a': [{'x': 1}, {('t',): 2}]}, "unsupported key ('t',) of dict at ('a', 1)")):
+            with self.assertRaises(TypeError) as context:
+                _encode(config_dict)
+            self.assertEqual(str(context.exception), message)
+
+    def test_compile_config_fails(self):
+        filename = os.path.join(self.directory, 'config.dryc')
+        with self.assertLogs('DRY', level='ERROR') as logs:
+            self.assertEqual(compile_config({'a': {(1, 2): 3}}, filename), -1)
+        self.assertIn('unsupported key (1, 2)', logs.output[0])
+        self.assertFalse(os.path.exists(filename))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_scalar_keys(self):
+        filename = os.path.join(self.directory, 'config.dryc')
+        config_dict = {'a': {1: 'one', None: 'none', 1.5: 'float'}, 'b': [1, {'c': 2}]}
+        self.assertEqual(compile_config(config_dict, filename), 1)
+        compiled = load_compiled(filename)
+        self.assertEqual(compiled['a'][1], 'one')
+        self.assertEqual(compiled['a'][None], 'none')
+        self.assertEqual(compiled['a'][1.5], 'float')
+        self.assertEqual(compiled['b'][1]['c'], 2)
+
+
+class RoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def round_trip(self, config_dict, name='config.dryc'):
+        filename = os.path.join(self.directory, name)
+        self.assertEqual(compile_config(config_dict, filename), 1)
+        return load_compiled(filename)
+
+    def test_nested_lists(self):
+        config_dict = {'a': [[1, [2, [3, []]]], [{'b': [4, 5]}], ()], 'c': []}
+        compiled = self.round_trip(config_dict)
+        self.assertEqual(compiled.as_dict(), {'a': [[1, [2, [3, []]]], [{'b': [4, 5]}], []], 'c': []})
+        self.assertEqual(compiled['a'][1][0]['b'][-1], 5)
+
+    def test_shared_subtrees(self):
+        shared = {'host': 'db', 'ports': [5432, 5433]}
+        config_dict = {'a': shared, 'b': {'c': shared}, 'd': [shared, shared['ports']]}
+        compiled = self.round_trip(config_dict)
+        self.assertEqual(compiled.as_dict(), config_dict)
+        self.assertEqual(compiled['a']._offset, compiled['b']['c']._offset)
+        self.assertEqual(compiled['a']._offset, compiled['d'][0]._offset)
+        self.assertEqual(compiled['a']['ports']._offset, compiled['d'][1]._offset)
+
+    def test_big_ints(self):
+        config_dict = {'big': 2 ** 64, 'small': -2 ** 63 - 1, 'max': 2 ** 63 - 1, 'list': [10 ** 30, -10 ** 30]}
+        compiled = self.round_trip(config_dict)
+        self.assertEqual(compiled.as_dict(), config_dict)
+        self.assertEqual(compiled['big'], 2 ** 64)
+
+    def test_bool_and_int_keys(self):
+        config_dict = {True: 'yes', 0: 'zero', 2: 'two', 'x': {False: 'no', 1.5: 'half'}}
+        compiled = self.round_trip(config_dict)
+        self.assertEqual(compiled.as_dict(), config_dict)
+        self.assertIs(type(list(compiled.keys())[0]), bool)
+        self.assertEqual(compiled[True], 'yes')
+        self.assertEqual(compiled[0], 'zero')
+        self.assertEqual(compiled['x'][False], 'no')
+
+    def test_compile_loaded_config(self):
+        shared = {'host': 'db', 'ports': [5432, [1, 2]]}
+        config_dict = {'a': shared, 'b': [shared, {'c': 2 ** 70}], 'd': 'text'}
+        compiled = self.round_trip(config_dict)
+        again = self.round_trip(compiled, 'again.dryc')
+        self.assertIsInstance(again, type(compiled))
+        self.assertEqual(again.as_dict(), config_dict)
+        self.assertEqual(again['a']._offset, again['b'][0]._offset)
+        self.assertEqual(os.path.getsize(os.path.join(self.directory, 'again.dryc')),
+                         os.path.getsize(os.path.join(self.directory, 'config.dryc')))
+
+
+if __name__ == '__main__':
+    unittest.main()
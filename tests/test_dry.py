@@ -0,0 +1,255 @@
+"""
+Tests of ConfigMerger of DRY.
+"""
+import copy
+import logging
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:  # Python 2
+    import mock
+
+from DRY import ConfigMerger
+
+CONFIG = {'base(&base)': {'image': 'base', 'port': 80},
+          'service': {'->': 'base', 'port': 443},
+          'other': {'debug': True}}
+
+
+class RemergeTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.merger_obj = ConfigMerger(copy.deepcopy(CONFIG), merge_at_init=True, incremental=True)
+        self.assertEqual(self.merger_obj.return_value, 1)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def check_not_changed(self, changes):
+        source_dict = copy.deepcopy(self.merger_obj.source_dict)
+        config_dict = copy.deepcopy(self.merger_obj.config_dict)
+        self.assertEqual(self.merger_obj.remerge(changes), -1)
+        self.assertEqual(self.merger_obj.source_dict, source_dict)
+        self.assertEqual(self.merger_obj.config_dict, config_dict)
+        self.assertEqual(self.merger_obj.return_value, 1)
+
+        # The merger can still be used
+        self.assertEqual(self.merger_obj.remerge([('set', ('base(&base)', 'image'), 'new')]), 1)
+        self.assertEqual(self.merger_obj.config_dict['service'], {'image': 'new', 'port': 443})
+
+    def test_bad_path_of_second_change(self):
+        self.check_not_changed([('set', ('base(&base)', 'port'), 8080), ('set', ('missing', 'key'), 1)])
+
+    def test_path_through_value_that_is_not_dict(self):
+        self.check_not_changed([('del', ('other', 'debug')), ('set', ('service', 'port', 'key'), 1)])
+
+    def test_bad_action_of_second_change(self):
+        self.check_not_changed([('set', ('other', 'new'), 1), ('move', ('other', 'debug'))])
+
+    def test_set_then_set_inside(self):
+        changes = [('set', ('other', 'new'), dict()), ('set', ('other', 'new', 'key'), 1), ('del', ('other', 'debug'))]
+        self.assertEqual(self.merger_obj.remerge(changes), 1)
+        self.assertEqual(self.merger_obj.config_dict['other'], {'new': {'key': 1}})
+
+    def test_error_after_changes_invalidates_merger(self):
+        self.assertEqual(self.merger_obj.remerge([('set', ('service', '->'), 'missing')]), -1)
+        self.assertEqual(self.merger_obj.return_value, -1)
+        self.assertEqual(self.merger_obj.remerge([('set', ('other', 'debug'), False)]), -1)
+
+
+CHAIN_CONFIG = {'base(&base)': {'image': 'base', 'port': 80, 'env': {'a': 1}},
+                'web(&web)': {'->': 'base', 'port': 8080},
+                'service': {'->': 'web', 'port': 443},
+                'worker': {'->': 'base', 'env': {'b': 2}},
+                'other': {'debug': True}}
+
+
+class RemergeResultTest(unittest.TestCase):
+    """
+    remerge must give the same config as merging the changed source again.
+    """
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.merger_obj = ConfigMerger(copy.deepcopy(CHAIN_CONFIG), merge_at_init=True, incremental=True)
+        self.assertEqual(self.merger_obj.return_value, 1)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def check_remerge(self, changes):
+        self.assertEqual(self.merger_obj.remerge(changes), 1)
+        merged = ConfigMerger(copy.deepcopy(self.merger_obj.source_dict), merge_at_init=True)
+        self.assertEqual(merged.return_value, 1)
+        self.assertEqual(self.merger_obj.config_dict, merged.config_dict)
+
+    def test_anchor_changes(self):
+        self.check_remerge([('set', ('base(&base)', 'env', 'a'), 5)])
+        self.assertEqual(self.merger_obj.config_dict['service']['env'], {'a': 5})
+        self.assertEqual(self.merger_obj.config_dict['worker']['env'], {'a': 5, 'b': 2})
+
+    def test_pointer_changes(self):
+        self.check_remerge([('set', ('service', '->'), 'base')])
+        self.assertEqual(self.merger_obj.config_dict['service'], {'image': 'base', 'port': 443, 'env': {'a': 1}})
+        self.check_remerge([('set', ('worker', 'port'), 9000)])
+        self.assertEqual(self.merger_obj.config_dict['worker']['port'], 9000)
+
+    def test_key_deleted(self):
+        self.check_remerge([('del', ('web(&web)', 'port'))])
+        self.assertEqual(self.merger_obj.config_dict['web']['port'], 80)
+        self.assertEqual(self.merger_obj.config_dict['service']['port'], 443)
+        self.check_remerge([('del', ('worker', '->'))])
+        self.assertEqual(self.merger_obj.config_dict['worker'], {'env': {'b': 2}})
+
+    def test_change_creates_cycle(self):
+        self.assertEqual(self.merger_obj.remerge([('set', ('base(&base)', '->'), 'web')]), -1)
+        self.assertEqual(self.merger_obj.return_value, -1)
+        # Merging the changed source fails the same way
+        merged = ConfigMerger(copy.deepcopy(self.merger_obj.source_dict), merge_at_init=True)
+        self.assertEqual(merged.return_value, -1)
+
+
+def groups_config(groups):
+    """
+    Config with 'groups' independent groups of an anchor and pointers to it, and a chain of anchors that pointers inside the
+    first two groups share.
+    """
+    config_dict = {'chain_a(&chain_a)': {'level': 'a', 'env': {'shared': 1}},
+                   'chain_b(&chain_b)': {'->': 'chain_a', 'level': 'b'},
+                   'chain_c(&chain_c)': {'->': 'chain_b', 'tags': ['c']}}
+    for group in range(groups):
+        config_dict['group_{0}'.format(group)] = {
+            'base(&base_{0})'.format(group): {'image': 'image_{0}'.format(group), 'env': {'group': group}},
+            'web': {'->': 'base_{0}'.format(group), 'port': 8000 + group},
+            'worker': {'->': 'base_{0}'.format(group), 'env': {'worker': True}}}
+    for group in range(2):
+        config_dict['group_{0}'.format(group)]['web']['logging'] = {'->': 'chain_c', 'group': group}
+    return config_dict
+
+
+class ParallelTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_same_as_serial(self):
+        config_dict = groups_config(6)
+        serial = ConfigMerger(copy.deepcopy(config_dict), merge_at_init=True)
+        parallel = ConfigMerger(copy.deepcopy(config_dict), merge_at_init=True, workers=2)
+        self.assertEqual(serial.return_value, 1)
+        self.assertEqual(parallel.return_value, 1)
+        self.assertEqual(parallel.config_dict, serial.config_dict)
+
+        # The shared chain joins the first two groups, the other groups are merged on their own
+        components = parallel.merge_components(parallel.valid_anchors, parallel.valid_pointers)
+        self.assertEqual(len(components), 5)
+        self.assertEqual(serial.config_dict['group_1']['web']['logging'],
+                         {'level': 'b', 'env': {'shared': 1}, 'tags': ['c'], 'group': 1})
+
+
+NESTED_CONFIG = {'base(&base)': {'image': 'base', 'env': {'level': 1}},
+                 'web(&web)': {'->': 'base', 'env': {'web': True}, 'proxy': {'->': 'base', 'port': 80}},
+                 'apps': {'front': {'->': 'web', 'replicas': 2},
+                          'jobs': {'nightly': {'->': 'base', 'env': {'level': 2}}, 'plain': {'a': 1}}},
+                 'other': [1, 2]}
+
+
+class LazyConfigTest(unittest.TestCase):
+    """
+    Values of LazyConfig on first access must be the same as the values of merging the whole config.
+    """
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        merged = ConfigMerger(copy.deepcopy(NESTED_CONFIG), merge_at_init=True)
+        self.assertEqual(merged.return_value, 1)
+        self.merged = merged.config_dict
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def lazy_config(self):
+        merger_obj = ConfigMerger(copy.deepcopy(NESTED_CONFIG), merge_at_init=True, lazy=True)
+        self.assertEqual(merger_obj.return_value, 1)
+        return merger_obj.config_dict
+
+    def test_nested_pointers(self):
+        # Deepest values first, before their parents are merged
+        lazy = self.lazy_config()
+        self.assertEqual(lazy['apps.front.proxy'], self.merged['apps']['front']['proxy'])
+        self.assertEqual(lazy['apps']['jobs']['nightly']['env'], self.merged['apps']['jobs']['nightly']['env'])
+        self.assertEqual(lazy['apps']['front']['env'], {'level': 1, 'web': True})
+        self.assertEqual(self.lazy_config()['web']['proxy'], self.merged['web']['proxy'])
+        self.assertEqual(lazy.as_dict(), self.merged)
+
+    def test_missing_keys(self):
+        lazy = self.lazy_config()
+        for key in ('missing', 'base(&base)', 'apps.missing', 'apps.front.replicas.x', 'other.0'):
+            self.assertRaises(KeyError, lazy.__getitem__, key)
+            self.assertNotIn(key, lazy)
+        self.assertRaises(KeyError, lazy['apps'].__getitem__, 'front.missing')
+        self.assertIsNone(lazy.get('missing'))
+        self.assertEqual(lazy['apps']['jobs'].get('missing', 0), 0)
+        self.assertEqual(lazy.as_dict(), self.merged)
+
+    def test_iteration(self):
+        lazy = self.lazy_config()
+        self.assertEqual(list(lazy), list(self.merged))
+        self.assertEqual(len(lazy), len(self.merged))
+        self.assertEqual(list(lazy['apps']), list(self.merged['apps']))
+        self.assertEqual(list(lazy['apps']['front']), list(self.merged['apps']['front']))
+        self.assertEqual(dict(lazy['apps']['jobs'].items())['plain'], self.merged['apps']['jobs']['plain'])
+        self.assertEqual(lazy['other'], [1, 2])
+
+
+class MergeStatsTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_stats(self):
+        merger_obj = ConfigMerger(copy.deepcopy(CHAIN_CONFIG), merge_at_init=True, stats=True)
+        self.assertEqual(merger_obj.return_value, 1)
+        stats = merger_obj.stats.as_dict()
+        for phase in ('index', 'anchor_validation', 'pointers_validation', 'merge', 'clean_dict'):
+            self.assertGreaterEqual(stats['phases'][phase], 0.0)
+        self.assertEqual(stats['counters']['pointer_merges'], 3)
+        for name in ('deep_copies', 'regex_evaluations', 'path_lookups', 'dicts_walked'):
+            self.assertGreater(stats['counters'][name], 0)
+
+        # Every pointer with its anchor, slowest first
+        self.assertEqual(stats['pointers'], 3)
+        slowest = stats['slowest_pointers']
+        self.assertEqual(sorted((item['pointer'], item['anchor']) for item in slowest),
+                         [('service', 'web(&web)'), ('web(&web)', 'base(&base)'), ('worker', 'base(&base)')])
+        self.assertEqual([item['seconds'] for item in slowest],
+                         sorted((item['seconds'] for item in slowest), reverse=True))
+
+    def test_number_of_slowest_pointers(self):
+        merger_obj = ConfigMerger(copy.deepcopy(CHAIN_CONFIG), merge_at_init=True, stats=2)
+        self.assertEqual(len(merger_obj.stats.as_dict()['slowest_pointers']), 2)
+        self.assertEqual(len(merger_obj.stats.slowest_pointers(top=3)), 3)
+
+    def test_stats_of_workers(self):
+        config_dict = groups_config(4)
+        serial = ConfigMerger(copy.deepcopy(config_dict), merge_at_init=True, stats=True)
+        parallel = ConfigMerger(copy.deepcopy(config_dict), merge_at_init=True, workers=2, stats=True)
+        self.assertEqual(parallel.stats.counters['pointer_merges'], serial.stats.counters['pointer_merges'])
+        self.assertEqual(len(parallel.stats.pointer_times), len(serial.stats.pointer_times))
+
+    def test_no_stats(self):
+        for stats in (None, False, 0):
+            with mock.patch('DRY.MergeStats') as merge_stats:
+                merger_obj = ConfigMerger(copy.deepcopy(CHAIN_CONFIG), merge_at_init=True, stats=stats)
+                self.assertEqual(merger_obj.return_value, 1)
+            self.assertFalse(merge_stats.called)
+            self.assertIsNone(merger_obj.stats)
+
+
+if __name__ == '__main__':
+    unittest.main()
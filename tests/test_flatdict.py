@@ -0,0 +1,123 @@
+"""
+Tests of FlatDict, FlatterDict and FrozenFlatDict of libs.flatdict.
+"""
+import pickle
+import unittest
+
+from libs.flatdict import FlatDict, FrozenFlatDict
+from libs.flatdict.flatdict import FlatterDict
+
+
+class UpdateAfterIndexTest(unittest.TestCase):
+    """
+    update of an empty dict whose flat index is built, or that is a nested child, must keep the index in sync.
+    """
+
+    def check_update(self, cls, empty):
+        flat_dict = cls({'a': 1})
+        list(flat_dict)
+        empty(flat_dict)
+        flat_dict.update({'b': 2, 'c': {'d': 3}})
+        self.assertEqual(len(flat_dict), 2)
+        self.assertEqual(sorted(flat_dict.keys()), ['b', 'c:d'])
+        self.assertEqual(sorted(flat_dict.items()), [('b', 2), ('c:d', 3)])
+
+    def test_update_after_del(self):
+        for cls in (FlatDict, FlatterDict):
+            self.check_update(cls, lambda flat_dict: flat_dict.__delitem__('a'))
+
+    def test_update_after_clear(self):
+        for cls in (FlatDict, FlatterDict):
+            self.check_update(cls, lambda flat_dict: flat_dict.clear())
+
+    def test_update_of_new_iterated_dict(self):
+        for cls in (FlatDict, FlatterDict):
+            flat_dict = cls()
+            list(flat_dict)
+            flat_dict.update({'b': 2})
+            self.assertEqual(len(flat_dict), 1)
+            self.assertEqual(flat_dict.keys(), ['b'])
+
+    def test_update_of_nested_child(self):
+        for cls in (FlatDict, FlatterDict):
+            parent = cls({'x': {'a': 1}, 'y': 1})
+            list(parent)
+            child = parent._values['x']
+            child.clear()
+            child.update({'b': 3, 'c': {'d': 4}})
+            self.assertEqual(len(parent), 3)
+            self.assertEqual(sorted(parent.keys()), ['x:b', 'x:c:d', 'y'])
+            self.assertEqual(parent['x:c:d'], 4)
+
+    def test_update_of_nested_child_without_index(self):
+        for cls in (FlatDict, FlatterDict):
+            parent = cls({'x': {'a': 1}, 'y': 1})
+            child = parent._values['x']
+            del child['a']
+            child.update({'b': 3})
+            self.assertEqual(len(parent), 2)
+            self.assertEqual(sorted(parent.keys()), ['x:b', 'y'])
+
+    def test_only_root_keeps_index(self):
+        for cls in (FlatDict, FlatterDict):
+            parent = cls({'x': {'a': {'b': 1}}, 'y': 1})
+            list(parent)
+            child = parent._values['x']
+            self.assertEqual(child.keys(), ['a:b'])
+            self.assertIsNone(child._index)
+            child['a:c'] = 2
+            del child['a:b']
+            self.assertEqual(sorted(parent.keys()), ['x:a:c', 'y'])
+            self.assertEqual(list(parent.iter_prefix('x')), [('x:a:c', 2)])
+            # A root with an index drops it when it is nested
+            other = cls({'z': 3})
+            list(other)
+            parent['w'] = other
+            self.assertIsNone(other._index)
+            self.assertEqual(sorted(parent.keys()), ['w:z', 'x:a:c', 'y'])
+
+
+class FrozenFlatDictTest(unittest.TestCase):
+    """
+    FrozenFlatDict must read like a FlatDict of the same config.
+    """
+    CONFIG = {'a': {'b': 1, 'c': {'d': 2, 'e': {}}}, 'a0': 3, 'ab': [1, 2], 'z': {'y': None}}
+
+    def setUp(self):
+        self.flat_dict = FlatDict(self.CONFIG)
+        self.frozen = FrozenFlatDict(self.CONFIG)
+
+    def test_keys_in_sorted_flat_order(self):
+        self.assertEqual(self.frozen.keys(), sorted(self.flat_dict.keys()))
+        self.assertEqual(len(self.frozen), len(self.flat_dict))
+        self.assertEqual(self.frozen.values(), [value for _, value in self.frozen.items()])
+
+    def test_lookups(self):
+        for key in self.flat_dict.keys():
+            self.assertIn(key, self.frozen)
+            if key != 'a:c:e':
+                self.assertEqual(self.frozen[key], self.flat_dict[key])
+        self.assertEqual(len(self.frozen['a:c:e']), 0)
+        self.assertEqual(self.frozen[('a', 'c', 'd')], 2)
+        self.assertEqual(self.frozen['a']['c:d'], 2)
+        for key in ('x', 'a:x', 'a:b:x', 'a0:x', 'a:'):
+            self.assertNotIn(key, self.frozen)
+            self.assertRaises(KeyError, self.frozen.__getitem__, key)
+
+    def test_prefix_scans(self):
+        self.assertEqual(list(self.frozen.iter_prefix('a')), [('a:b', 1), ('a:c:d', 2), ('a:c:e', self.frozen['a:c:e'])])
+        self.assertEqual(list(self.frozen.iter_prefix('a0')), [('a0', 3)])
+        self.assertEqual(list(self.frozen.iter_prefix('x')), [])
+        subtree = self.frozen.subtree('a:c')
+        self.assertEqual(subtree.keys(), ['d', 'e'])
+        self.assertEqual(list(subtree.iter_prefix('d')), [('d', 2)])
+        self.assertRaises(KeyError, self.frozen.subtree, 'a0')
+
+    def test_as_dict_and_pickle(self):
+        self.assertEqual(self.frozen.as_dict(), self.CONFIG)
+        self.assertEqual(pickle.loads(pickle.dumps(self.frozen)).items(), self.frozen.items())
+        self.assertEqual(FrozenFlatDict(self.flat_dict).keys(), self.frozen.keys())
+
+
+if __name__ == '__main__':
+    unittest.main()
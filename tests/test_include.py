@@ -0,0 +1,83 @@
+"""
+Tests of loading configs from many files by utils.include.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from DRY import ConfigMerger
+from utils.include import load_files
+
+FILES = {'main.yaml': '$include: [common.yaml, services/*.yaml]\n'
+                      'app:\n  ->: web\n  name: main\n',
+         'common.yaml': 'base(&base):\n  image: base\n  port: 80\n',
+         'services/web.yaml': 'web(&web):\n  ->: base\n  port: 8080\n',
+         'services/db.yaml': 'db:\n  ->: base\n  port: 5432\n'}
+
+
+class LoadFilesTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.directory = tempfile.mkdtemp()
+        self.write(FILES)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(self.directory)
+
+    def write(self, files):
+        for name, text in files.items():
+            path = os.path.join(self.directory, name)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'w') as f:
+                f.write(text)
+
+    def load(self, name='main.yaml', **kwargs):
+        return load_files([os.path.join(self.directory, name)], **kwargs)
+
+    def merge(self, result):
+        config_dict, index, _ = result
+        merger_obj = ConfigMerger(config_dict, merge_at_init=True, index=index, inplace=True)
+        self.assertEqual(merger_obj.return_value, 1)
+        return merger_obj.config_dict
+
+    def test_glob_includes(self):
+        result = self.load(workers=1)
+        config_dict, _, registry = result
+        # Included files come first, files of a glob pattern in sorted order
+        self.assertEqual(list(config_dict), ['base(&base)', 'db', 'web(&web)', 'app'])
+        self.assertEqual(registry, {'base': os.path.join(self.directory, 'common.yaml'),
+                                    'web': os.path.join(self.directory, 'services', 'web.yaml')})
+        merged = self.merge(result)
+        self.assertEqual(merged['app'], {'image': 'base', 'port': 8080, 'name': 'main'})
+        self.assertEqual(merged['db'], {'image': 'base', 'port': 5432})
+
+    def test_include_cycle(self):
+        self.write({'common.yaml': '$include: main.yaml\nbase(&base):\n  image: base\n  port: 80\n'})
+        config_dict, _, _ = self.load(workers=1)
+        # Every file is loaded once
+        self.assertEqual(sorted(config_dict), ['app', 'base(&base)', 'db', 'web(&web)'])
+
+    def test_duplicate_top_level_key(self):
+        self.write({'services/db.yaml': 'db:\n  port: 5432\napp:\n  port: 1\n'})
+        self.assertEqual(self.load(workers=1), -1)
+
+    def test_duplicate_anchor(self):
+        self.write({'services/db.yaml': 'db(&base):\n  port: 5432\n'})
+        self.assertEqual(self.load(workers=1), -1)
+
+    def test_pools(self):
+        expected = self.load(workers=1)
+        for use_threads in (True, False):
+            result = self.load(workers=2, use_threads=use_threads)
+            self.assertEqual(result[0], expected[0])
+            self.assertEqual(list(result[0]), list(expected[0]))
+            self.assertEqual(result[2], expected[2])
+            self.assertEqual(self.merge(result), self.merge(self.load(workers=1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Tests of MeldDict of libs.melddict.
+"""
+import copy
+import unittest
+
+from libs.melddict import MeldDict, copy_tree, freeze
+
+
+class OwnedTest(unittest.TestCase):
+    BASE = {'a': {'b': {'c': 1, 'd': [1]}, 'e': 2}, 'f': {'g': 3}}
+    OTHER = {'a': {'b': {'c': 4, 'd': [2]}}, 'f': {'h': 5}}
+
+    def test_owned_changes_nested_dicts_in_place(self):
+        tree = copy_tree(self.BASE)
+        nested = tree['a']['b']
+        result = MeldDict(tree).add(self.OTHER, owned=True)
+        self.assertEqual(result, MeldDict(self.BASE).add(self.OTHER))
+        self.assertIs(result['a']['b'], nested)
+        self.assertEqual(nested, {'c': 4, 'd': [1, 2]})
+
+    def test_not_owned_copies_nested_dicts(self):
+        base = copy.deepcopy(self.BASE)
+        result = MeldDict(base).add(self.OTHER)
+        self.assertEqual(base, self.BASE)
+        self.assertIsNot(result['a']['b'], base['a']['b'])
+        MeldDict(base).subtract(self.OTHER)
+        self.assertEqual(base, self.BASE)
+
+    def test_owned_copies_frozen_dicts(self):
+        frozen = freeze(self.BASE['a'])
+        result = MeldDict(f=dict(self.BASE['f']), a=frozen).add(self.OTHER, owned=True)
+        self.assertEqual(frozen, self.BASE['a'])
+        self.assertEqual(result, MeldDict(self.BASE).add(self.OTHER))
+
+    def test_owned_subtract(self):
+        tree = copy_tree(self.BASE)
+        result = MeldDict(tree).subtract({'a': {'b': {'c': 0}}, 'f': {'g': 0}}, owned=True)
+        self.assertEqual(result, {'a': {'b': {'d': [1]}, 'e': 2}, 'f': {}})
+        self.assertEqual(self.BASE['a']['b'], {'c': 1, 'd': [1]})
+
+    def test_copy_tree_doesnt_share_dicts(self):
+        shared = {'k': 1}
+        tree = copy_tree({'x': shared, 'y': shared, 'z': [shared]})
+        self.assertIsNot(tree['x'], tree['y'])
+        MeldDict(tree).add({'x': {'k': 2}}, owned=True)
+        self.assertEqual(tree, {'x': {'k': 2}, 'y': {'k': 1}, 'z': [{'k': 1}]})
+        self.assertEqual(shared, {'k': 1})
+
+    def test_copy_tree_of_recursive_list(self):
+        value = [1]
+        value.append(value)
+        copied = copy_tree(value)
+        self.assertIsNot(copied, value)
+        self.assertIs(copied[1], copied)
+
+
+if __name__ == '__main__':
+    unittest.main()
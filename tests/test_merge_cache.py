@@ -0,0 +1,113 @@
+"""
+Tests of MergeCache of utils.merge_cache.
+"""
+import os
+import shutil
+import logging
+import tempfile
+import unittest
+
+from libs.melddict import merge_by_key
+from utils.merge_cache import MergeCache
+
+CONFIG = 'base(&base):\n  image: base\n  port: 80\n  hosts: [{name: a}]\nservice:\n  "->": base\n  port: 443\n'
+
+
+class MergeFileTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'config.yaml')
+        with open(self.filename, 'w') as f:
+            f.write(CONFIG)
+        self.cache = MergeCache(os.path.join(self.directory, 'cache'))
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(self.directory)
+
+    def test_unsupported_arguments(self):
+        for name in ('lazy', 'incremental', 'workers', 'stats'):
+            self.assertEqual(self.cache.merge_file(self.filename, **{name: 2 if name == 'workers' else True}), -1)
+        self.assertEqual(self.cache.entries(), [])
+
+    def test_lazy_doesnt_change_cached_config(self):
+        self.cache.merge_file(self.filename, lazy=True)
+        for _ in range(2):
+            config_dict = self.cache.merge_file(self.filename)
+            self.assertIs(type(config_dict), dict)
+            self.assertEqual(config_dict['service'], {'image': 'base', 'port': 443, 'hosts': [{'name': 'a'}]})
+        self.assertEqual(len(self.cache.entries()), 1)
+
+    def test_default_arguments(self):
+        config_dict = self.cache.merge_file(self.filename, lazy=False, incremental=False, workers=None, stats=False)
+        self.assertEqual(config_dict['service'], {'image': 'base', 'port': 443, 'hosts': [{'name': 'a'}]})
+
+    def cached_key(self):
+        entries = self.cache.entries()
+        self.assertEqual(len(entries), 1)
+        return os.path.basename(entries[0][2])[:-len('.merged')]
+
+    def test_hit(self):
+        config_dict = self.cache.merge_file(self.filename)
+        # A hit returns the cached config, not a new merge
+        self.cache.set(self.cached_key(), {'cached': True})
+        self.assertEqual(self.cache.merge_file(self.filename), {'cached': True})
+        self.assertEqual(len(self.cache.entries()), 1)
+        self.assertNotEqual(config_dict, {'cached': True})
+
+    def test_key_changes_with_settings_and_file(self):
+        keys = set()
+        for kwargs in (dict(), dict(copy_on_write=True), dict(delimiter='.'),
+                       dict(list_strategies={('base(&base)', 'hosts'): 'unique'}),
+                       dict(list_strategies={('base(&base)', 'hosts'): merge_by_key('name')})):
+            self.cache.clear()
+            self.assertNotEqual(self.cache.merge_file(self.filename, **kwargs), -1)
+            keys.add(self.cached_key())
+        self.assertEqual(len(keys), 5)
+
+        self.cache.clear()
+        self.cache.merge_file(self.filename)
+        key = self.cached_key()
+        with open(self.filename, 'a') as f:
+            f.write('other: 1\n')
+        self.cache.clear()
+        self.assertEqual(self.cache.merge_file(self.filename)['other'], 1)
+        self.assertNotEqual(self.cached_key(), key)
+
+    def test_list_strategies_keys(self):
+        path = ('base(&base)', 'hosts')
+        self.cache.merge_file(self.filename, list_strategies={path: merge_by_key('name')})
+        key = self.cached_key()
+        # An equal merge_by_key of another process gives the same key
+        self.cache.clear()
+        self.cache.merge_file(self.filename, list_strategies={path: merge_by_key('name')})
+        self.assertEqual(self.cached_key(), key)
+        self.cache.clear()
+        for strategy in (lambda this, that: that, merge_by_key(object())):
+            self.assertEqual(self.cache.merge_file(self.filename, list_strategies={path: strategy}), -1)
+        self.assertEqual(self.cache.entries(), [])
+
+    def test_evict_least_recently_used(self):
+        for i in range(3):
+            self.assertEqual(self.cache.set('key_{}'.format(i), {'value': 'x' * 1000}), 1)
+            os.utime(self.cache.path('key_{}'.format(i)), (1000 + i, 1000 + i))
+        size = self.cache.entries()[0][1]
+        # Reading key_0 makes it the most recently used
+        self.assertEqual(self.cache.get('key_0'), {'value': 'x' * 1000})
+        self.cache.max_size = 2 * size
+        self.cache.evict()
+        paths = [path for _, _, path in self.cache.entries()]
+        self.assertEqual(sorted(os.path.basename(path) for path in paths), ['key_0.merged', 'key_2.merged'])
+        self.assertIsNone(self.cache.get('key_1'))
+
+    def test_size_cap_on_set(self):
+        self.cache.set('key_0', {'value': 'x' * 1000})
+        self.cache.max_size = self.cache.entries()[0][1]
+        os.utime(self.cache.path('key_0'), (1000, 1000))
+        self.cache.set('key_1', {'value': 'y' * 1000})
+        self.assertEqual([os.path.basename(path) for _, _, path in self.cache.entries()], ['key_1.merged'])
+
+
+if __name__ == '__main__':
+    unittest.main()
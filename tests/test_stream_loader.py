@@ -0,0 +1,119 @@
+"""
+Tests of utils.stream_loader against yaml.safe_load and ConfigMerger.build_index.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+import yaml
+
+from DRY import ConfigMerger
+from utils.stream_loader import load_config
+
+ALIASES = """
+defaults: &defaults
+  image: base
+  env: {level: 1}
+base(&base): *defaults
+copy: *defaults
+web:
+  ->: base
+  port: 8080
+nested:
+  ref(&nested_ref): *defaults
+  user:
+    ->: nested_ref
+"""
+
+MERGE_KEYS = """
+defaults: &defaults
+  image: base
+  env: {level: 1}
+extra: &extra
+  debug: true
+  image: extra
+base(&base):
+  <<: *defaults
+  port: 80
+web:
+  ->: base
+  <<: [*extra, *defaults]
+  port: 8080
+override:
+  <<: *defaults
+  image: own
+"""
+
+LIST_ANCHORS = """
+base(&base):
+  image: base
+list:
+  - &item {name: a, ->: base}
+  - *item
+  - [&inner {x: 1}, *inner]
+ref: *item
+inner: *inner
+"""
+
+
+class LoadConfigTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(self.directory)
+
+    def check_load(self, text, check_loaded):
+        filename = os.path.join(self.directory, 'config.yaml')
+        with open(filename, 'w') as f:
+            f.write(text)
+        config_dict, index = load_config(filename)
+        expected = yaml.safe_load(text)
+        self.assertEqual(config_dict, expected)
+        self.assertEqual(list(config_dict), list(expected))
+
+        expected_index = ConfigMerger(dict(), merge_at_init=False).build_index(expected)
+        self.assertEqual(index.anchors, expected_index.anchors)
+        self.assertEqual(index.pointers, expected_index.pointers)
+        check_loaded(config_dict, index)
+
+        # The loaded config is merged in place
+        merged = ConfigMerger(config_dict, merge_at_init=True, index=index, inplace=True)
+        expected_merged = ConfigMerger(expected, merge_at_init=True)
+        self.assertEqual(merged.return_value, 1)
+        self.assertEqual(expected_merged.return_value, 1)
+        self.assertEqual(merged.config_dict, expected_merged.config_dict)
+
+    def test_aliases(self):
+        def check_loaded(config_dict, index):
+            # Aliases are the same dict, like yaml.safe_load
+            self.assertIs(config_dict['copy'], config_dict['defaults'])
+            self.assertIs(config_dict['base(&base)'], config_dict['defaults'])
+            self.assertEqual(len(index.anchors), 2)
+
+        self.check_load(ALIASES, check_loaded)
+
+    def test_merge_keys(self):
+        def check_loaded(config_dict, index):
+            self.assertEqual(config_dict['web'], {'->': 'base', 'debug': True, 'image': 'extra', 'env': {'level': 1},
+                                                  'port': 8080})
+            self.assertEqual(config_dict['override']['image'], 'own')
+
+        self.check_load(MERGE_KEYS, check_loaded)
+
+    def test_anchors_in_lists(self):
+        def check_loaded(config_dict, index):
+            self.assertIs(config_dict['list'][0], config_dict['list'][1])
+            self.assertIs(config_dict['list'][2][0], config_dict['inner'])
+            # Lists are not indexed, the alias at the top level is
+            self.assertEqual([entry['parent'] for entry in index.pointers], [('ref',)])
+
+        self.check_load(LIST_ANCHORS, check_loaded)
+
+
+if __name__ == '__main__':
+    unittest.main()
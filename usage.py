@@ -1,6 +1,6 @@
 import os
 import sys
-from DRY import ConfigMerger
+from DRY import ConfigMerger, setup_logging
 import logging
 logger = logging.getLogger("DRY")  # DRY: Dont Repeat Yourself (Merge, Extend and Override your config file)
 
@@ -8,8 +8,6 @@ from utils.box import load_from_yaml, load_from_json, to_json, to_yaml
 from utils.util import get_recursively
 from pprint import pprint
 
-from ruamel.yaml import YAML
-
 
 def convert_to_normal_dicts(_dict):
     deserialised = dict()
@@ -20,6 +18,8 @@ def convert_to_normal_dicts(_dict):
     return deserialised
 
 def main():
+    # Importing DRY doesn't configure logging
+    setup_logging()
     # For usage of DRY go to config.yaml.
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     # Loading config in YAML format
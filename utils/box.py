@@ -7,6 +7,7 @@ https://raw.githubusercontent.com/cdgriffith/Box/master/box.py
 """
 import string
 import sys
+import codecs
 import json
 import re
 import copy
@@ -21,16 +22,64 @@ try:
 except ImportError:
     from collections import Iterable, Mapping, Callable
 
+# False when neither ruamel.yaml nor PyYAML can be imported, it is known after the first use of YAML
 yaml_support = True
+_yaml = None
 
-try:
-    import ruamel.yaml as yaml
-except ImportError:
-    try:
-        import yaml
-    except ImportError:
-        yaml = None
-        yaml_support = False
+
+def yaml_module():
+    """
+    ruamel.yaml, or PyYAML when ruamel.yaml isn't installed. It is imported on the first call, so importing this module
+    doesn't import YAML.
+
+    :return: module, None if neither of them is installed
+    """
+    global _yaml, yaml_support
+    if _yaml is None and yaml_support:
+        try:
+            import ruamel.yaml as module
+        except ImportError:
+            try:
+                import yaml as module
+            except ImportError:
+                module = None
+                yaml_support = False
+        _yaml = module
+    return _yaml
+
+
+class _LazyYAML(object):
+    """
+    Stands for the module of 'yaml_module', it is imported on the first access to an attribute.
+    """
+
+    def __getattr__(self, name):
+        module = yaml_module()
+        if module is None:
+            raise ImportError('YAML requires ruamel.yaml or PyYAML')
+        return getattr(module, name)
+
+    def __repr__(self):
+        return '<lazy YAML module {!r}>'.format(_yaml)
+
+
+yaml = _LazyYAML()
+
+_orjson = False  # orjson module, None if it isn't installed, False before the first use of fast JSON loader
+
+
+def orjson_module():
+    """
+    :return: orjson module, imported on the first call, None if it isn't installed
+    """
+    global _orjson
+    if _orjson is False:
+        try:
+            import orjson as module
+        except ImportError:
+            module = None
+        _orjson = module
+    return _orjson
 
 if sys.version_info >= (3, 0):
     basestring = str
@@ -55,7 +104,22 @@ def to_json(obj, filename=None, encoding="utf-8", errors="strict", **json_kwargs
         return json_dump
 
 
-def load_from_json(json_string=None, filename=None, encoding="utf-8", errors="strict", multiline=False, **kwargs):
+def load_from_json(json_string=None, filename=None, encoding="utf-8", errors="strict", multiline=False, fast=False,
+                   **kwargs):
+    """
+    :param fast: parse with orjson when it is installed and there are no json kwargs, else with json.
+    """
+    orjson = orjson_module() if fast and not kwargs and not multiline else None
+    if orjson is not None:
+        if filename:
+            with open(filename, 'rb') as f:
+                data = f.read()
+            # orjson parses UTF-8 bytes, other encodings are decoded first
+            if codecs.lookup(encoding).name != 'utf-8' or errors != 'strict':
+                data = data.decode(encoding, errors)
+            return orjson.loads(data)
+        elif json_string:
+            return orjson.loads(json_string)
     if filename:
         with open(filename, 'r', encoding=encoding, errors=errors) as f:
             if multiline:
@@ -82,13 +146,53 @@ def to_yaml(obj, filename=None, default_flow_style=False, encoding="utf-8", erro
         return yaml.dump(obj, default_flow_style=default_flow_style, **yaml_kwargs)
 
 
-def load_from_yaml(yaml_string=None, filename=None, encoding="utf-8", errors="strict", **kwargs):
+def fast_yaml_loader():
+    """
+    Fastest safe YAML loader that is available: the C loader of libyaml of 'yaml_module', else the C loader of PyYAML
+    (when ruamel.yaml is used without its C extension), else the pure Python safe loader. All of them build plain dicts
+    and lists. Run it by 'load_yaml_with', yaml.load of ruamel.yaml doesn't take loaders of PyYAML.
+    """
+    loader = getattr(yaml, 'CSafeLoader', None)
+    if loader is None:
+        try:
+            import yaml as pyyaml
+            loader = getattr(pyyaml, 'CSafeLoader', None)
+        except ImportError:
+            pass
+    return loader or yaml.SafeLoader
+
+
+def load_yaml_with(stream, Loader):
+    """
+    Load one YAML document of 'stream' with 'Loader' of ruamel.yaml or PyYAML, like yaml.load of PyYAML.
+    """
+    loader = Loader(stream)
+    try:
+        return loader.get_single_data()
+    finally:
+        loader.dispose()
+
+
+def load_from_yaml(yaml_string=None, filename=None, encoding="utf-8", errors="strict", fast=False, **kwargs):
+    """
+    :param fast: load with 'fast_yaml_loader', a safe loader: tags of Python objects are not supported. With kwargs, the
+      fastest safe loader of 'yaml_module' is used.
+    :param kwargs: arguments of yaml.load, the default Loader is yaml.Loader.
+    """
+    if yaml_module() is None:
+        logger.error('from_yaml requires ruamel.yaml or PyYAML')
+        return -1
+    if fast and not kwargs:
+        load = load_yaml_with
+        kwargs['Loader'] = fast_yaml_loader()
+    else:
+        load = yaml.load
+        kwargs.setdefault('Loader', (getattr(yaml, 'CSafeLoader', None) or yaml.SafeLoader) if fast else yaml.Loader)
     if filename:
         with open(filename, 'r', encoding=encoding, errors=errors) as f:
-            # data = yaml.load(f, **kwargs)
-            data = yaml.load(f, Loader=yaml.Loader)
+            data = load(f, **kwargs)
     elif yaml_string:
-        data = yaml.load(yaml_string, **kwargs)
+        data = load(yaml_string, **kwargs)
     else:
         # raise BoxError('from_yaml requires a string or filename')
         logger.error('from_yaml requires a string or filename')
@@ -0,0 +1,382 @@
+"""
+Compiled configs: a merged config in a compact binary file that is loaded by mmap and decoded lazily.
+
+compile_config writes the file once after merging, load_compiled maps it and returns a read only view of the root dict.
+Dicts and lists are decoded only when they are accessed, so loading takes the same time for any size of config, and
+processes that load the same file share its pages in the page cache.
+
+File format (little-endian):
+    header: magic b'DRYC', version (uint32), offset of the root value (uint64)
+    values, every value is a record at an offset:
+        'D' dict: count (uint32), (key offset, value offset) pairs (uint32) in dict order, then positions of the pairs
+            (uint32) sorted by the records of their keys, for binary search
+        'L' list: count (uint32), value offsets (uint32)
+        'S' str: length (uint32), UTF-8 bytes      'I' int: int64        'N' big int: length (uint32), decimal digits
+        'F' float: double      'B' bool: one byte      'Z' None      'P' other values: length (uint32), pickle
+Equal scalars and the same dict or list object (like shared anchors of copy_on_write) are written once.
+A loaded CompiledDict can be compiled again, its shared dicts and lists stay shared.
+Offsets are 32 bits, so files are up to 4 GB. Tuples are loaded as lists. Pickled values are loaded by pickle, only load
+compiled files that you trust.
+
+"""
+import os
+import mmap
+import struct
+import pickle
+import logging
+
+try:
+    from collections.abc import Mapping, Sequence
+except ImportError:  # Python 2
+    from collections import Mapping, Sequence
+
+logger = logging.getLogger("DRY")
+
+try:
+    string_types = basestring,
+except NameError:
+    string_types = str,
+
+MAGIC = b'DRYC'
+VERSION = 1
+_HEADER = struct.Struct('<4sIQ')
+_COUNT = struct.Struct('<I')
+_PAIR = struct.Struct('<II')
+_OFFSET = struct.Struct('<I')
+_INT = struct.Struct('<q')
+_FLOAT = struct.Struct('<d')
+_INT_MIN, _INT_MAX = -2 ** 63, 2 ** 63 - 1
+_MAX_SIZE = 2 ** 32 - 1
+
+_replace = getattr(os, 'replace', os.rename)
+
+_CONTAINER_TYPES = frozenset((dict, list, tuple))
+_SCALAR_TYPES = frozenset((bool, int, float, type(None)) + string_types)
+_SCALAR_SEQUENCES = string_types + (bytes, bytearray)
+
+
+def compile_config(config_dict, filename):
+    """
+    Write 'config_dict' to 'filename' in the compiled format. The file is replaced atomically, processes that have
+    mapped the old file keep reading it.
+
+    :param config_dict: merged config, a dict (or Mapping) of dicts, lists and scalars.
+    :return: 1, -1 on error
+    """
+    # Imported on use, loading doesn't need it
+    import tempfile
+
+    try:
+        data = _encode(config_dict)
+        directory = os.path.dirname(os.path.abspath(filename))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            _replace(tmp_path, filename)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        return 1
+    except Exception as err:
+        logger.error("Compiling config failed: {}: {}".format(filename, err), exc_info=True)
+        return -1
+
+
+def load_compiled(filename):
+    """
+    Map a compiled config file.
+
+    :return: CompiledDict of the root dict, -1 on error
+    """
+    try:
+        with open(filename, 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, root = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != VERSION:
+            logger.error("Not a compiled config of version {}: {}".format(VERSION, filename))
+            return -1
+        return _decode(buf, root)
+    except Exception as err:
+        logger.error("Loading compiled config failed: {}: {}".format(filename, err))
+        return -1
+
+
+class CompiledDict(Mapping):
+    """
+    Read only view of a dict of a compiled config. Keys are found by binary search, nested dicts and lists are views
+    too.
+    """
+    __slots__ = ('_buf', '_offset', '_count')
+
+    def __init__(self, buf, offset):
+        self._buf = buf
+        self._offset = offset
+        self._count = _COUNT.unpack_from(buf, offset + 1)[0]
+
+    def __getitem__(self, key):
+        try:
+            records = [_encode_scalar(key)]
+        except TypeError:
+            raise KeyError(key)
+        if isinstance(key, (int, float)) and not isinstance(key, string_types):
+            # Like dict, 1, 1.0 and True are the same key
+            records.extend(_encode_scalar(other) for other in (int(key), float(key), bool(key))
+                           if other == key and type(other) is not type(key))
+        buf = self._buf
+        pairs = self._offset + 1 + _COUNT.size
+        positions = pairs + self._count * _PAIR.size
+        for record in records:
+            low, high = 0, self._count
+            while low < high:
+                middle = (low + high) // 2
+                position = _COUNT.unpack_from(buf, positions + middle * _COUNT.size)[0]
+                key_offset, value_offset = _PAIR.unpack_from(buf, pairs + position * _PAIR.size)
+                other = _record(buf, key_offset)
+                if other < record:
+                    low = middle + 1
+                elif record < other:
+                    high = middle
+                else:
+                    return _decode(buf, value_offset)
+        raise KeyError(key)
+
+    def __iter__(self):
+        buf = self._buf
+        pairs = self._offset + 1 + _COUNT.size
+        for i in range(self._count):
+            yield _decode(buf, _PAIR.unpack_from(buf, pairs + i * _PAIR.size)[0])
+
+    def __len__(self):
+        return self._count
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, list(self))
+
+    def items(self):
+        buf = self._buf
+        pairs = self._offset + 1 + _COUNT.size
+        result = []
+        for i in range(self._count):
+            key_offset, value_offset = _PAIR.unpack_from(buf, pairs + i * _PAIR.size)
+            result.append((_decode(buf, key_offset), _decode(buf, value_offset)))
+        return result
+
+    def as_dict(self):
+        """
+        Decode the whole dict.
+        :return: dict of dicts, lists and scalars
+        """
+        return dict((key, _plain(value)) for key, value in self.items())
+
+
+class CompiledList(Sequence):
+    """
+    Read only view of a list of a compiled config.
+    """
+    __slots__ = ('_buf', '_offset', '_count')
+
+    def __init__(self, buf, offset):
+        self._buf = buf
+        self._offset = offset
+        self._count = _COUNT.unpack_from(buf, offset + 1)[0]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('list index out of range')
+        offsets = self._offset + 1 + _COUNT.size
+        return _decode(self._buf, _OFFSET.unpack_from(self._buf, offsets + index * _OFFSET.size)[0])
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, tuple, CompiledList)):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __len__(self):
+        return self._count
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, self.as_list())
+
+    def as_list(self):
+        """
+        Decode the whole list.
+        :return: list of dicts, lists and scalars
+        """
+        return [_plain(value) for value in self]
+
+
+def _plain(value):
+    if isinstance(value, CompiledDict):
+        return value.as_dict()
+    if isinstance(value, CompiledList):
+        return value.as_list()
+    return value
+
+
+def _encode_scalar(value):
+    """
+    :return: record of a scalar value
+    :raises TypeError: for dicts and lists
+    """
+    cls = type(value)
+    if cls is bool:
+        return b'B' + (b'\x01' if value else b'\x00')
+    if value is None:
+        return b'Z'
+    if isinstance(value, string_types):
+        data = value.encode('utf-8')
+        return b'S' + _COUNT.pack(len(data)) + data
+    if isinstance(value, int) and not isinstance(value, bool):
+        if _INT_MIN <= value <= _INT_MAX:
+            return b'I' + _INT.pack(value)
+        data = str(value).encode('ascii')
+        return b'N' + _COUNT.pack(len(data)) + data
+    if cls is float:
+        return b'F' + _FLOAT.pack(value)
+    if _is_container(value):
+        raise TypeError('{} is not a scalar'.format(cls.__name__))
+    data = pickle.dumps(value, protocol=2)
+    return b'P' + _COUNT.pack(len(data)) + data
+
+
+def _is_container(value):
+    """
+    :return: True for dicts and lists, Mappings and Sequences like CompiledDict and CompiledList, but not strings
+    """
+    cls = type(value)
+    if cls in _CONTAINER_TYPES:
+        return True
+    if cls in _SCALAR_TYPES:
+        return False
+    return isinstance(value, (Mapping, Sequence)) and not isinstance(value, _SCALAR_SEQUENCES)
+
+
+def _container_key(value):
+    """
+    :return: key of a dict or list for writing it once, views of a loaded file are new objects on every access, so
+        they are keyed by their record
+    """
+    if isinstance(value, (CompiledDict, CompiledList)):
+        return id(value._buf), value._offset
+    return id(value)
+
+
+def _encode(config_dict):
+    """
+    :return: bytes of the compiled file of 'config_dict'
+    """
+    out = bytearray(_HEADER.size)
+    scalars = dict()  # record -> offset
+    containers = dict()  # key of dict or list -> offset
+    visiting = set()
+    # Dicts and lists are kept until the end, so their ids are not reused by views that are decoded later
+    written = []
+
+    def offset_of(value):
+        if _is_container(value):
+            return containers[_container_key(value)]
+        record = _encode_scalar(value)
+        offset = scalars.get(record)
+        if offset is None:
+            offset = scalars[record] = len(out)
+            out.extend(record)
+        return offset
+
+    # Children are written before their dict or list, so the offsets of children are known
+    # 'path' is the key path of a dict or list, for errors
+    # 'items' are the key, child pairs, children that are views are decoded once
+    stack = [(config_dict, None, ())]
+    while stack:
+        value, items, path = stack.pop()
+        key = _container_key(value)
+        if key in containers:
+            continue
+        if items is None:
+            if key in visiting:
+                raise ValueError('config has a recursive dict or list')
+            visiting.add(key)
+            items = list(value.items() if isinstance(value, Mapping) else enumerate(value))
+            stack.append((value, items, path))
+            for child_key, child in items:
+                if _is_container(child) and _container_key(child) not in containers:
+                    stack.append((child, None, path + (child_key,)))
+            continue
+        visiting.discard(key)
+        if isinstance(value, Mapping):
+            records = []
+            for child_key, _ in items:
+                try:
+                    records.append(_encode_scalar(child_key))
+                except TypeError:
+                    raise TypeError('unsupported key {!r} of dict at {!r}'.format(child_key, path))
+            pairs = [(offset_of(child_key), offset_of(child)) for child_key, child in items]
+            order = sorted(range(len(items)), key=records.__getitem__)
+            record = bytearray(b'D' + _COUNT.pack(len(items)))
+            for pair in pairs:
+                record.extend(_PAIR.pack(*pair))
+            for position in order:
+                record.extend(_COUNT.pack(position))
+        else:
+            record = bytearray(b'L' + _COUNT.pack(len(items)))
+            for _, child in items:
+                record.extend(_OFFSET.pack(offset_of(child)))
+        if len(out) + len(record) > _MAX_SIZE:
+            raise ValueError('compiled config is bigger than {} bytes'.format(_MAX_SIZE))
+        containers[key] = len(out)
+        written.append(value)
+        out.extend(record)
+    _HEADER.pack_into(out, 0, MAGIC, VERSION, offset_of(config_dict))
+    return bytes(out)
+
+
+def _record(buf, offset):
+    """
+    :return: record of the scalar at 'offset'
+    """
+    kind = buf[offset:offset + 1]
+    if kind in (b'S', b'N', b'P'):
+        return buf[offset:offset + 1 + _COUNT.size + _COUNT.unpack_from(buf, offset + 1)[0]]
+    if kind in (b'I', b'F'):
+        return buf[offset:offset + 9]
+    if kind == b'B':
+        return buf[offset:offset + 2]
+    return buf[offset:offset + 1]
+
+
+def _decode(buf, offset):
+    """
+    :return: value at 'offset', CompiledDict and CompiledList for dicts and lists
+    """
+    kind = buf[offset:offset + 1]
+    if kind == b'S':
+        size = _COUNT.unpack_from(buf, offset + 1)[0]
+        start = offset + 1 + _COUNT.size
+        return buf[start:start + size].decode('utf-8')
+    if kind == b'D':
+        return CompiledDict(buf, offset)
+    if kind == b'I':
+        return _INT.unpack_from(buf, offset + 1)[0]
+    if kind == b'L':
+        return CompiledList(buf, offset)
+    if kind == b'F':
+        return _FLOAT.unpack_from(buf, offset + 1)[0]
+    if kind == b'B':
+        return buf[offset + 1:offset + 2] == b'\x01'
+    if kind == b'Z':
+        return None
+    size = _COUNT.unpack_from(buf, offset + 1)[0]
+    start = offset + 1 + _COUNT.size
+    if kind == b'N':
+        return int(buf[start:start + size].decode('ascii'))
+    if kind == b'P':
+        return pickle.loads(buf[start:start + size])
+    raise ValueError('unknown record {!r} at offset {}'.format(kind, offset))
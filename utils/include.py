@@ -0,0 +1,194 @@
+"""
+Loading one config from many files for ConfigMerger.
+
+The top level keys of all files are put in one config, so pointers of a file can point to anchors of other files. Files
+are parsed in parallel by utils.box loaders in a process pool (or a thread pool) and every worker indexes anchors and
+pointers of its file. Anchors of all files are kept in one registry, anchor name -> file, so an anchor that is in two
+files or a pointer without anchor is reported with its files.
+
+A file includes other files by the top level key 'include_key' ('$include' by default), a file name or a list of file
+names and glob patterns relative to the file:
+
+    $include: [common.yaml, services/*.yaml]
+
+Every file is loaded once. Keys of included files come before the keys of the file that includes them, like the files
+were concatenated, and a top level key can't be in two files.
+
+"""
+import os
+import glob
+import logging
+
+from utils.box import load_from_json, load_from_yaml
+
+logger = logging.getLogger("DRY")
+
+try:
+    string_types = basestring,
+except NameError:
+    string_types = str,
+
+
+def load_files(filenames, workers=None, use_threads=False, fast=False, include_key='$include', re_anchor=None,
+               re_name=None, anchor_start_pattern='(&', pointer_pattern='->', delimiter=':'):
+    """
+    Load config files and their included files in parallel and put them in one config.
+
+        config_dict, index, registry = load_files(['common.yaml', 'services.yaml'])
+        merger_obj = ConfigMerger(config_dict, True, index=index, inplace=True)
+
+    :param filenames: paths of YAML or JSON config files, files with '.json' extension are loaded as JSON.
+    :param workers: number of processes (or threads), the default is the default of concurrent.futures. 1 loads files in
+      this process.
+    :param use_threads: load files in a thread pool instead of a process pool.
+    :param fast: 'fast' of utils.box loaders.
+    :param include_key: top level key of included files.
+    :param re_anchor, re_name, anchor_start_pattern, pointer_pattern, delimiter: settings of ConfigMerger.
+    :return: (config_dict, ConfigIndex, registry), registry is a dict of anchor name -> path of its file. -1 on error
+    """
+    from DRY import ConfigMerger, ConfigIndex
+    try:
+        # Imported on use, it imports multiprocessing
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+    except ImportError:
+        # Python 2 without futures package, files are loaded one by one
+        ProcessPoolExecutor = ThreadPoolExecutor = None
+
+    patterns = (pointer_pattern, anchor_start_pattern)
+    loaded = dict()  # path -> (config of file, paths of included files, index of file)
+    queue = []
+
+    def add_result(filename, result):
+        loaded[filename] = result
+        for include in result[1]:
+            if include not in loaded and include not in queue:
+                queue.append(include)
+
+    try:
+        queue.extend(os.path.abspath(filename) for filename in filenames)
+        if workers == 1 or ProcessPoolExecutor is None:
+            while queue:
+                filename = queue.pop(0)
+                try:
+                    add_result(filename, _load_file(filename, fast, include_key, patterns, delimiter))
+                except Exception as err:
+                    print("Loading config file failed: {}: {}".format(filename, err))
+                    logger.error("Loading config file failed: {}: {}".format(filename, err))
+                    return -1
+        else:
+            executor_class = ThreadPoolExecutor if use_threads else ProcessPoolExecutor
+            with executor_class(max_workers=workers) as executor:
+                futures = dict()  # future -> path of file
+                while queue or futures:
+                    while queue:
+                        filename = queue.pop(0)
+                        future = executor.submit(_load_file, filename, fast, include_key, patterns, delimiter)
+                        futures[future] = filename
+                        # Files of the queue are skipped again by add_result until they are loaded
+                        loaded[filename] = None
+                    done, _ = wait(list(futures), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        filename = futures.pop(future)
+                        try:
+                            add_result(filename, future.result())
+                        except Exception as err:
+                            print("Loading config file failed: {}: {}".format(filename, err))
+                            logger.error("Loading config file failed: {}: {}".format(filename, err))
+                            for future in futures:
+                                future.cancel()
+                            return -1
+
+        # Files in include order: included files first
+        order = []
+        visited = set()
+        stack = [(os.path.abspath(filename), False) for filename in reversed(filenames)]
+        while stack:
+            filename, ready = stack.pop()
+            if ready:
+                order.append(filename)
+                continue
+            if filename in visited:
+                continue
+            visited.add(filename)
+            stack.append((filename, True))
+            stack.extend((include, False) for include in reversed(loaded[filename][1]))
+
+        merger_obj = ConfigMerger(dict(), merge_at_init=False, re_anchor=re_anchor, re_name=re_name,
+                                  anchor_start_pattern=anchor_start_pattern, pointer_pattern=pointer_pattern,
+                                  delimiter=delimiter, inplace=True, index=ConfigIndex(delimiter=delimiter))
+        config_dict = dict()
+        sources = dict()  # top level key -> path of its file
+        index = ConfigIndex(delimiter=delimiter)
+        registry = dict()
+        for filename in order:
+            file_config, _, file_index = loaded[filename]
+            for key, value in file_config.items():
+                if key in config_dict:
+                    print("Key {} is in {} and {}".format(key, sources[key], filename))
+                    logger.error("Key {} is in {} and {}".format(key, sources[key], filename))
+                    return -1
+                config_dict[key] = value
+                sources[key] = filename
+            for entry in file_index.anchors:
+                _anchors = merger_obj.find_anchors(entry['key'])
+                if not _anchors or not _anchors[0][1]:
+                    continue
+                name = _anchors[0][1][0]
+                if name in registry and registry[name] != filename:
+                    print("Anchor {} is in {} and {}".format(name, registry[name], filename))
+                    logger.error("Anchor {} is in {} and {}".format(name, registry[name], filename))
+                    return -1
+                registry[name] = filename
+            index.anchors.extend(file_index.anchors)
+            index.pointers.extend(file_index.pointers)
+
+        for entry in index.pointers:
+            if entry['parent'] and isinstance(entry['value'], string_types) and entry['value'] not in registry:
+                key = index.join(entry['parent'] + (entry['key'],))
+                print("Pointer {} of {} doesnt match any anchor of files".format(key, sources[entry['parent'][0]]))
+                logger.error("Pointer {} of {} doesnt match any anchor of files".format(
+                    key, sources[entry['parent'][0]]))
+                return -1
+    except Exception as err:
+        print("Loading config files failed: {}".format(err))
+        logger.error("Loading config files failed: {}".format(err), exc_info=True)
+        return -1
+    index.sort()
+    return config_dict, index, registry
+
+
+def _load_file(filename, fast, include_key, patterns, delimiter):
+    """
+    Load and index one config file, in a worker of load_files.
+
+    :return: (config_dict without 'include_key', absolute paths of included files, ConfigIndex)
+    """
+    from DRY import ConfigIndex
+
+    if os.path.splitext(filename)[1].lower() == '.json':
+        config_dict = load_from_json(filename=filename, fast=fast)
+    else:
+        config_dict = load_from_yaml(filename=filename, fast=fast)
+    if config_dict == -1:
+        raise ValueError('loading failed')
+    if config_dict is None:
+        config_dict = dict()
+    if not isinstance(config_dict, dict):
+        raise ValueError('config must be a dict, not {}'.format(type(config_dict).__name__))
+
+    includes = []
+    names = config_dict.pop(include_key, None) or []
+    for name in [names] if isinstance(names, string_types) else names:
+        if not isinstance(name, string_types):
+            raise ValueError('value of {} must be file names'.format(include_key))
+        pattern = os.path.join(os.path.dirname(filename), os.path.expanduser(name))
+        if glob.has_magic(pattern):
+            includes.extend(os.path.abspath(path) for path in sorted(glob.glob(pattern)))
+        elif os.path.isfile(pattern):
+            includes.append(os.path.abspath(pattern))
+        else:
+            raise ValueError('included file doesnt exist: {}'.format(name))
+
+    index = ConfigIndex(delimiter=delimiter)
+    index.add_tree(config_dict, *patterns)
+    return config_dict, includes, index
@@ -0,0 +1,223 @@
+"""
+On-disk cache of merged configs.
+
+A merged config is stored by a key made from the hash of the raw config file and the settings of ConfigMerger, so every process
+that merges the same file with the same settings can load the merged result instead of merging again.
+The cache has a size cap, least recently used entries are removed first.
+
+Merged configs are saved by pickle, and loading a pickle can run any code: the cache directory must be trusted, only the
+processes that merge configs should be able to write to it.
+
+"""
+import os
+import json
+import time
+import pickle
+import hashlib
+import tempfile
+import logging
+
+from utils.util import calculate_file_hash
+
+logger = logging.getLogger("DRY")
+
+try:
+    string_types = basestring,
+except NameError:
+    string_types = str,
+
+# Change it when the format of cached files changes
+CACHE_VERSION = 1
+CACHE_SUFFIX = '.merged'
+# Settings of ConfigMerger that change the merged result
+MERGER_SETTINGS = ('re_anchor', 're_name', 'anchor_start_pattern', 'pointer_pattern', 'delimiter', 'copy_on_write')
+# Arguments of ConfigMerger that can't be used with the cache: they change what is returned (a LazyConfig, a merger to
+# remerge, stats of a merge) or they need a merge that isn't in place
+UNSUPPORTED_ARGUMENTS = ('lazy', 'incremental', 'workers', 'stats')
+
+_replace = getattr(os, 'replace', os.rename)
+# Types of keys of merge_by_key whose repr is the same in every process
+_STABLE_TYPES = (bool, int, float, type(None)) + string_types
+
+
+def strategy_key(strategy):
+    """
+    Part of cache key for a list strategy of ConfigMerger, it must be the same in every process: names of LIST_STRATEGIES
+    and their functions are keyed by name, merge_by_key by its key. The repr of other callables has their address.
+
+    :return: str, None if the strategy has no stable key
+    """
+    from libs.melddict import merge_by_key, LIST_STRATEGIES
+
+    if isinstance(strategy, string_types):
+        return strategy
+    for name, function in LIST_STRATEGIES.items():
+        if strategy is function:
+            return name
+    if type(strategy) is merge_by_key and type(strategy.key) in _STABLE_TYPES:
+        return repr(strategy)
+    return None
+
+
+class MergeCache(object):
+    def __init__(self, cache_dir, max_size=256 * 1024 * 1024):
+        """
+        :param cache_dir: directory of cached files, it is created if it doesnt exist. It must be trusted, cached files
+          are loaded by pickle.
+        :param max_size: maximum total size of cached files in bytes, the default is 256MB.
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    def key(self, filename, settings):
+        """
+        :param filename: path of the raw config file.
+        :param settings: dict of merger settings.
+        :return: cache key, -1 if hash of file can't be calculated
+        """
+        stat, file_hash = calculate_file_hash(filename)
+        if stat == -1:
+            logger.error("Hash of file can't be calculated: {}".format(file_hash))
+            return -1
+        _key = hashlib.sha256()
+        _key.update(json.dumps([CACHE_VERSION, file_hash, settings], sort_keys=True).encode('utf-8'))
+        return _key.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    def get(self, key):
+        """
+        :return: cached merged config for key, None if there isn't any
+        """
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                config_dict = pickle.load(f)
+        except (IOError, OSError):
+            return None
+        except Exception as err:
+            # Broken file, merge again
+            logger.error("Cached file is not valid and removed: {}, {}".format(path, err))
+            self.remove(path)
+            return None
+
+        # Modification time is the last usage time for LRU
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return config_dict
+
+    def set(self, key, config_dict):
+        """
+        Save merged config for key, the file is written to a temporary file first then renamed, so other processes never see
+        a half written file. Then least recently used files are removed until the cache is under max size.
+        :return: 1, -1 if it can't be saved
+        """
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(config_dict, f, protocol=pickle.HIGHEST_PROTOCOL)
+            _replace(temp_path, self.path(key))
+        except Exception as err:
+            logger.error(err, exc_info=True)
+            return -1
+
+        self.evict()
+        return 1
+
+    def entries(self):
+        """
+        :return: list of (last usage time, size, path) of cached files, least recently used first
+        """
+        _entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(CACHE_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Removed by another process
+                continue
+            _entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(_entries)
+
+    def evict(self):
+        """
+        Remove least recently used files until total size of cache is not greater than max size.
+        """
+        _entries = self.entries()
+        total_size = sum(size for _, size, _ in _entries)
+        for _, size, path in _entries:
+            if total_size <= self.max_size:
+                break
+            self.remove(path)
+            total_size -= size
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        for _, _, path in self.entries():
+            self.remove(path)
+
+    def merge_file(self, filename, **kwargs):
+        """
+        Merge config file by ConfigMerger, or load the merged config from cache if the same file was merged with the same
+        settings before.
+
+        :param filename: path of YAML or JSON config file, files with '.json' extension are loaded as JSON.
+        :param kwargs: arguments of ConfigMerger, except UNSUPPORTED_ARGUMENTS. list strategies must be names, functions of
+          LIST_STRATEGIES or merge_by_key (see strategy_key).
+        :return: merged config, -1 on error
+        """
+        from DRY import ConfigMerger
+        from utils.stream_loader import load_config
+
+        unsupported = sorted(name for name in UNSUPPORTED_ARGUMENTS if kwargs.get(name))
+        if unsupported:
+            logger.error("Arguments can't be used with merge cache: {}".format(', '.join(unsupported)))
+            return -1
+
+        # Resolve default settings of ConfigMerger
+        _merger = ConfigMerger(dict(), merge_at_init=False, **kwargs)
+        settings = dict((name, getattr(_merger, name)) for name in MERGER_SETTINGS)
+        settings['list_strategies'] = []
+        for path, strategy in _merger.list_strategies.items():
+            _strategy_key = strategy_key(strategy)
+            if _strategy_key is None:
+                logger.error("List strategy can't be used with merge cache, it has no stable key: {!r}".format(strategy))
+                return -1
+            settings['list_strategies'].append([list(path), _strategy_key])
+        settings['list_strategies'].sort()
+
+        key = self.key(filename, settings)
+        if key != -1:
+            config_dict = self.get(key)
+            if config_dict is not None:
+                return config_dict
+
+        start = time.time()
+        loaded = load_config(filename, pointer_pattern=_merger.pointer_pattern,
+                             anchor_start_pattern=_merger.anchor_start_pattern, delimiter=_merger.delimiter)
+        if loaded == -1:
+            return -1
+        config_dict, index = loaded
+
+        kwargs['inplace'] = True
+        merger_obj = ConfigMerger(config_dict, merge_at_init=True, index=index, **kwargs)
+        if merger_obj.return_value != 1:
+            logger.error('Error in Config Merger')
+            return -1
+        logger.info("Config file merged in {:.3f} seconds: {}".format(time.time() - start, filename))
+
+        if key != -1:
+            self.set(key, merger_obj.config_dict)
+        return merger_obj.config_dict
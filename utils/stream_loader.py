@@ -0,0 +1,235 @@
+"""
+Streaming loader of config files for ConfigMerger.
+
+A YAML config is built from the events of the YAML parser in one pass: dicts and lists are created directly, without a
+document of YAML nodes, and the anchors and pointers of ConfigMerger are indexed while their keys are read. ConfigMerger
+takes both by 'index' and 'inplace=True', so it doesn't deep-copy the config or walk it again for its index.
+
+Scalars are resolved like yaml.SafeLoader: tags of Python objects are not supported, use utils.box.load_from_yaml for them.
+JSON files are parsed by json (C parser) and indexed by one walk over the loaded dict.
+
+"""
+import io
+import os
+import json
+import logging
+
+from utils.box import yaml, yaml_module
+
+logger = logging.getLogger("DRY")
+
+try:
+    string_types = basestring,
+except NameError:
+    string_types = str,
+
+_STR_TAG = u'tag:yaml.org,2002:str'
+_MERGE_TAG = u'tag:yaml.org,2002:merge'
+_MAP_TAGS = (None, u'!', u'tag:yaml.org,2002:map')
+_SEQ_TAGS = (None, u'!', u'tag:yaml.org,2002:seq')
+_NO_KEY = object()
+
+
+class _Frame(object):
+    """
+    An open dict or list of the YAML document.
+
+    'path' is the key path of a dict that is indexed, None for lists and dicts inside lists, they are not walked by
+    ConfigMerger.build_index either. 'owner' is the index entry of the innermost anchor that holds it.
+    """
+    __slots__ = ('value', 'path', 'owner', 'key', 'key_owner', 'merges')
+
+    def __init__(self, value, path, owner):
+        self.value = value
+        self.path = path
+        self.owner = owner
+        self.key = _NO_KEY
+        self.key_owner = owner
+        self.merges = None
+
+
+def load_config(filename, pointer_pattern='->', anchor_start_pattern='(&', delimiter=':', encoding='utf-8'):
+    """
+    Load a YAML or JSON config file and index its anchors and pointers for ConfigMerger.
+
+        config_dict, index = load_config('config.yaml')
+        merger_obj = ConfigMerger(config_dict, True, index=index, inplace=True)
+
+    :param filename: path of YAML or JSON config file, files with '.json' extension are loaded as JSON.
+    :param pointer_pattern: 'pointer_pattern' of ConfigMerger.
+    :param anchor_start_pattern: 'anchor_start_pattern' of ConfigMerger.
+    :param delimiter: 'delimiter' of ConfigMerger.
+    :return: (config_dict, ConfigIndex), -1 on error
+    """
+    from DRY import ConfigIndex
+
+    index = ConfigIndex(delimiter=delimiter)
+    patterns = (pointer_pattern, anchor_start_pattern)
+    try:
+        if os.path.splitext(filename)[1].lower() == '.json':
+            with io.open(filename, 'r', encoding=encoding) as f:
+                config_dict = json.load(f)
+            if isinstance(config_dict, dict):
+                index.add_tree(config_dict, pointer_pattern, anchor_start_pattern)
+        else:
+            if yaml_module() is None:
+                logger.error('YAML is not supported, install ruamel.yaml')
+                return -1
+            with open(filename, 'rb') as f:
+                config_dict = _load_yaml(f, index, patterns)
+    except Exception as err:
+        print("Loading config file failed: {}: {}".format(filename, err))
+        logger.error("Loading config file failed: {}: {}".format(filename, err))
+        return -1
+    index.sort()
+    return config_dict, index
+
+
+def _load_yaml(stream, index, patterns):
+    """
+    Build the config of a YAML stream from parser events and add its anchors and pointers to 'index'.
+
+    :return: config_dict
+    """
+    events = yaml.events
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)(stream)
+    # Resolves and constructs scalars, it doesn't read the stream
+    scalars = yaml.SafeLoader(u'')
+    implicit_resolvers = scalars.yaml_implicit_resolvers
+    constructors = scalars.yaml_constructors
+    ScalarNode = yaml.nodes.ScalarNode
+    pointer_pattern, anchor_start_pattern = patterns
+
+    root = _NO_KEY
+    stack = []
+    anchors = dict()  # YAML anchor -> value
+    # Aliases of dicts and merge keys add keys that are not read from events, and a repeated key replaces an indexed
+    # value, then the index is built again by a walk
+    walk_again = False
+    try:
+        while True:
+            event = loader.get_event()
+            cls = event.__class__
+            if cls is events.ScalarEvent:
+                value = event.value
+                tag = event.tag
+                if tag is None or tag == u'!':
+                    if not event.implicit[0] or (value and value[0] not in implicit_resolvers):
+                        tag = _STR_TAG
+                    else:
+                        tag = scalars.resolve(ScalarNode, value, event.implicit)
+                if tag != _STR_TAG:
+                    node = ScalarNode(tag, value, event.start_mark, event.end_mark, event.style)
+                    if tag == _MERGE_TAG:
+                        value = _MERGE_TAG
+                    else:
+                        value = constructors.get(tag, constructors[None])(scalars, node)
+                is_container = False
+            elif cls is events.MappingStartEvent:
+                if event.tag not in _MAP_TAGS:
+                    raise ValueError('tag {} is not supported, line {}'.format(event.tag, event.start_mark.line + 1))
+                value = dict()
+                is_container = True
+            elif cls is events.SequenceStartEvent:
+                if event.tag not in _SEQ_TAGS:
+                    raise ValueError('tag {} is not supported, line {}'.format(event.tag, event.start_mark.line + 1))
+                value = list()
+                is_container = True
+            elif cls is events.MappingEndEvent or cls is events.SequenceEndEvent:
+                frame = stack.pop()
+                if frame.merges:
+                    _apply_merges(frame.value, frame.merges)
+                    walk_again = walk_again or frame.path is not None
+                continue
+            elif cls is events.AliasEvent:
+                if event.anchor not in anchors:
+                    raise ValueError('undefined alias {}, line {}'.format(event.anchor, event.start_mark.line + 1))
+                value = anchors[event.anchor]
+                is_container = False
+                if isinstance(value, dict) and stack and stack[-1].path is not None and stack[-1].key is not _NO_KEY:
+                    walk_again = True
+            elif cls is events.DocumentStartEvent:
+                if root is not _NO_KEY:
+                    raise ValueError('expected a single document, line {}'.format(event.start_mark.line + 1))
+                continue
+            elif cls is events.StreamEndEvent:
+                break
+            else:
+                continue
+
+            if getattr(event, 'anchor', None) is not None and cls is not events.AliasEvent:
+                anchors[event.anchor] = value
+
+            # Put value in its dict or list
+            child_path = None
+            child_owner = None
+            if not stack:
+                root = value
+                child_path = ()
+            else:
+                frame = stack[-1]
+                parent = frame.value
+                if parent.__class__ is list:
+                    parent.append(value)
+                elif frame.key is _NO_KEY:
+                    # value is a key
+                    if is_container:
+                        raise ValueError('dict or list as a key is not supported, line {}'.format(
+                            event.start_mark.line + 1))
+                    if value is _MERGE_TAG:
+                        frame.key = _MERGE_TAG
+                        continue
+                    frame.key = value
+                    frame.key_owner = frame.owner
+                    if value in parent:
+                        walk_again = walk_again or frame.path is not None
+                    if frame.path is not None and isinstance(value, string_types):
+                        if anchor_start_pattern in value:
+                            frame.key_owner = index.add_anchor(frame.path, value, owner=frame.owner)
+                    continue
+                else:
+                    key = frame.key
+                    frame.key = _NO_KEY
+                    if key is _MERGE_TAG:
+                        if frame.merges is None:
+                            frame.merges = []
+                        frame.merges.append(value)
+                    else:
+                        parent[key] = value
+                        if frame.path is not None:
+                            if isinstance(key, string_types) and pointer_pattern in key:
+                                index.add_pointer(frame.path, key, value, owner=frame.owner)
+                            child_path = frame.path + (key,)
+                            child_owner = frame.key_owner
+            if is_container:
+                stack.append(_Frame(value, child_path if value.__class__ is dict else None, child_owner))
+    finally:
+        loader.dispose()
+
+    if root is _NO_KEY:
+        return None
+    if walk_again:
+        del index.anchors[:]
+        del index.pointers[:]
+        if isinstance(root, dict):
+            index.add_tree(root, pointer_pattern, anchor_start_pattern)
+    return root
+
+
+def _apply_merges(node, merges):
+    """
+    Apply YAML merge keys ('<<') to dict 'node' like yaml.SafeLoader: keys of 'node' override merged keys, and keys of
+    earlier merged dicts override keys of later ones.
+    """
+    merged = dict()
+    for value in merges:
+        items = value if isinstance(value, list) else [value]
+        for item in reversed(items):
+            if not isinstance(item, dict):
+                raise ValueError('expected a dict or a list of dicts for merging, but found {}'.format(
+                    type(item).__name__))
+            merged.update(item)
+    own = dict(node)
+    node.clear()
+    node.update(merged)
+    node.update(own)